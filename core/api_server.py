@@ -1,96 +1,437 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, send_from_directory
 from flask_cors import CORS 
-import subprocess
-from database import fetch_logs
+from database import fetch_logs, fetch_logs_since, count_logs, logs_version, insert_logs_batch, is_lock_timeout, log_blockchain
+import blockchain_backend
+import instrumentation
+import profiler
 import yaml
 import socket
 import sys
+import os
 import logging
 import re
+import threading
+import argparse
+import json
+import hmac
+import queue
+import sqlite3
+
+# Shared blocklist helpers live next to the firewall server
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+from blocklist_store import read_blocklist, blocklist_version
+from response_cache import ResponseCache
+from event_stream import EventHub, EventSources
+from blocklist_replica import BlocklistReplica
+from blocklist_engine import embedded_in
+from sniffer_supervisor import sniffer_status, start_sniffer, stop_sniffer
+from log_ingest import BatchError, MAX_BATCH_BYTES, SENSOR_HEADER, SEQ_HEADER, decode_batch, event_row
+
 logging.basicConfig(level=logging.INFO)
 
-try:
-    with open("config.yaml") as f:
-        config = yaml.safe_load(f)
-except Exception as e:
-    logging.error(f"Failed to load config.yaml: {e}")
-    config = {}
+MAC_REGEX = re.compile(r"^([0-9A-Fa-f]{2}:){5}[0-9A-Fa-f]{2}$")
+MAX_LOG_LIMIT = 1000
+SENSOR_ID_REGEX = re.compile(r"^[A-Za-z0-9_.:-]{1,64}$")
+INGEST_WAIT = 0.5         # seconds a batch waits for a free writer before we push back
+INGEST_RETRY_AFTER = 1    # seconds, sent to sensors with a 503
+EVENTS_RETRY_AFTER = 30   # seconds, sent to viewers past max_event_viewers
+
+api = Blueprint("shakti", __name__)
+
+def load_config(path="config.yaml"):
+    """Read config.yaml once; a missing or broken file means defaults"""
+    try:
+        with open(path) as f:
+            return yaml.safe_load(f) or {}
+    except Exception as e:
+        logging.error(f"Failed to load {path}: {e}")
+        return {}
 
-app = Flask(__name__)
-CORS(app)
+class ApiState:
+    """Per-app configuration and caches, built once by create_app()"""
 
-FIREWALL_SERVER_HOST = config.get("firewall_host", "127.0.0.1")
-FIREWALL_SERVER_PORT = config.get("firewall_port", 9000)
-SOCKET_TIMEOUT = config.get("socket_timeout", 5)
+    def __init__(self, config):
+        self.config = config
+        self.firewall_host = config.get("firewall_host", "127.0.0.1")
+        self.firewall_port = config.get("firewall_port", 9000)
+        self.socket_timeout = config.get("socket_timeout", 5)
+        self.blocklist_file = config.get("blocklist_file", "logs/blocked_macs.json")
+        self.interface = config.get("interface")
+        # /logs and /blocklist are cached until the data behind them changes
+        self.response_cache = ResponseCache(config.get("response_cache_entries", 128))
+        # /events: one hub and one set of sources per process, shared by all viewers.
+        # Each viewer holds a worker thread while connected, so only half the
+        # threads may stream; past that the dashboard polls
+        self.event_hub = EventHub(config.get("event_history", 1000))
+        self.event_viewers = threading.BoundedSemaphore(
+            config.get("max_event_viewers", max(1, config.get("api_threads", 8) // 2)))
+        self._event_sources = None
+        self._event_sources_lock = threading.Lock()
+        # Concurrent /logs/ingest writers per process; more batches get a 503
+        self.ingest_slots = threading.BoundedSemaphore(config.get("ingest_concurrency", 2))
+        # Shared secret sensors send as "Authorization: Bearer <token>" (unset = ingest disabled)
+        self.ingest_token = config.get("ingest_token")
+        # Ingested events bound for the blockchain: one writer per process,
+        # rows past this backlog are dropped (SQLite still has them)
+        self.blockchain_backlog = queue.Queue(config.get("blockchain_backlog", 10000))
+        # Separate secret for /profile(s) and switching instrumentation, so a
+        # sensor's ingest secret grants nothing else (unset = those are disabled)
+        self.admin_token = config.get("admin_token")
+        self.profile = config.get("profile", False)
+        self.profile_dump = config.get("profile_dump", profiler.DUMP_INTERVAL)
+        # firewall_mode: embedded + firewall_embedded_in: api -> the blocklist
+        # engine lives in this process and /block, /unblock call it directly
+        self.hosts_firewall = embedded_in(config) == "api"
+        self.engine = None
+        self._engine_pid = None
+        self._process_pid = None
 
-MAC_REGEX = re.compile(r"^([0-9A-Fa-f]{2}:){5}[0-9A-Fa-f]{2}$")
+    def start_process_threads(self):
+        """Background threads this process needs; gunicorn forks workers after create_app()"""
+        if self._process_pid == os.getpid():
+            return
+        self._process_pid = os.getpid()
+        instrumentation.start_exporter("api")
+        threading.Thread(target=self.blockchain_writer, name="blockchain-writer", daemon=True).start()
+        if self.hosts_firewall:
+            self.start_engine()
+        if self.profile:
+            profiler.SamplingProfiler("api").start(dump_interval=self.profile_dump)
+
+    def start_engine(self):
+        """
+        Host the blocklist; if another process already serves it on
+        firewall_port, talk to that one over TCP. Without the front end
+        (firewall_listen: false) nothing could reach the other owner, so
+        this worker refuses to start.
+        """
+        if self._engine_pid == os.getpid():
+            return
+        self._engine_pid = os.getpid()
+        self.engine = None   # a forked worker can't use its parent's threads
+        import firewall_server
+        try:
+            self.engine = firewall_server.start_embedded(self.config)
+        except OSError as e:
+            if not self.config.get("firewall_listen", True):
+                raise RuntimeError(f"Another process already hosts the firewall ({e}); "
+                                   "with firewall_listen: false run the API as a single worker")
+            logging.warning(f"Not hosting the firewall, another process serves it on "
+                            f"{self.firewall_host}:{self.firewall_port} ({e})")
+
+    def chain_rows(self, rows):
+        """Queue ingested rows for the blockchain writer without blocking the request"""
+        for i, row in enumerate(rows):
+            try:
+                self.blockchain_backlog.put_nowait(row)
+            except queue.Full:
+                dropped = len(rows) - i
+                instrumentation.count('blockchain_dropped', dropped)
+                logging.warning(f"⚠️  Blockchain writer behind, {dropped} ingested events not chained")
+                return
+
+    def blockchain_writer(self):
+        while True:
+            timestamp, mac, signal, channel, message = self.blockchain_backlog.get()
+            try:
+                log_blockchain(mac, signal, channel, message)
+            except Exception as e:
+                logging.error(f"Failed to log {mac} to the blockchain: {e}")
+
+    def firewall_connection(self):
+        return socket.create_connection((self.firewall_host, self.firewall_port), timeout=self.socket_timeout)
+
+    def blocklist_event(self, message):
+        """Turn a firewall WATCH message into a dashboard event"""
+        if message.get('type') == 'delta':
+            self.event_hub.publish('blocklist', {'version': message['version'], 'changes': [
+                {k: v for k, v in record.items() if k != 'ts'} for record in message['records']]})
+        elif message.get('type') == 'snapshot':
+            self.event_hub.publish('blocklist', {'version': message['version'], 'reset': True,
+                                                 'total': len(message['blocked_macs'])})
+
+    def start_event_sources(self):
+        """Start the background producers on the first /events subscriber"""
+        with self._event_sources_lock:
+            if self._event_sources is None:
+                replica = BlocklistReplica(self.firewall_host, self.firewall_port,
+                                           listener=self.blocklist_event).start()
+                sources = EventSources(self.event_hub, fetch_logs_since, count_logs,
+                                       blocked_count=lambda: len(replica) if replica.ready else None)
+                self._event_sources = sources.start(logs_version())
+        return self._event_sources
+
+def state():
+    return current_app.extensions["shakti"]
+
+def create_app(config=None, forking=False):
+    """
+    Build the API app. Config is loaded once here; run it with
+    `gunicorn "api_server:create_app()"` (without --preload) or
+    `python api_server.py`. An embedded firewall starts right away, unless
+    `forking` says a server will fork workers from this app: then each
+    worker starts its own in post_fork (see run_production).
+    """
+    if config is None:
+        config = load_config()
+    blockchain_backend.configure(config.get("blockchain_backend", "algorand"))
+    instrumentation.set_enabled(config.get("instrumentation", True))
+
+    app = Flask(__name__)
+    # Expose ETag so the dashboard can skip re-rendering unchanged data
+    CORS(app, expose_headers=["ETag"])
+    app.extensions["shakti"] = ApiState(config)
+    app.register_blueprint(api)
+    if app.extensions["shakti"].hosts_firewall and not forking:
+        app.extensions["shakti"].start_engine()
+    return app
+
+@api.before_app_request
+def start_process_threads():
+    state().start_process_threads()
+
+def token_error(token, setting):
+    """Error response unless the request carries "Authorization: Bearer <token>"; fails closed"""
+    if not token:
+        return jsonify({"error": f"Disabled until {setting} is set in config.yaml"}), 403
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"error": "Invalid or missing token"}), 401
+    return None
 
-@app.route("/start")
-def start_sniffer():
+def sniffer_interface():
+    """Interface from ?interface=, else config.yaml"""
+    return request.args.get("interface") or state().interface
+
+@api.route("/start")
+def start_sniffer_api():
+    """Start the supervised sniffer; a second call while it runs is a no-op"""
+    interface = sniffer_interface()
+    if not interface:
+        return jsonify({"error": "No interface specified in config.yaml"}), 400
     try:
-        subprocess.Popen([sys.executable, "main.py"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        logging.info("Sniffer started.")
-        return jsonify({"status": "sniffing started"})
+        started, status = start_sniffer(interface)
+        if not started:
+            return jsonify({"status": "already running", "sniffer": status}), 409
+        logging.info(f"Sniffer supervisor started for {interface}.")
+        return jsonify({"status": "sniffing started", "sniffer": status})
     except Exception as e:
         logging.error(f"Failed to start sniffer: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route("/logs")
+@api.route("/stop")
+def stop_sniffer_api():
+    interface = sniffer_interface()
+    if not interface:
+        return jsonify({"error": "No interface specified in config.yaml"}), 400
+    try:
+        if not stop_sniffer(interface):
+            return jsonify({"status": "not running", "sniffer": sniffer_status(interface)})
+        logging.info(f"Sniffer stopped on {interface}.")
+        return jsonify({"status": "sniffing stopped", "sniffer": sniffer_status(interface)})
+    except Exception as e:
+        logging.error(f"Failed to stop sniffer: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/restart")
+def restart_sniffer_api():
+    interface = sniffer_interface()
+    if not interface:
+        return jsonify({"error": "No interface specified in config.yaml"}), 400
+    try:
+        stop_sniffer(interface)
+        started, status = start_sniffer(interface)
+        if not started:
+            # Someone else started it between our stop and start
+            return jsonify({"status": "already running", "sniffer": status}), 409
+        return jsonify({"status": "sniffing restarted", "sniffer": status})
+    except Exception as e:
+        logging.error(f"Failed to restart sniffer: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/status")
+def sniffer_status_api():
+    """Sniffer health: running, uptime, frames/s, queue backlog, restarts"""
+    interface = sniffer_interface()
+    if not interface:
+        return jsonify({"error": "No interface specified in config.yaml"}), 400
+    return jsonify(sniffer_status(interface))
+
+@api.route("/logs")
 def get_logs():
     try:
-        data = fetch_logs()
-        logs = []
-        for row in data:
-            logs.append({
+        limit = min(request.args.get("limit", 50, type=int), MAX_LOG_LIMIT)
+
+        def build():
+            return [{
                 "timestamp": row[0],
                 "mac": row[1],
                 "signal": row[2],
                 "channel": row[3],
                 "message": row[4]
-            })
-        return jsonify(logs)
+            } for row in fetch_logs(limit)]
+
+        return state().response_cache.respond("logs", logs_version(), build)
     except Exception as e:
         logging.error(f"Failed to fetch logs: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route("/block/<mac>")
+def ingest_busy(reason):
+    response = jsonify({"error": f"Collector busy ({reason}), retry later"})
+    response.headers["Retry-After"] = str(INGEST_RETRY_AFTER)
+    return response, 503
+
+@api.route("/logs/ingest", methods=["POST"])
+def ingest_logs():
+    """
+    Bulk ingest from remote sensors: gzip'd NDJSON events, with X-Sensor-Id
+    and X-Batch-Seq headers, authorized by ingest_token. Re-sending a batch
+    is safe; a saturated collector answers 503 + Retry-After.
+    """
+    error = token_error(state().ingest_token, "ingest_token")
+    if error:
+        return error
+    if (request.content_length or 0) > MAX_BATCH_BYTES:
+        return jsonify({"error": f"Batch exceeds {MAX_BATCH_BYTES} bytes"}), 413
+    sensor = request.headers.get(SENSOR_HEADER, "")
+    if not SENSOR_ID_REGEX.match(sensor):
+        return jsonify({"error": f"Missing or invalid {SENSOR_HEADER} header"}), 400
+    try:
+        seq = int(request.headers.get(SEQ_HEADER, ""))
+        if seq < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": f"Missing or invalid {SEQ_HEADER} header"}), 400
+
+    try:
+        events = decode_batch(request.get_data(cache=False), request.headers.get("Content-Encoding"))
+    except BatchError as e:
+        return jsonify({"error": str(e)}), e.status
+    rows = [event_row(event) for event in events]
+
+    slots = state().ingest_slots
+    if not slots.acquire(timeout=INGEST_WAIT):
+        return ingest_busy("all writers in use")
+    try:
+        inserted = insert_logs_batch(sensor, seq, rows)
+    except sqlite3.OperationalError as e:
+        if not is_lock_timeout(e):
+            logging.error(f"Failed to ingest batch {seq} from {sensor}: {e}")
+            return jsonify({"error": str(e)}), 500
+        # Another process holds the write lock for too long
+        logging.warning(f"⚠️  Ingest from {sensor} deferred: {e}")
+        return ingest_busy("database locked")
+    finally:
+        slots.release()
+
+    if inserted is None:
+        return jsonify({"status": "duplicate", "sensor": sensor, "seq": seq})
+    chained = [row for row, event in zip(rows, events) if event.get("blockchain", True)]
+    if chained and not blockchain_backend.disabled():
+        state().chain_rows(chained)
+    logging.info(f"📥 Ingested {inserted} events from sensor {sensor} (batch {seq})")
+    return jsonify({"status": "ingested", "sensor": sensor, "seq": seq, "rows": inserted})
+
+@api.route("/events")
+def events():
+    """Server-Sent Events: attack, blocklist and stats events as they happen"""
+    viewers = state().event_viewers
+    if not viewers.acquire(blocking=False):
+        # EventSource gives up on a non-200 answer and the dashboard falls back to polling
+        response = jsonify({"error": "Too many live viewers, poll /logs instead"})
+        response.headers["Retry-After"] = str(EVENTS_RETRY_AFTER)
+        return response, 503
+    state().start_event_sources()
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    response = Response(state().event_hub.stream(last_event_id), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"   # don't let reverse proxies buffer the stream
+    })
+    # The server closes the response when the viewer disconnects
+    response.call_on_close(viewers.release)
+    return response
+
+@api.route("/block/<mac>")
 def block_mac(mac):
     if not MAC_REGEX.match(mac):
         return jsonify({"error": "Invalid MAC address format"}), 400
     try:
-        with socket.create_connection((FIREWALL_SERVER_HOST, FIREWALL_SERVER_PORT), timeout=SOCKET_TIMEOUT) as sock:
+        engine = state().engine
+        if engine is not None:
+            success, message = engine.block_mac(mac)
+            if not success:
+                return jsonify({"error": message}), 500
+            return jsonify({"status": f"Blocked MAC: {mac}"})
+        with state().firewall_connection() as sock:
             sock.sendall((mac + "\n").encode())
             response = sock.recv(1024).decode()
         return jsonify({"status": response.strip()})
     except Exception as e:
         logging.error(f"Failed to block MAC {mac}: {e}")
         return jsonify({"error": str(e)}), 500
-@app.route("/logs/blockchain")
+
+def send_batch_command(command, macs):
+    """Send a batch command to the firewall server and return its full reply"""
+    payload = command + "\n" + "\n".join(macs) + "\nEND\n"
+    chunks = []
+    with state().firewall_connection() as sock:
+        sock.sendall(payload.encode())
+        sock.shutdown(socket.SHUT_WR)
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks).decode()
+
+@api.route("/block", methods=["POST"])
+def block_many_api():
+    """Block a batch of MACs: body is a JSON list or {"macs": [...]}"""
+    body = request.get_json(silent=True)
+    macs = body.get("macs") if isinstance(body, dict) else body
+    if not isinstance(macs, list) or not macs:
+        return jsonify({"error": "Expected a non-empty JSON list of MAC addresses"}), 400
+
+    invalid = [mac for mac in macs if not isinstance(mac, str) or not MAC_REGEX.match(mac)]
+    if invalid:
+        return jsonify({"error": "Invalid MAC address format", "invalid": invalid[:20], "invalid_count": len(invalid)}), 400
+
+    try:
+        engine = state().engine
+        if engine is not None:
+            response = engine.block_many(macs)[1]
+        else:
+            response = send_batch_command("BLOCK_MANY", macs)
+        if not response.startswith("Blocked"):
+            return jsonify({"error": response.strip()}), 502
+        return jsonify({"status": response.strip(), "count": len(macs)})
+    except ConnectionRefusedError:
+        return jsonify({"error": "Firewall server offline"}), 503
+    except Exception as e:
+        logging.error(f"Failed to block {len(macs)} MACs: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/logs/blockchain")
 def get_blockchain_logs():
     """Get total logs from blockchain"""
     try:
-        from database_blockchain import get_total_logs_blockchain
-        total = get_total_logs_blockchain()
+        backend = blockchain_backend.get_backend()
         return jsonify({
-            "total_blockchain_logs": total,
-            "app_id": 748319582,
-            "explorer": f"https://testnet.explorer.perawallet.app/application/748319582"
+            "total_blockchain_logs": backend.total_logs(),
+            "app_id": backend.app_id,
+            "explorer": backend.explorer_url()
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/logs/hybrid")
+@api.route("/logs/hybrid")
 def get_hybrid_logs():
     """Get both local and blockchain log counts"""
     try:
-        from database import fetch_logs
-        from database_blockchain import get_total_logs_blockchain
-        
         local_logs = fetch_logs(50)
-        blockchain_total = get_total_logs_blockchain()
+        blockchain_total = blockchain_backend.get_backend().total_logs()
         
         return jsonify({
-            "local_logs": len(local_logs),
+            "local_logs": count_logs(),
             "blockchain_logs": blockchain_total,
             "mode": "hybrid",
             "recent_local": local_logs[:10]  # First 10 for preview
@@ -98,38 +439,133 @@ def get_hybrid_logs():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/blocklist")
+@api.route("/blocklist")
 def get_blocklist():
     """Get list of currently blocked MAC addresses"""
     try:
-        import json
-        with open("logs/blocked_macs.json", "r") as f:
-            data = json.load(f)
-        return jsonify({
-            "blocked_macs": data.get("blocked_macs", []),
-            "total": len(data.get("blocked_macs", [])),
-            "last_updated": data.get("last_updated", "N/A")
-        })
-    except FileNotFoundError:
-        return jsonify({
-            "blocked_macs": [],
-            "total": 0,
-            "last_updated": "Never"
-        })
+        blocklist_file = state().blocklist_file
+
+        def build():
+            data = read_blocklist(blocklist_file)
+            return {
+                "blocked_macs": data["blocked_macs"],
+                "prefix_rules": data["prefix_rules"],
+                "expirations": data["expirations"],
+                "total": data["total_blocked"],
+                "last_updated": data["last_updated"] or "Never"
+            }
+
+        def valid_until(data):
+            # A lapsing TTL changes the answer even if the files don't change
+            return min(data["expirations"].values(), default=None)
+
+        return state().response_cache.respond("blocklist", blocklist_version(blocklist_file), build, valid_until)
     except Exception as e:
         logging.error(f"Error reading blocklist: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route("/unblock/<mac>")
+@api.route("/cache/stats")
+def cache_stats():
+    """Response cache hit/miss/304 counters"""
+    return jsonify(state().response_cache.stats())
+
+@api.route("/metrics")
+def metrics():
+    """Prometheus metrics: per-stage timings from this API process, its sibling workers and the sniffer"""
+    return Response(instrumentation.prometheus("api"), mimetype="text/plain; version=0.0.4")
+
+@api.route("/metrics/instrumentation", methods=["GET", "POST"])
+def instrumentation_switch():
+    """Read or flip hot-path instrumentation for every process: POST {"enabled": false}"""
+    if request.method == "POST":
+        denied = token_error(state().admin_token, "admin_token")
+        if denied:
+            return denied
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get("enabled"), bool):
+            return jsonify({"error": 'Expected {"enabled": true|false}'}), 400
+        instrumentation.set_shared_enabled(body["enabled"])
+        logging.info(f"Instrumentation {'enabled' if body['enabled'] else 'disabled'}")
+    return jsonify({"enabled": instrumentation.enabled,
+                    "propagation_seconds": instrumentation.EXPORT_INTERVAL})
+
+@api.route("/profile", methods=["POST"])
+def profile_api():
+    """Capture a profile of a live process: {"target": "api"|"sniffer", "seconds": 10}"""
+    denied = token_error(state().admin_token, "admin_token")
+    if denied:
+        return denied
+    body = request.get_json(silent=True) or {}
+    target = body.get("target", "api")
+    seconds = body.get("seconds", profiler.TRIGGER_SECONDS)
+    if target not in ("api", "sniffer"):
+        return jsonify({"error": "target must be 'api' or 'sniffer'"}), 400
+    if not isinstance(seconds, (int, float)) or not 0 < seconds <= profiler.MAX_CAPTURE_SECONDS:
+        return jsonify({"error": f"seconds must be between 0 and {profiler.MAX_CAPTURE_SECONDS:.0f}"}), 400
+
+    if target == "api":
+        # Profiles the worker handling this request; one capture at a time
+        if not profiler.capture_async("api", seconds):
+            return jsonify({"error": "A profile capture is already running"}), 409
+    else:
+        interface = sniffer_interface()
+        if not interface or not sniffer_status(interface)["running"]:
+            return jsonify({"error": "Sniffer is not running"}), 409
+        if profiler.capture_pending("sniffer"):
+            return jsonify({"error": "A sniffer capture is already pending"}), 409
+        profiler.request_capture("sniffer", seconds)
+    logging.info(f"📊 Profiling {target} for {seconds}s")
+    return jsonify({"status": "profiling", "target": target, "seconds": seconds, "pid": os.getpid()}), 202
+
+def read_profile_meta(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+@api.route("/profiles")
+def list_profiles():
+    """Profiles written so far, newest first"""
+    denied = token_error(state().admin_token, "admin_token")
+    if denied:
+        return denied
+    directory = profiler.PROFILE_DIR
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(".json") and not name.startswith("trigger-")]
+    except OSError:
+        names = []
+    profiles = []
+    for name in names:
+        meta = read_profile_meta(os.path.join(directory, name))
+        if meta is not None:
+            meta["file"] = name[:-len(".json")] + ".collapsed"
+            profiles.append(meta)
+    profiles.sort(key=lambda meta: meta.get("ended_at") or 0, reverse=True)
+    return jsonify(profiles)
+
+@api.route("/profiles/<path:name>")
+def download_profile(name):
+    """Collapsed stacks, ready for flamegraph.pl or speedscope"""
+    denied = token_error(state().admin_token, "admin_token")
+    if denied:
+        return denied
+    return send_from_directory(os.path.abspath(profiler.PROFILE_DIR), name, mimetype="text/plain")
+
+@api.route("/unblock/<mac>")
 def unblock_mac_api(mac):
     """Unblock a MAC address via API"""
     if not MAC_REGEX.match(mac):
         return jsonify({"error": "Invalid MAC address format"}), 400
     
     try:
-        with socket.create_connection((FIREWALL_SERVER_HOST, FIREWALL_SERVER_PORT), timeout=SOCKET_TIMEOUT) as sock:
-            sock.sendall(f"UNBLOCK {mac}\n".encode())
-            response = sock.recv(1024).decode()
+        engine = state().engine
+        if engine is not None:
+            response = engine.unblock_mac(mac)[1]
+        else:
+            with state().firewall_connection() as sock:
+                sock.sendall(f"UNBLOCK {mac}\n".encode())
+                response = sock.recv(1024).decode()
         return jsonify({
             "status": "success",
             "message": response.strip(),
@@ -146,10 +582,67 @@ def unblock_mac_api(mac):
         return jsonify({"error": str(e)}), 500
 
 
+def run_production(app, host, port, workers, threads):
+    """
+    Serve with a multi-worker WSGI server: gunicorn (threaded workers, so
+    long-lived /events streams don't pin a whole process) where available,
+    otherwise waitress (threads only; it runs on Windows).
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        BaseApplication = None
+
+    if BaseApplication is not None:
+        class ShaktiApplication(BaseApplication):
+            def load_config(self):
+                self.cfg.set("bind", f"{host}:{port}")
+                self.cfg.set("workers", workers)
+                self.cfg.set("threads", threads)
+                self.cfg.set("worker_class", "gthread")
+                self.cfg.set("timeout", 0)   # SSE responses never "finish"
+                # Threads (and an embedded firewall) start in each worker, not the master
+                self.cfg.set("post_fork", lambda server, worker: app.extensions["shakti"].start_process_threads())
+
+            def load(self):
+                return app
+
+        logging.info(f"🚀 gunicorn: {workers} workers x {threads} threads on {host}:{port}")
+        ShaktiApplication().run()
+        return
+
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit("Install gunicorn (Linux/macOS) or waitress (Windows) for --production")
+    logging.info(f"🚀 waitress: {workers * threads} threads on {host}:{port}")
+    app.extensions["shakti"].start_process_threads()
+    serve(app, host=host, port=port, threads=workers * threads)
 
 if __name__ == '__main__':
-    app.run(port=config.get("api_port", 5000), host='0.0.0.0', debug=config.get("debug", False))
+    parser = argparse.ArgumentParser(description="Shakti API server")
+    parser.add_argument("--production", action="store_true",
+                        help="serve with gunicorn/waitress instead of the Flask dev server")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--profile", action="store_true",
+                        help="run the sampling profiler in every worker, writing to logs/profiles")
+    args = parser.parse_args()
 
-from flask_cors import CORS
-app = Flask(__name__)
-CORS(app)
+    config = load_config()
+    if args.profile:
+        config["profile"] = True
+    production = args.production or config.get("production", False)
+    app = create_app(config, forking=production)
+    port = config.get("api_port", 5000)
+    if production:
+        workers = args.workers or config.get("api_workers", (os.cpu_count() or 1) * 2 + 1)
+        threads = args.threads or config.get("api_threads", 8)
+        if embedded_in(config) == "api" and not config.get("firewall_listen", True) and workers > 1:
+            # Without the front end only one process may own the blocklist (ApiState
+            # enforces that); extra workers would just fail to boot
+            logging.warning("Embedded firewall without firewall_listen: running a single worker")
+            workers = 1
+        run_production(app, '0.0.0.0', port, workers, threads)
+    else:
+        app.run(port=port, host='0.0.0.0', debug=config.get("debug", False), threaded=True)
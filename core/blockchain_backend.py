@@ -0,0 +1,109 @@
+import importlib
+import logging
+import threading
+import time
+
+# Pluggable, lazily loaded blockchain logging. Nothing blockchain-related is
+# imported until the first attack is logged or the total is requested, so the
+# sniffer and API start without paying for algosdk, .env.local parsing or
+# client construction. Backends are registered by name and selected with the
+# `blockchain_backend` config key ("algorand" by default, "none" to disable).
+
+TOTAL_CACHE_SECONDS = 30   # get_total costs an on-chain call; don't repeat it per request
+
+BACKENDS = {
+    "algorand": "database_blockchain",
+    "none": None,
+}
+
+
+class NullBlockchainBackend:
+    """Used when blockchain logging is disabled or unavailable"""
+
+    name = "none"
+    enabled = False
+    app_id = None
+
+    def log_attack(self, mac, signal, channel, message):
+        return None
+
+    def total_logs(self):
+        return 0
+
+    def explorer_url(self):
+        return ""
+
+
+class ModuleBlockchainBackend:
+    """
+    Adapter for a module exposing insert_log_blockchain(),
+    get_total_logs_blockchain() and APP_ID (e.g. database_blockchain).
+    """
+
+    enabled = True
+
+    def __init__(self, name, module):
+        self.name = name
+        self.module = module
+        self.app_id = getattr(module, "APP_ID", None)
+        self._total = None
+        self._total_at = 0.0
+        self._lock = threading.Lock()
+
+    def log_attack(self, mac, signal, channel, message):
+        return self.module.insert_log_blockchain(mac, signal, channel, message)
+
+    def total_logs(self):
+        with self._lock:
+            if self._total is None or time.monotonic() - self._total_at > TOTAL_CACHE_SECONDS:
+                self._total = self.module.get_total_logs_blockchain()
+                self._total_at = time.monotonic()
+            return self._total
+
+    def explorer_url(self):
+        return f"https://testnet.explorer.perawallet.app/application/{self.app_id}"
+
+
+_backend = None
+_backend_name = "algorand"
+_lock = threading.Lock()
+
+
+def configure(name):
+    """Select the backend by name; takes effect on the next get_backend()"""
+    global _backend, _backend_name
+    with _lock:
+        _backend_name = name or "none"
+        _backend = None
+
+
+def disabled():
+    """True once we know blockchain logging is off (without loading anything)"""
+    return _backend_name == "none" or (_backend is not None and not _backend.enabled)
+
+
+def get_backend():
+    """Load the configured backend on first use"""
+    global _backend
+    if _backend is not None:
+        return _backend
+    with _lock:
+        if _backend is None:
+            _backend = _load(_backend_name)
+        return _backend
+
+
+def _load(name):
+    if name not in BACKENDS:
+        logging.warning(f"⚠️ Unknown blockchain backend '{name}', blockchain logging disabled")
+        return NullBlockchainBackend()
+    module_name = BACKENDS[name]
+    if module_name is None:
+        return NullBlockchainBackend()
+    try:
+        backend = ModuleBlockchainBackend(name, importlib.import_module(module_name))
+        logging.info(f"✅ Blockchain integration loaded ({name})")
+        return backend
+    except ImportError as e:
+        logging.warning(f"⚠️ Blockchain integration not available: {e}")
+        return NullBlockchainBackend()
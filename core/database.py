@@ -1,10 +1,14 @@
 import sqlite3
 from datetime import datetime
 import os
+import time
 import logging
+from instrumentation import timed, timer
 
 DB_DIR = "logs"
 DB_PATH = os.path.join(DB_DIR, "wifi_attack_logs.db")
+INGEST_BUSY_TIMEOUT = 2.0           # seconds to wait for the write lock before pushing back
+INGEST_DEDUP_WINDOW = 7 * 86400     # how long a retried batch is still recognised
 
 logging.basicConfig(level=logging.INFO)
 
@@ -28,11 +32,27 @@ def init_db():
                     message TEXT
                 )
             ''')
+            # Rows shipped by remote sensors record which sensor saw them
+            columns = [row[1] for row in c.execute("PRAGMA table_info(logs)")]
+            if 'sensor' not in columns:
+                c.execute("ALTER TABLE logs ADD COLUMN sensor TEXT")
+            # (sensor, seq) of every ingested batch, so a retried batch is a no-op
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_batches (
+                    sensor TEXT,
+                    seq INTEGER,
+                    received_at REAL,
+                    rows INTEGER,
+                    PRIMARY KEY (sensor, seq)
+                )
+            ''')
+            c.execute("CREATE INDEX IF NOT EXISTS ingest_batches_received ON ingest_batches (received_at)")
             conn.commit()
         logging.info("Database initialized.")
     except Exception as e:
         logging.error(f"Failed to initialize database: {e}")
 
+@timed('db_insert')
 def insert_log(mac, signal, channel, message):
     ensure_db_dir()
     try:
@@ -45,6 +65,46 @@ def insert_log(mac, signal, channel, message):
     except Exception as e:
         logging.error(f"Failed to insert log: {e}")
 
+@timed('db_ingest')
+def insert_logs_batch(sensor, seq, rows):
+    """
+    Insert a sensor's batch of (timestamp, mac, signal, channel, message)
+    rows in one transaction. Returns the number of rows inserted, or None if
+    this (sensor, seq) was already ingested. Lock timeouts raise
+    sqlite3.OperationalError so the caller can ask the sensor to retry
+    (see is_lock_timeout).
+    """
+    ensure_db_dir()
+    try:
+        return _insert_batch(sensor, seq, rows)
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e) and "has no column" not in str(e):
+            raise
+    # A collector that never ran init_db() (e.g. the API on its own host)
+    init_db()
+    return _insert_batch(sensor, seq, rows)
+
+def _insert_batch(sensor, seq, rows):
+    now = time.time()
+    with sqlite3.connect(DB_PATH, timeout=INGEST_BUSY_TIMEOUT) as conn:
+        c = conn.cursor()
+        try:
+            c.execute("INSERT INTO ingest_batches (sensor, seq, received_at, rows) VALUES (?, ?, ?, ?)",
+                      (sensor, seq, now, len(rows)))
+        except sqlite3.IntegrityError:
+            return None
+        c.executemany("INSERT INTO logs (timestamp, mac, signal, channel, message, sensor) VALUES (?, ?, ?, ?, ?, ?)",
+                      [row + (sensor,) for row in rows])
+        c.execute("DELETE FROM ingest_batches WHERE received_at < ?", (now - INGEST_DEDUP_WINDOW,))
+        conn.commit()
+    return len(rows)
+
+def is_lock_timeout(error):
+    """True for the OperationalErrors worth retrying: another writer held the lock"""
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+@timed('db_fetch')
 def fetch_logs(limit=50):
     ensure_db_dir()
     try:
@@ -56,18 +116,49 @@ def fetch_logs(limit=50):
     except Exception as e:
         logging.error(f"Failed to fetch logs: {e}")
         return []
+
+def fetch_logs_since(last_id, limit=500):
+    """Rows (id, timestamp, mac, signal, channel, message) newer than last_id, oldest first"""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            c = conn.cursor()
+            c.execute("SELECT id, timestamp, mac, signal, channel, message FROM logs WHERE id > ? ORDER BY id LIMIT ?",
+                      (last_id, limit))
+            return c.fetchall()
+    except Exception as e:
+        logging.error(f"Failed to fetch new logs: {e}")
+        return []
+
+def count_logs():
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            return conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+    except Exception:
+        return 0
+
+def logs_version():
+    """Cheap change marker for the logs table: the latest rowid"""
+    try:
+        with sqlite3.connect(DB_PATH) as conn:
+            row = conn.execute("SELECT MAX(id) FROM logs").fetchone()
+        return row[0] or 0
+    except Exception:
+        return 0
+
 # ============================================
 # WEB3 BLOCKCHAIN INTEGRATION
 # ============================================
 
-try:
-    from database_blockchain import insert_log_blockchain
-    BLOCKCHAIN_ENABLED = True
-    logging.info("✅ Blockchain integration loaded")
-except ImportError:
-    BLOCKCHAIN_ENABLED = False
-    logging.warning("⚠️ Blockchain integration not available")
+# The backend (algosdk, credentials, client) is loaded on first use, in the
+# background thread, so neither importing this module nor logging an attack
+# waits for it.
+import blockchain_backend
 
+@timed('blockchain_submit')
+def log_blockchain(mac, signal, channel, message):
+    backend = blockchain_backend.get_backend()
+    if backend.enabled:
+        backend.log_attack(mac, signal, channel, message)
 
 def insert_log_hybrid(mac, signal, channel, message):
     """
@@ -77,12 +168,13 @@ def insert_log_hybrid(mac, signal, channel, message):
     insert_log(mac, signal, channel, message)
     
     # Blockchain logging (async to avoid blocking)
-    if BLOCKCHAIN_ENABLED:
+    if not blockchain_backend.disabled():
         import threading
-        thread = threading.Thread(
-            target=insert_log_blockchain,
-            args=(mac, signal, channel, message)
-        )
-        thread.daemon = True
-        thread.start()
+        with timer('blockchain_spawn'):
+            thread = threading.Thread(
+                target=log_blockchain,
+                args=(mac, signal, channel, message)
+            )
+            thread.daemon = True
+            thread.start()
         logging.info("🔗 Blockchain logging initiated")
@@ -0,0 +1,151 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+# Live dashboard events over Server-Sent Events. One EventHub per API process
+# collects attack events, blocklist changes and stats deltas from a single set
+# of background sources, numbers them and keeps a bounded history; every
+# /events viewer just reads from that shared history. The cost of watching the
+# database and the firewall is therefore the same for 1 viewer or 1000.
+#
+# Event ids are "<epoch>-<seq>". A browser reconnecting with Last-Event-ID
+# gets everything it missed, or a 'reset' event telling it to refetch the
+# full state when the id is from another process or too old.
+
+DEFAULT_HISTORY = 1000
+HEARTBEAT_INTERVAL = 15.0   # SSE comment lines keep proxies from timing out
+POLL_INTERVAL = 0.5         # new-log check, shared by every viewer
+STATS_INTERVAL = 5.0
+
+
+class EventHub:
+    """Numbered, bounded event history with blocking waits for subscribers"""
+
+    def __init__(self, history=DEFAULT_HISTORY):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def publish(self, event_type, data):
+        """Append an event and wake every waiting viewer"""
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, event_type, data))
+            self._cond.notify_all()
+            return self._seq
+
+    def parse_cursor(self, last_event_id):
+        """Sequence number to resume after, or None if it can't be resumed"""
+        if not last_event_id:
+            return self._seq
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+            # Another process's hub, or ahead of ours (e.g. seen on another worker)
+            return None
+        return int(seq)
+
+    def since(self, seq):
+        """Events after `seq`, or None if some have fallen out of the history
+        (or `seq` is ahead of this hub, so the caller has to resync)"""
+        with self._cond:
+            if seq > self._seq:
+                return None
+            if seq == self._seq:
+                return []
+            if not self._events or self._events[0][0] > seq + 1:
+                return None
+            return [event for event in self._events if event[0] > seq]
+
+    def wait(self, seq, timeout):
+        """Block until there is something newer than `seq`"""
+        with self._cond:
+            if self._seq <= seq:
+                self._cond.wait(timeout)
+            return self._seq > seq
+
+    def format(self, seq, event_type, data):
+        return f"id: {self.epoch}-{seq}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+    def stream(self, last_event_id=None, heartbeat=HEARTBEAT_INTERVAL):
+        """Generator of SSE text for one viewer"""
+        seq = self.parse_cursor(last_event_id)
+        # Tell clients how long to wait before reconnecting
+        yield "retry: 3000\n\n"
+        if seq is None:
+            seq = self._seq
+            yield self.format(seq, 'reset', {'reason': 'cursor expired'})
+        while True:
+            events = self.since(seq)
+            if events is None:
+                seq = self._seq
+                yield self.format(seq, 'reset', {'reason': 'fell behind'})
+                continue
+            for seq, event_type, data in events:
+                yield self.format(seq, event_type, data)
+            if not self.wait(seq, heartbeat):
+                yield ": ping\n\n"
+
+
+class EventSources:
+    """Background producers feeding one hub: new logs and stats deltas"""
+
+    def __init__(self, hub, fetch_since, count_logs, blocked_count=None,
+                 poll_interval=POLL_INTERVAL, stats_interval=STATS_INTERVAL):
+        self.hub = hub
+        self.fetch_since = fetch_since      # last_id -> [(id, ts, mac, signal, channel, message)]
+        self.count_logs = count_logs
+        self.blocked_count = blocked_count
+        self.poll_interval = poll_interval
+        self.stats_interval = stats_interval
+        self.last_log_id = None
+        self._stats = None
+        self._thread = None
+
+    def start(self, last_log_id):
+        self.last_log_id = last_log_id
+        self._thread = threading.Thread(target=self._run, name="event-sources", daemon=True)
+        self._thread.start()
+        return self
+
+    def poll_logs(self):
+        """Publish an 'attack' event per log row added since the last poll"""
+        for row in self.fetch_since(self.last_log_id):
+            log_id, timestamp, mac, signal, channel, message = row
+            self.hub.publish('attack', {
+                'id': log_id,
+                'timestamp': timestamp,
+                'mac': mac,
+                'signal': signal,
+                'channel': channel,
+                'message': message
+            })
+            self.last_log_id = log_id
+
+    def poll_stats(self):
+        """Publish a 'stats' event when the counters changed"""
+        stats = {'total_logs': self.count_logs(), 'latest_log_id': self.last_log_id}
+        if self.blocked_count is not None:
+            stats['blocked'] = self.blocked_count()
+        if stats != self._stats:
+            self._stats = stats
+            self.hub.publish('stats', stats)
+
+    def _run(self):
+        next_stats = 0.0
+        while True:
+            try:
+                self.poll_logs()
+                if time.monotonic() >= next_stats:
+                    self.poll_stats()
+                    next_stats = time.monotonic() + self.stats_interval
+            except Exception as e:
+                logging.error(f"Error polling live events: {e}")
+            time.sleep(self.poll_interval)
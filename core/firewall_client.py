@@ -0,0 +1,338 @@
+import logging
+import re
+import socket
+import threading
+import time
+
+from instrumentation import timer
+
+# The sniffer's connection to the firewall server, built to degrade instead
+# of stall. Every call goes through a circuit breaker: after a few consecutive
+# failures it opens and calls fail immediately instead of waiting out a
+# connect timeout per frame. Once reset_timeout has passed, a single probe is
+# let through (half-open); success closes the breaker, failure re-opens it
+# with a longer timeout.
+#
+# While the firewall can't be reached, checks are answered from a cache of
+# what the firewall last told us (and what we blocked), and block requests
+# are queued. A background thread probes with the queued blocks, so they are
+# replayed as one BLOCK_MANY as soon as the firewall is back.
+#
+# In embedded mode (firewall_mode: embedded) the blocklist engine runs in this
+# process and EmbeddedFirewall answers the same calls directly: there is no
+# connection to fail, so no breaker, cache or queue.
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 5.0
+MAX_RESET_TIMEOUT = 60.0
+CACHE_TTL = 300.0         # how long a BLOCKED answer is trusted during an outage
+MAX_QUEUED_BLOCKS = 10000
+_EXPIRES_REGEX = re.compile(r"expires in (\d+)s")
+
+
+class CircuitOpenError(ConnectionError):
+    """The breaker is open; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold failures -> half-open probe -> closed"""
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 max_reset_timeout=MAX_RESET_TIMEOUT, listener=None):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        # Optional listener(state), called on every state change
+        self.listener = listener
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = reset_timeout
+        self.opened_at = None
+        self.opened = 0          # times the breaker has tripped
+        self.rejected = 0        # calls failed fast while open
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self, now=None):
+        """May a call go through? In half-open, only one probe at a time"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self._set(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self.reset_timeout = self.base_reset_timeout
+            if self.state != CLOSED:
+                self._set(CLOSED)
+
+    def failure(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # The probe failed: stay away longer next time
+                self._probing = False
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open(now)
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open(now)
+
+    def _open(self, now):
+        self.opened_at = now
+        self.opened += 1
+        self._set(OPEN)
+
+    def _set(self, state):
+        self.state = state
+        if self.listener is not None:
+            try:
+                self.listener(state)
+            except Exception as e:
+                logging.error(f"Error in circuit breaker listener: {e}")
+
+
+class FirewallClient:
+    """CHECK / BLOCK against the firewall server with fail-fast and replay"""
+
+    def __init__(self, address, timeout=DEFAULT_TIMEOUT, breaker=None, cache_ttl=CACHE_TTL,
+                 max_queued=MAX_QUEUED_BLOCKS):
+        self.address = address
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        if self.breaker.listener is None:
+            self.breaker.listener = self._breaker_changed
+        self.cache_ttl = cache_ttl
+        self.max_queued = max_queued
+        self.stats = {'replayed': 0, 'queue_overflow': 0}
+        self._blocked = {}       # mac -> trust the BLOCKED answer until (time.time())
+        self._queued = {}        # mac -> ttl, in arrival order
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _breaker_changed(self, state):
+        if state == OPEN:
+            logging.warning(f"⚡ Firewall at {self.address[0]}:{self.address[1]} unreachable: failing fast, "
+                            f"answering from the local cache and queueing blocks")
+        elif state == CLOSED:
+            logging.info("✅ Firewall reachable again")
+            self._wakeup.set()
+
+    def start(self):
+        """Replay queued blocks in the background (the replay doubles as the breaker's probe)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="firewall-replay", daemon=True)
+            self._thread.start()
+        return self
+
+    # ----- transport -----
+
+    def _request(self, payload, stage):
+        if not self.breaker.allow():
+            raise CircuitOpenError("firewall circuit open")
+        try:
+            with timer(stage), socket.create_connection(self.address, timeout=self.timeout) as sock:
+                sock.sendall(payload.encode())
+                if payload.endswith("END\n"):
+                    sock.shutdown(socket.SHUT_WR)
+                chunks = []
+                while True:
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    if not payload.endswith("END\n"):
+                        break     # single-line commands get a single-line answer
+        except OSError:
+            self.breaker.failure()
+            raise
+        self.breaker.success()
+        return b"".join(chunks).decode().strip()
+
+    # ----- local cache -----
+
+    def _remember(self, mac, ttl=None):
+        valid_for = min(ttl, self.cache_ttl) if ttl else self.cache_ttl
+        with self._lock:
+            self._blocked[mac.lower()] = time.time() + valid_for
+
+    def cached(self, mac, now=None):
+        """Last known answer: blocked if the firewall recently said so"""
+        now = time.time() if now is None else now
+        with self._lock:
+            until = self._blocked.get(mac.lower())
+            if until is not None and until <= now:
+                del self._blocked[mac.lower()]
+                return False
+            return until is not None
+
+    # ----- calls -----
+
+    def check(self, mac):
+        """Is the MAC blocked? Falls back to the cache when the firewall is down"""
+        try:
+            response = self._request(f"CHECK {mac}\n", 'firewall_check_tcp')
+        except OSError as e:
+            if not isinstance(e, CircuitOpenError):
+                logging.warning(f"(Firewall check failed, using cached blocklist) {e}")
+            return self.cached(mac)
+        blocked = "NOT BLOCKED" not in response and "BLOCKED" in response
+        if blocked:
+            match = _EXPIRES_REGEX.search(response)
+            self._remember(mac, int(match.group(1)) if match else None)
+        else:
+            with self._lock:
+                self._blocked.pop(mac.lower(), None)
+        return blocked
+
+    def block(self, mac, ttl=None):
+        """
+        Ask the firewall to block `mac`. Returns 'blocked', 'refused' (the
+        firewall answered but didn't block) or 'queued' (unreachable; the
+        block is replayed when the firewall is back).
+        """
+        command = f"BLOCK {mac} TTL={ttl}\n" if ttl else f"{mac}\n"
+        try:
+            response = self._request(command, 'firewall_block')
+        except OSError as e:
+            if not isinstance(e, CircuitOpenError):
+                logging.error(f"❌ Failed to block {mac}: {e}")
+            self._queue(mac, ttl)
+            return 'queued'
+        # "Blocked ..." or "... already blocked"
+        if "blocked" in response.lower():
+            self._remember(mac, ttl)
+            return 'blocked'
+        logging.error(f"❌ Firewall refused to block {mac}: {response}")
+        return 'refused'
+
+    def _queue(self, mac, ttl):
+        # The sensor acts on its own block until the firewall hears about it
+        self._remember(mac, ttl)
+        with self._lock:
+            if mac not in self._queued and len(self._queued) >= self.max_queued:
+                self.stats['queue_overflow'] += 1
+                return
+            self._queued[mac] = ttl
+        self._wakeup.set()
+
+    def queued(self):
+        return len(self._queued)
+
+    def pending(self, mac):
+        """Is a block of `mac` waiting to be replayed?"""
+        with self._lock:
+            return mac in self._queued
+
+    def reachable(self):
+        """False while the breaker is open: local copies of the blocklist have stopped updating"""
+        return self.breaker.state == CLOSED
+
+    def replay(self):
+        """Send queued blocks as BLOCK_MANY batches (one per TTL); True if the queue is empty"""
+        with self._lock:
+            queued = dict(self._queued)
+        if not queued:
+            return True
+        by_ttl = {}
+        for mac, ttl in queued.items():
+            by_ttl.setdefault(ttl, []).append(mac)
+        for ttl, macs in by_ttl.items():
+            command = f"BLOCK_MANY TTL={ttl}" if ttl else "BLOCK_MANY"
+            try:
+                response = self._request(command + "\n" + "\n".join(macs) + "\nEND\n", 'firewall_replay')
+            except OSError:
+                return False
+            with self._lock:
+                for mac in macs:
+                    if self._queued.get(mac, ttl) == ttl:
+                        self._queued.pop(mac, None)
+            if not response.startswith("Blocked"):
+                logging.error(f"❌ Firewall refused {len(macs)} replayed blocks: {response}")
+                continue
+            for mac in macs:
+                self._remember(mac, ttl)
+            self.stats['replayed'] += len(macs)
+            logging.info(f"📨 Replayed {len(macs)} blocks queued while the firewall was down")
+        return not self._queued
+
+    def _run(self):
+        while True:
+            # Woken by a new queued block or the breaker closing
+            self._wakeup.wait(self.breaker.reset_timeout)
+            self._wakeup.clear()
+            if not self._queued:
+                continue
+            if self.breaker.state == OPEN:
+                # Sleep until the breaker is willing to let a probe through
+                remaining = self.breaker.opened_at + self.breaker.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    time.sleep(remaining)
+            try:
+                self.replay()
+            except Exception as e:
+                logging.error(f"Error replaying queued blocks: {e}")
+
+    def status(self):
+        return {
+            'firewall_mode': 'remote',
+            'firewall_circuit': self.breaker.state,
+            'firewall_circuit_opened': self.breaker.opened,
+            'firewall_fast_failures': self.breaker.rejected,
+            'firewall_queued_blocks': self.queued(),
+            'firewall_replayed_blocks': self.stats['replayed']
+        }
+
+
+class EmbeddedFirewall:
+    """FirewallClient's calls, answered by a BlocklistEngine in this process"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def start(self):
+        return self
+
+    def check(self, mac):
+        with timer('firewall_check_embedded'):
+            return self.engine.is_blocked(mac)
+
+    def block(self, mac, ttl=None):
+        with timer('firewall_block'):
+            success, message = self.engine.block_mac(mac, ttl)
+        if success:
+            return 'blocked'
+        logging.error(f"❌ Firewall refused to block {mac}: {message}")
+        return 'refused'
+
+    def queued(self):
+        return 0
+
+    def pending(self, mac):
+        return False
+
+    def reachable(self):
+        return True
+
+    def status(self):
+        return {
+            'firewall_mode': 'embedded',
+            'firewall_circuit': CLOSED,
+            'firewall_circuit_opened': 0,
+            'firewall_fast_failures': 0,
+            'firewall_queued_blocks': 0,
+            'firewall_replayed_blocks': 0,
+            'blocklist_size': len(self.engine)
+        }
@@ -0,0 +1,282 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+from server_stats import LatencyHistogram, histogram_samples
+from sniffer_supervisor import read_json, write_json
+
+# Per-stage hot-path timing for the sniffer and API processes. Stages are
+# timed with perf_counter() into the firewall's log2 latency histograms, so
+# a timed stage costs about a microsecond; when instrumentation is switched
+# off, timer() returns a shared no-op and costs one global lookup.
+#
+# Each process periodically exports its numbers to logs/metrics/<component>-
+# <pid>.json. The API's /metrics merges those files (the sniffer, other
+# gunicorn workers) with its own live registry and renders Prometheus text.
+# The on/off switch lives in logs/metrics/instrumentation.json and every
+# exporter picks it up within one interval.
+
+METRICS_DIR = os.path.join("logs", "metrics")
+CONTROL_FILE = "instrumentation.json"
+EXPORT_INTERVAL = 5.0
+STALE_AFTER = 3 * EXPORT_INTERVAL   # exports older than this are from dead processes
+DELETE_AFTER = 3600.0
+METRIC_PREFIX = "shakti"
+
+enabled = True
+_exporters = set()
+
+
+class StageMetrics:
+    """Stage latency histograms, error counts and event counters for one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}      # stage -> LatencyHistogram
+        self.errors = {}      # stage -> count
+        self.counters = {}    # name -> count
+
+    def observe(self, stage, seconds, ok=True):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = LatencyHistogram()
+            histogram.observe(seconds)
+            if not ok:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'stages': {stage: {'counts': list(h.counts), 'count': h.count, 'total': h.total}
+                           for stage, h in self.stages.items()},
+                'errors': dict(self.errors),
+                'counters': dict(self.counters)
+            }
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.errors.clear()
+            self.counters.clear()
+
+
+metrics = StageMetrics()
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        metrics.observe(self.stage, time.perf_counter() - self.start, exc_type is None)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+def timer(stage):
+    """`with timer('db_insert'):` - records the block's duration when enabled"""
+    return _Timer(stage) if enabled else NULL_TIMER
+
+
+def timed(stage):
+    """Decorator form of timer()"""
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with _Timer(stage):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorate
+
+
+def observe(stage, seconds):
+    """Record a duration measured elsewhere (e.g. time spent queued)"""
+    if enabled:
+        metrics.observe(stage, seconds)
+
+
+def count(name, amount=1):
+    if enabled:
+        metrics.increment(name, amount)
+
+
+def set_enabled(flag):
+    global enabled
+    enabled = bool(flag)
+
+
+# ============================================
+# Cross-process export
+# ============================================
+
+def set_shared_enabled(flag, directory=METRICS_DIR):
+    """Switch instrumentation for every process sharing `directory`"""
+    os.makedirs(directory, exist_ok=True)
+    write_json(os.path.join(directory, CONTROL_FILE), {'enabled': bool(flag), 'updated_at': time.time()})
+    set_enabled(flag)
+
+
+def sync_enabled(directory=METRICS_DIR):
+    """Apply the shared switch, if one has been set"""
+    control = read_json(os.path.join(directory, CONTROL_FILE))
+    if control is not None:
+        set_enabled(control.get('enabled', True))
+
+
+def export(component, directory=METRICS_DIR, gauges=None, counters=None):
+    """
+    Write this process's numbers where other processes' /metrics can read
+    them. `gauges` and `counters` are optional callables returning extra
+    {name: value} totals kept outside the registry (e.g. frames captured).
+    """
+    os.makedirs(directory, exist_ok=True)
+    report = metrics.snapshot()
+    if counters is not None:
+        report['counters'].update(counters())
+    report.update({
+        'component': component,
+        'pid': os.getpid(),
+        'updated_at': time.time(),
+        'enabled': enabled,
+        'gauges': gauges() if gauges is not None else {}
+    })
+    write_json(os.path.join(directory, f"{component}-{os.getpid()}.json"), report)
+
+
+def start_exporter(component, directory=METRICS_DIR, interval=EXPORT_INTERVAL, gauges=None, counters=None):
+    """Sync the on/off switch and export every `interval` seconds in a daemon thread"""
+    # Keyed by pid: threads don't survive fork, so each gunicorn worker starts its own
+    key = (component, os.getpid())
+    if key in _exporters:
+        return
+    _exporters.add(key)
+    directory = os.path.abspath(directory)
+    sync_enabled(directory)
+
+    def loop():
+        while True:
+            try:
+                sync_enabled(directory)
+                export(component, directory, gauges, counters)
+            except Exception as e:
+                logging.warning(f"Failed to export metrics: {e}")
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="metrics-exporter", daemon=True).start()
+
+
+def collect(directory=METRICS_DIR, now=None):
+    """Fresh exports from other processes; long-dead ones are deleted"""
+    now = time.time() if now is None else now
+    reports = []
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return reports
+    for name in names:
+        if not name.endswith(".json") or name == CONTROL_FILE:
+            continue
+        path = os.path.join(directory, name)
+        report = read_json(path)
+        if report is None or report.get('pid') == os.getpid():
+            continue
+        age = now - report.get('updated_at', 0)
+        if age > DELETE_AFTER:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        elif age <= STALE_AFTER:
+            reports.append(report)
+    return reports
+
+
+def _merge(reports):
+    """Sum stage histograms, errors, counters and gauges per component"""
+    merged = {}
+    for report in reports:
+        component = merged.setdefault(report['component'], {
+            'stages': {}, 'errors': {}, 'counters': {}, 'gauges': {}, 'processes': 0})
+        component['processes'] += 1
+        for stage, data in report.get('stages', {}).items():
+            histogram = component['stages'].get(stage)
+            if histogram is None:
+                histogram = component['stages'][stage] = LatencyHistogram()
+            histogram.counts = [a + b for a, b in zip(histogram.counts, data['counts'])]
+            histogram.count += data['count']
+            histogram.total += data['total']
+        for key in ('errors', 'counters', 'gauges'):
+            for name, value in report.get(key, {}).items():
+                if value is not None:
+                    component[key][name] = component[key].get(name, 0) + value
+    return merged
+
+
+def prometheus(component, directory=METRICS_DIR):
+    """This process's live numbers plus every other process's export, as Prometheus text"""
+    local = metrics.snapshot()
+    local.update({'component': component, 'gauges': {}})
+    merged = _merge([local] + collect(directory))
+    p = METRIC_PREFIX
+
+    lines = [f"# HELP {p}_instrumentation_enabled Whether hot-path instrumentation is on",
+             f"# TYPE {p}_instrumentation_enabled gauge",
+             f"{p}_instrumentation_enabled {int(enabled)}",
+             f"# HELP {p}_processes Processes reporting metrics, by component",
+             f"# TYPE {p}_processes gauge"]
+    lines += [f'{p}_processes{{component="{c}"}} {data["processes"]}' for c, data in sorted(merged.items())]
+
+    lines += [f"# HELP {p}_stage_duration_seconds Time spent in each hot-path stage",
+              f"# TYPE {p}_stage_duration_seconds histogram"]
+    for c, data in sorted(merged.items()):
+        for stage, histogram in sorted(data['stages'].items()):
+            lines += histogram_samples(f"{p}_stage_duration_seconds", f'component="{c}",stage="{stage}"', histogram)
+
+    lines += [f"# HELP {p}_stage_errors_total Stage executions that raised",
+              f"# TYPE {p}_stage_errors_total counter"]
+    for c, data in sorted(merged.items()):
+        lines += [f'{p}_stage_errors_total{{component="{c}",stage="{s}"}} {n}'
+                  for s, n in sorted(data['errors'].items())]
+
+    lines += [f"# HELP {p}_events_total Event counters, by component",
+              f"# TYPE {p}_events_total counter"]
+    for c, data in sorted(merged.items()):
+        lines += [f'{p}_events_total{{component="{c}",event="{e}"}} {n}'
+                  for e, n in sorted(data['counters'].items())]
+
+    lines += [f"# HELP {p}_gauge Point-in-time values reported by each component",
+              f"# TYPE {p}_gauge gauge"]
+    for c, data in sorted(merged.items()):
+        lines += [f'{p}_gauge{{component="{c}",name="{g}"}} {v}'
+                  for g, v in sorted(data['gauges'].items())]
+    return "\n".join(lines) + "\n"
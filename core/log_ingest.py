@@ -0,0 +1,215 @@
+import collections
+import gzip
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from datetime import datetime
+
+# Distributed sensors: a sniffer on each radio host ships its attack events
+# to a central API (POST /logs/ingest) instead of writing a local database.
+#
+# A batch is gzip-compressed NDJSON, one event per line, tagged with the
+# sensor's id and a sequence number in the X-Sensor-Id / X-Batch-Seq headers.
+# The collector records every (sensor, seq) it has stored, so a batch that is
+# retried after a lost response is acknowledged without inserting it twice.
+# When the collector's writers are saturated it answers 503 with Retry-After,
+# and the shipper keeps the batch and backs off. Events keep queuing locally
+# up to max_pending; beyond that the oldest events are dropped and counted.
+
+SENSOR_HEADER = "X-Sensor-Id"
+SEQ_HEADER = "X-Batch-Seq"
+MAX_BATCH_BYTES = 8 * 1024 * 1024      # decompressed
+MAX_BATCH_ROWS = 5000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_PENDING = 50000
+MIN_RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 30.0
+
+
+class BatchError(ValueError):
+    """A batch the collector can never accept (malformed or too large)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_batch(events):
+    """Events (dicts) -> gzip'd NDJSON body"""
+    payload = "".join(json.dumps(event, separators=(',', ':')) + "\n" for event in events)
+    return gzip.compress(payload.encode('utf-8'), compresslevel=5)
+
+
+def decode_batch(body, encoding=None):
+    """
+    Request body -> list of event dicts. Raises BatchError for anything that
+    can't be ingested; decompression is capped so a small body can't expand
+    into an unbounded one.
+    """
+    if encoding and encoding.lower() == "gzip":
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = inflater.decompress(body, MAX_BATCH_BYTES + 1)
+        except zlib.error as e:
+            raise BatchError(f"Invalid gzip body: {e}")
+        if len(body) > MAX_BATCH_BYTES or inflater.unconsumed_tail:
+            raise BatchError(f"Batch exceeds {MAX_BATCH_BYTES} bytes uncompressed", 413)
+    elif encoding and encoding.lower() != "identity":
+        raise BatchError(f"Unsupported Content-Encoding: {encoding}", 415)
+    elif len(body) > MAX_BATCH_BYTES:
+        raise BatchError(f"Batch exceeds {MAX_BATCH_BYTES} bytes", 413)
+
+    events = []
+    for number, line in enumerate(body.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            raise BatchError(f"Line {number} is not valid JSON")
+        if not isinstance(event, dict) or not isinstance(event.get('mac'), str):
+            raise BatchError(f"Line {number} needs at least a \"mac\" field")
+        events.append(event)
+        if len(events) > MAX_BATCH_ROWS:
+            raise BatchError(f"Batch exceeds {MAX_BATCH_ROWS} events", 413)
+    return events
+
+
+def event_row(event):
+    """Event dict -> (timestamp, mac, signal, channel, message) for the logs table"""
+    ts = event.get('ts')
+    try:
+        timestamp = datetime.fromtimestamp(float(ts)).strftime("%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError, OverflowError, OSError):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return (timestamp, event['mac'], str(event.get('signal', "?")),
+            str(event.get('channel', "Unknown")), str(event.get('message', "")))
+
+
+class LogShipper:
+    """Batches attack events and POSTs them to a collector's /logs/ingest"""
+
+    def __init__(self, url, sensor_id, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_pending=DEFAULT_MAX_PENDING, timeout=10.0, token=None):
+        self.url = url
+        self.sensor_id = sensor_id
+        self.token = token
+        self.batch_size = min(batch_size, MAX_BATCH_ROWS)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.timeout = timeout
+        # Unique per sensor across restarts without keeping state on disk
+        self.seq = int(time.time() * 1000)
+        self.stats = {'shipped': 0, 'batches': 0, 'retries': 0, 'dropped': 0, 'rejected': 0}
+        self._pending = collections.deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Ship what is queued (within timeout), then stop"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, mac, signal, channel, message, blockchain=True):
+        """Queue one event (never blocks the packet path)"""
+        event = {'ts': time.time(), 'mac': mac, 'signal': signal, 'channel': channel, 'message': message}
+        if not blockchain:
+            event['blockchain'] = False
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.stats['dropped'] += 1
+            self._pending.append(event)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def pending(self):
+        return len(self._pending)
+
+    def counters(self):
+        with self._cond:
+            return {f"ingest_{name}": value for name, value in self.stats.items()}
+
+    def _take_batch(self):
+        with self._cond:
+            if not self._pending and not self._stopping:
+                self._cond.wait(self.flush_interval)
+            elif len(self._pending) < self.batch_size and not self._stopping:
+                # Give a partial batch the rest of the interval to fill up
+                self._cond.wait(self.flush_interval)
+            count = min(len(self._pending), self.batch_size)
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self.seq += 1
+                self._deliver(batch, self.seq)
+            elif self._stopping:
+                return
+
+    def _deliver(self, batch, seq):
+        """Send until acknowledged; the same seq makes retries safe"""
+        body = encode_batch(batch)
+        delay = MIN_RETRY_DELAY
+        while True:
+            try:
+                status, retry_after = self.send(body, seq)
+            except (OSError, urllib.error.URLError) as e:
+                status, retry_after = None, None
+                logging.warning(f"⚠️  Log shipping to {self.url} failed ({e}), retrying in {delay:g}s")
+            if status is not None and 200 <= status < 300:
+                with self._cond:
+                    self.stats['batches'] += 1
+                    self.stats['shipped'] += len(batch)
+                return
+            if status is not None and 400 <= status < 500 and status != 429:
+                logging.error(f"❌ Collector rejected batch {seq} ({status}); dropping {len(batch)} events")
+                with self._cond:
+                    self.stats['rejected'] += len(batch)
+                return
+            with self._cond:
+                if self._stopping:
+                    logging.warning(f"⚠️  Stopping with batch {seq} undelivered ({len(batch)} events)")
+                    self.stats['dropped'] += len(batch)
+                    return
+                self.stats['retries'] += 1
+                # stop() cuts the wait short for one last attempt
+                self._cond.wait(retry_after if retry_after is not None else delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def send(self, body, seq):
+        """POST one encoded batch; returns (status, Retry-After seconds or None)"""
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "Content-Type": "application/x-ndjson",
+            "Content-Encoding": "gzip",
+            SENSOR_HEADER: self.sensor_id,
+            SEQ_HEADER: str(seq)
+        })
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, None
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            try:
+                retry_after = min(float(retry_after), MAX_RETRY_DELAY) if retry_after else None
+            except ValueError:
+                retry_after = None
+            return e.code, retry_after
@@ -1,52 +1,202 @@
 from scapy.all import sniff, Dot11Deauth
 import yaml
-from database import insert_log_hybrid
+from database import insert_log, insert_log_hybrid
+import blockchain_backend
+import argparse
 import logging
+import os
+import queue
 import socket
+import sys
+import threading
+import time
+from sniffer_supervisor import PidLock, run_files, write_json
+import instrumentation
+import profiler
+from threat_score import ThreatPolicy, ThreatTable
+from sketches import FloodDetector
+from log_ingest import LogShipper
+from firewall_client import CLOSED, CircuitBreaker, EmbeddedFirewall, FirewallClient
+from instrumentation import timer
 
-try:
-    with open("config.yaml") as f:
-        config = yaml.safe_load(f)
-    interface = config.get('interface')
-    log_level = getattr(logging, config.get('log_level', 'INFO').upper(), logging.INFO)
-except Exception as e:
-    logging.basicConfig(level=logging.INFO)
-    logging.error(f"Failed to load config.yaml: {e}")
-    exit(1)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+from blocklist_replica import BlocklistReplica
+from blocklist_mmap import MmapBlocklist
+from blocklist_engine import embedded_in
 
-logging.basicConfig(level=log_level)
+# Module defaults; main() fills them from config.yaml. Keeping start-up out of
+# import time lets the benchmarks and tests drive handle_packet() directly.
+interface = None
+auto_block_ttl = 3600          # auto-blocks expire after this many seconds (0 = permanent)
+firewall_address = ("127.0.0.1", 9000)
+# CHECK/BLOCK over TCP behind a circuit breaker (rebuilt by load_config), or
+# an EmbeddedFirewall when this process hosts the blocklist engine
+firewall = FirewallClient(firewall_address)
+engine = None
+replica = None
+shared_blocklist = None
+# Set when config.yaml names a central collector (log_ingest_url)
+shipper = None
+run_paths = None
 
-if not interface:
-    logging.error("No interface specified in config.yaml.")
-    exit(1)
+# Capture only enqueues; DB writes and firewall calls happen on a worker so a
+# slow disk or firewall doesn't make us miss frames
+QUEUE_SIZE = 10000
+STATS_INTERVAL = 2.0
+packet_queue = queue.Queue(maxsize=QUEUE_SIZE)
+counters = {'frames': 0, 'deauth_frames': 0, 'dropped': 0, 'block_requests': 0, 'flood_frames': 0}
+# Per-MAC RSSI/rate state deciding when to block (configured in load_config)
+threat_table = ThreatTable()
+# Fixed-memory sketches spotting floods from randomized sender MACs; their
+# events are logged with this in place of an attacker MAC
+flood_detector = FloodDetector()
+FLOOD_SOURCE = "randomized"
+started_at = time.time()
 
 def is_mac_blocked(mac):
     """Check if MAC is in the firewall blocklist (Windows-friendly)"""
-    try:
-        with socket.create_connection(("127.0.0.1", 9000), timeout=2) as sock:
-            sock.sendall(f"CHECK {mac}\n".encode())
-            response = sock.recv(1024).decode().strip()
-            return "BLOCKED" in response
-    except Exception as e:
-        logging.warning(f"(Firewall check failed, assuming not blocked) {e}")
-        return False
+    # Blocks decided while the firewall was unreachable only exist here until replayed
+    if firewall.pending(mac):
+        return True
+    blocked = None
+    if shared_blocklist is not None and shared_blocklist.ready:
+        with timer('firewall_check_mmap'):
+            blocked = shared_blocklist.is_blocked(mac)
+    elif replica is not None and replica.ready:
+        with timer('firewall_check_replica'):
+            blocked = replica.is_blocked(mac)
+    # The mmap file and the replica freeze when the firewall goes down, so
+    # "not blocked" from them only counts while it is reachable
+    if blocked or (blocked is not None and firewall.reachable()):
+        return blocked
+    # Fails fast (cached answer) while the firewall is unreachable
+    return firewall.check(mac)
 
 def auto_block_attacker(mac, signal):
-    """Add attacker to the firewall blocklist if signal is strong (simulated block for Windows)"""
+    """Score the frame; ask the firewall to block once the MAC's threat score says so"""
     try:
         signal_strength = int(signal)
-        if signal_strength > -50:
-            logging.warning(f"🚨 Strong signal ({signal_strength} dBm) detected for {mac}. Attempting to block.")
-            try:
-                with socket.create_connection(("127.0.0.1", 9000), timeout=2) as sock:
-                    sock.sendall(f"{mac}\n".encode())
-                    response = sock.recv(1024).decode().strip()
-                    if "Blocked" in response:
-                        logging.info(f"✅ BLOCKED: {mac}")
-            except Exception as e:
-                logging.error(f"❌ Failed to block {mac}: {e}")
-    except Exception as e:
+    except (TypeError, ValueError) as e:
         logging.warning(f"(Signal parse failed: {signal}) {e}")
+        return
+
+    state, block = threat_table.observe(mac, signal_strength)
+    if not block:
+        return
+    logging.warning(f"🚨 {mac}: {state.ewma_rssi:.0f} dBm average, {state.rate:.1f} deauth/s "
+                    f"over {state.frames} frames. Attempting to block.")
+    counters['block_requests'] += 1
+    result = firewall.block(mac, auto_block_ttl or None)
+    if result == 'blocked':
+        threat_table.blocked(mac)
+        logging.info(f"✅ BLOCKED: {mac}")
+    elif result == 'queued':
+        # Decided; the firewall gets it when it comes back
+        threat_table.blocked(mac)
+        logging.warning(f"📥 Firewall down, block of {mac} queued for replay")
+    else:
+        threat_table.block_failed(mac)
+
+def capture_packet(pkt):
+    counters['frames'] += 1
+    if instrumentation.enabled:
+        # Kernel timestamp -> callback: socket buffering plus scapy dissection
+        instrumentation.observe('capture_lag', time.time() - float(pkt.time))
+    if pkt.haslayer(Dot11Deauth):
+        counters['deauth_frames'] += 1
+        try:
+            packet_queue.put_nowait((time.perf_counter(), pkt))
+        except queue.Full:
+            counters['dropped'] += 1
+
+def process_packets():
+    while True:
+        queued_at, pkt = packet_queue.get()
+        instrumentation.observe('queue_wait', time.perf_counter() - queued_at)
+        try:
+            with timer('handle_packet'):
+                handle_packet(pkt)
+        except Exception as e:
+            logging.error(f"Error handling packet: {e}")
+        finally:
+            packet_queue.task_done()
+
+def sniffer_gauges():
+    gauges = {'queue_backlog': packet_queue.qsize(), 'threat_table_size': len(threat_table),
+              'active_floods': flood_detector.active_floods()}
+    status = firewall.status()
+    gauges['firewall_circuit_open'] = int(status['firewall_circuit'] != CLOSED)
+    gauges['firewall_queued_blocks'] = status['firewall_queued_blocks']
+    if shipper is not None:
+        gauges['ingest_pending'] = shipper.pending()
+    return gauges
+
+def sniffer_counters():
+    totals = dict(counters)
+    status = firewall.status()
+    totals['firewall_fast_failures'] = status['firewall_fast_failures']
+    totals['firewall_replayed_blocks'] = status['firewall_replayed_blocks']
+    if shipper is not None:
+        totals.update(shipper.counters())
+    return totals
+
+def log_event(mac, signal, channel, message, blockchain=True):
+    """Record an attack locally (SQLite + blockchain) or queue it for the collector"""
+    if shipper is not None:
+        shipper.submit(mac, signal, channel, message, blockchain)
+    elif blockchain:
+        insert_log_hybrid(mac, signal, channel, message)
+    else:
+        insert_log(mac, signal, channel, message)
+
+def write_stats():
+    """Publish frames/s and queue backlog for the supervisor's /status"""
+    last_frames, last_time = 0, started_at
+    while True:
+        time.sleep(STATS_INTERVAL)
+        # Floods end even if the attacker goes quiet
+        for kind, target, stats in flood_detector.tick():
+            record_flood_event(kind, target, stats)
+        now, frames = time.time(), counters['frames']
+        try:
+            write_json(run_paths['stats'], {
+                'pid': os.getpid(),
+                'interface': interface,
+                'started_at': started_at,
+                'updated_at': now,
+                'frames': frames,
+                'frames_per_sec': round((frames - last_frames) / (now - last_time), 1),
+                'deauth_frames': counters['deauth_frames'],
+                'queue_backlog': packet_queue.qsize(),
+                'dropped': counters['dropped'],
+                'block_requests': counters['block_requests'],
+                'flood_frames': counters['flood_frames'],
+                'active_floods': flood_detector.active_floods(),
+                'firewall': firewall.status(),
+                'top_threats': threat_table.top(5)
+            })
+        except OSError as e:
+            logging.warning(f"Failed to write sniffer stats: {e}")
+        last_frames, last_time = frames, now
+
+def flood_target(pkt, sender):
+    """The BSSID being attacked, or the receiver when the sender spoofs the AP"""
+    bssid = getattr(pkt, 'addr3', None)
+    return bssid if bssid and bssid != sender else getattr(pkt, 'addr1', "Unknown")
+
+def record_flood_event(kind, target, stats, signal="?", channel="Unknown"):
+    # The mac column is the attacker everywhere (and gets a Block button); the
+    # target is the victim AP or client, so it only goes in the message
+    if kind == 'flood_started':
+        msg = (f"Randomized-source deauth flood against {target}: ~{stats['distinct_senders']} senders, "
+               f"{stats['frames']} frames in {stats['duration']:.0f}s")
+        logging.warning(f"🌊 {msg}")
+        log_event(FLOOD_SOURCE, signal, channel, msg)
+    else:
+        msg = (f"Randomized-source deauth flood against {target} ended: ~{stats['distinct_senders']} senders, "
+               f"{stats['frames']} frames over {stats['duration']:.0f}s")
+        logging.warning(f"🌊 {msg}")
+        log_event(FLOOD_SOURCE, signal, channel, msg, blockchain=False)
 
 def handle_packet(pkt):
     if pkt.haslayer(Dot11Deauth):
@@ -67,23 +217,128 @@ def handle_packet(pkt):
 
         msg = "DeAuthentication"
 
+        # Randomized-source floods become one aggregate event, not a row per fake MAC
+        aggregate, events = flood_detector.observe(mac, flood_target(pkt, mac))
+        for kind, target, stats in events:
+            record_flood_event(kind, target, stats, signal, channel_val)
+        if aggregate:
+            counters['flood_frames'] += 1
+            return
+
         # Check if the MAC is already blocked
         if is_mac_blocked(mac):
             logging.info(f"⚠️  Ignoring packet from already-blocked MAC: {mac}")
             return
 
-        # Hybrid log (SQLite + Blockchain)
-        insert_log_hybrid(mac, signal, channel_val, msg)
+        # Hybrid log (SQLite + Blockchain), or shipped to the central collector
+        log_event(mac, signal, channel_val, msg)
 
         # Auto-block if strong signal
         auto_block_attacker(mac, signal)
 
         logging.info(f"🚨 DeAuth Detected: MAC={mac}, Signal={signal}, Channel={channel_val}")
 
-logging.info(f"[*] Starting Wi-Fi sniffing on interface: {interface}")
-try:
-    sniff(prn=handle_packet, iface=interface, store=0)
-except KeyboardInterrupt:
-    logging.info("[*] Sniffing stopped by user.")
-except Exception as e:
-    logging.error(f"Error during sniffing: {e}")
+def load_config(path="config.yaml"):
+    global interface, auto_block_ttl, firewall_address, firewall, packet_queue, threat_table, flood_detector
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    interface = config.get('interface')
+    auto_block_ttl = config.get('auto_block_ttl', 3600)
+    firewall_address = (config.get('firewall_host', "127.0.0.1"), config.get('firewall_port', 9000))
+    breaker = CircuitBreaker(failure_threshold=config.get('firewall_breaker_failures', 3),
+                             reset_timeout=config.get('firewall_breaker_reset', 5.0))
+    firewall = FirewallClient(firewall_address, timeout=config.get('firewall_timeout', 2.0), breaker=breaker)
+    packet_queue = queue.Queue(maxsize=config.get('sniffer_queue_size', QUEUE_SIZE))
+    threat_table = ThreatTable(ThreatPolicy.from_config(config), config.get('threat_table_size', 10000))
+    flood_detector = FloodDetector.from_config(config)
+    # Loaded lazily on the first attack ("none" disables blockchain logging)
+    blockchain_backend.configure(config.get('blockchain_backend', 'algorand'))
+    # Per-stage timings for /metrics; switchable at runtime from the API
+    instrumentation.set_enabled(config.get('instrumentation', True))
+    return config
+
+def main():
+    global interface, firewall, engine, replica, shared_blocklist, shipper, run_paths
+    try:
+        config = load_config()
+        log_level = getattr(logging, config.get('log_level', 'INFO').upper(), logging.INFO)
+    except Exception as e:
+        logging.basicConfig(level=logging.INFO)
+        logging.error(f"Failed to load config.yaml: {e}")
+        exit(1)
+
+    logging.basicConfig(level=log_level)
+
+    parser = argparse.ArgumentParser(description="Shakti deauth sniffer")
+    parser.add_argument("--interface", help="override the interface from config.yaml")
+    parser.add_argument("--profile", action="store_true",
+                        help="run the sampling profiler, writing collapsed stacks to logs/profiles")
+    parser.add_argument("--profile-dump", type=float, default=profiler.DUMP_INTERVAL,
+                        help="seconds between profile files in --profile mode")
+    args = parser.parse_args()
+    interface = args.interface or interface
+
+    if not interface:
+        logging.error("No interface specified in config.yaml.")
+        exit(1)
+
+    # One sniffer per interface, however it was started (released by the OS on exit)
+    run_paths = run_files(interface)
+    instance_lock = PidLock(run_paths['sniffer_lock'])
+    if not instance_lock.acquire():
+        logging.error(f"Sniffer already running on {interface} (pid {instance_lock.pid()})")
+        exit(3)
+
+    if embedded_in(config) == 'sniffer':
+        # Single host: this process owns the blocklist, checks are function calls
+        import firewall_server
+        try:
+            engine = firewall_server.start_embedded(config)
+        except OSError as e:
+            logging.error(f"Can't host the firewall on {firewall_address[0]}:{firewall_address[1]} "
+                          f"(is firewall_server.py running?): {e}")
+            exit(1)
+        firewall = EmbeddedFirewall(engine)
+    else:
+        # Answer blocklist checks from a local replica fed by the firewall's WATCH stream
+        if config.get('blocklist_replica', True):
+            replica = BlocklistReplica(*firewall_address).start()
+        # On the firewall's host, search its memory-mapped blocklist directly ("" to disable)
+        mmap_path = config.get('blocklist_mmap', "logs/blocked_macs.mmap")
+        if mmap_path:
+            shared_blocklist = MmapBlocklist(mmap_path)
+
+    # Sensor mode: batch events to a central API instead of the local database
+    if config.get('log_ingest_url'):
+        shipper = LogShipper(config['log_ingest_url'], config.get('sensor_id') or socket.gethostname(),
+                             batch_size=config.get('ingest_batch_size', 500),
+                             flush_interval=config.get('ingest_flush_interval', 1.0),
+                             token=config.get('ingest_token')).start()
+        logging.info(f"📤 Shipping events to {shipper.url} as sensor {shipper.sensor_id}")
+        if not config.get('ingest_token'):
+            logging.warning("⚠️  No ingest_token set: the collector refuses unauthenticated batches")
+
+    firewall.start()
+
+    logging.info(f"[*] Starting Wi-Fi sniffing on interface: {interface}")
+    threading.Thread(target=process_packets, name="packet-worker", daemon=True).start()
+    threading.Thread(target=write_stats, name="sniffer-stats", daemon=True).start()
+    instrumentation.start_exporter("sniffer", gauges=sniffer_gauges, counters=sniffer_counters)
+    # On-demand captures: SIGUSR2 or POST /profile on the API
+    profiler.watch_triggers("sniffer")
+    if args.profile or config.get('profile', False):
+        profiler.SamplingProfiler("sniffer").start(dump_interval=args.profile_dump)
+    try:
+        sniff(prn=capture_packet, iface=interface, store=0)
+    except KeyboardInterrupt:
+        logging.info("[*] Sniffing stopped by user.")
+        if shipper is not None:
+            shipper.stop()
+        if engine is not None:
+            engine.stop()
+    except Exception as e:
+        logging.error(f"Error during sniffing: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
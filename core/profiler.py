@@ -0,0 +1,270 @@
+import argparse
+import collections
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+# Statistical sampling profiler for the sniffer and API. A daemon thread
+# snapshots every other thread's Python stack (sys._current_frames()) a few
+# hundred times a second and counts identical stacks; nothing is hooked into
+# the code being profiled, so the overhead is the sampler thread's own CPU
+# (~1-2% at the default 5 ms interval).
+#
+# Output is the "collapsed stack" format used by flamegraph.pl, speedscope and
+# inferno: one `thread;outer;...;leaf count` line per distinct stack, plus a
+# .json sidecar with the run's metadata. The benchmark suite writes the same
+# format, so `python profiler.py diff` can compare a production capture with a
+# benchmark run.
+#
+# Profiles are taken three ways:
+#   --profile                 continuous, a file every --profile-dump seconds
+#   SIGUSR2 (POSIX)           capture the next TRIGGER_SECONDS
+#   POST /profile (the API)   capture the API process, or the sniffer through a
+#                             trigger file it polls
+
+PROFILE_DIR = os.path.join("logs", "profiles")
+SAMPLE_INTERVAL = 0.005
+DUMP_INTERVAL = 60.0
+TRIGGER_SECONDS = 10.0
+TRIGGER_POLL = 1.0
+MAX_CAPTURE_SECONDS = 300.0
+
+
+class SamplingProfiler:
+    """Samples all threads' stacks into collapsed-stack counts"""
+
+    def __init__(self, name, interval=SAMPLE_INTERVAL, directory=PROFILE_DIR):
+        self.name = name
+        self.interval = interval
+        self.directory = directory
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.started_at = None
+        self._frames = {}     # code object -> "func (file:line)"
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _label(self, code):
+        label = self._frames.get(code)
+        if label is None:
+            label = self._frames[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def sample(self):
+        """Record one snapshot of every thread except the sampler"""
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)).replace(";", ":"))
+            stacks.append(";".join(reversed(stack)))
+        with self._lock:
+            self.stacks.update(stacks)
+            self.samples += 1
+
+    def _run(self, dump_interval):
+        next_dump = time.monotonic() + dump_interval if dump_interval else None
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                # A thread can be torn down mid-walk; lose one sample, not the profiler
+                logging.debug(f"Profiler sample failed: {e}")
+            if next_dump is not None and time.monotonic() >= next_dump:
+                self.dump()
+                next_dump = time.monotonic() + dump_interval
+
+    def start(self, dump_interval=None):
+        """Sample in the background; with dump_interval, write and reset a file that often"""
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(dump_interval,), name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self):
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def dump(self, reset=True):
+        """Write the samples so far to <dir>/<name>-<pid>-<time>.collapsed (+ .json); returns the path"""
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        with self._lock:
+            stacks, samples, started = self.stacks, self.samples, self.started_at
+            if reset:
+                self.stacks, self.samples, self.started_at = collections.Counter(), 0, now
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        path = os.path.join(self.directory, f"{self.name}-{os.getpid()}-{stamp}.collapsed")
+        with open(path, "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        with open(path[:-len(".collapsed")] + ".json", "w") as f:
+            json.dump({
+                'name': self.name,
+                'pid': os.getpid(),
+                'started_at': started,
+                'ended_at': now,
+                'interval': self.interval,
+                'samples': samples,
+                'stacks': len(stacks)
+            }, f, indent=2)
+        logging.info(f"📊 Profile written: {path} ({samples} samples)")
+        return path
+
+
+# One on-demand capture per process at a time
+_capturing = threading.Lock()
+
+
+def _capture(name, seconds, directory, interval=SAMPLE_INTERVAL):
+    profiler = SamplingProfiler(name, interval, directory).start()
+    time.sleep(min(seconds, MAX_CAPTURE_SECONDS))
+    profiler.stop()
+    return profiler.dump()
+
+
+def capture(name, seconds=TRIGGER_SECONDS, directory=PROFILE_DIR, interval=SAMPLE_INTERVAL):
+    """Profile this process for `seconds` and write the result; blocks the caller.
+    Returns None without profiling if a capture is already running."""
+    if not _capturing.acquire(blocking=False):
+        logging.warning(f"📊 Profile capture already running, ignoring request for {name}")
+        return None
+    try:
+        return _capture(name, seconds, directory, interval)
+    finally:
+        _capturing.release()
+
+
+def capture_async(name, seconds=TRIGGER_SECONDS, directory=PROFILE_DIR):
+    """Capture from a background thread; False if a capture is already running"""
+    if not _capturing.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            _capture(name, seconds, directory)
+        finally:
+            _capturing.release()
+
+    threading.Thread(target=run, name="profile-capture", daemon=True).start()
+    return True
+
+
+def capture_pending(name, directory=PROFILE_DIR):
+    """Has a capture been requested from `name` that it hasn't picked up yet?"""
+    return os.path.exists(trigger_file(name, directory))
+
+
+# ============================================
+# Triggers
+# ============================================
+
+def trigger_file(name, directory=PROFILE_DIR):
+    return os.path.join(directory, f"trigger-{name}.json")
+
+
+def request_capture(name, seconds=TRIGGER_SECONDS, directory=PROFILE_DIR):
+    """Ask another process (watching with watch_triggers) to profile itself"""
+    os.makedirs(directory, exist_ok=True)
+    path = trigger_file(name, directory)
+    with open(path + ".tmp", "w") as f:
+        json.dump({'seconds': seconds, 'requested_at': time.time()}, f)
+    os.replace(path + ".tmp", path)
+
+
+def watch_triggers(name, directory=PROFILE_DIR, poll=TRIGGER_POLL):
+    """Capture whenever a trigger file appears; also on SIGUSR2 when called from the main thread"""
+    directory = os.path.abspath(directory)
+    path = trigger_file(name, directory)
+
+    def loop():
+        while True:
+            time.sleep(poll)
+            try:
+                with open(path) as f:
+                    request = json.load(f)
+                os.remove(path)
+                seconds = float(request.get('seconds', TRIGGER_SECONDS))
+            except (OSError, ValueError, TypeError, AttributeError):
+                continue
+            logging.info(f"📊 Profiling {name} for {seconds:.0f}s (requested)")
+            capture(name, seconds, directory)
+
+    threading.Thread(target=loop, name="profile-trigger", daemon=True).start()
+
+    try:
+        import signal
+        if hasattr(signal, 'SIGUSR2') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR2, lambda *_: capture_async(name, TRIGGER_SECONDS, directory))
+    except ValueError:
+        pass
+
+
+# ============================================
+# Reading profiles
+# ============================================
+
+def load_collapsed(path):
+    stacks = collections.Counter()
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+def self_time(stacks, skip_threads=True):
+    """Share of samples whose leaf is each function"""
+    totals = collections.Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        if skip_threads and len(frames) > 1:
+            frames = frames[1:]
+        totals[frames[-1]] += count
+    total = sum(totals.values()) or 1
+    return {frame: count / total for frame, count in totals.items()}
+
+
+def diff(before, after, limit=20):
+    """Functions whose share of samples changed most between two profiles"""
+    a, b = self_time(before), self_time(after)
+    changes = [(frame, a.get(frame, 0.0), b.get(frame, 0.0)) for frame in set(a) | set(b)]
+    changes.sort(key=lambda change: abs(change[2] - change[1]), reverse=True)
+    return changes[:limit]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect and compare collapsed-stack profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    top = sub.add_parser("top", help="functions with the most self samples")
+    top.add_argument("profile")
+    top.add_argument("--limit", type=int, default=20)
+    compare = sub.add_parser("diff", help="compare two profiles (e.g. a benchmark run and a production capture)")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "top":
+        shares = self_time(load_collapsed(args.profile))
+        for frame, share in sorted(shares.items(), key=lambda item: item[1], reverse=True)[:args.limit]:
+            print(f"{share:7.2%}  {frame}")
+    else:
+        for frame, before, after in diff(load_collapsed(args.before), load_collapsed(args.after), args.limit):
+            print(f"{before:7.2%} -> {after:7.2%}  ({after - before:+7.2%})  {frame}")
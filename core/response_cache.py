@@ -0,0 +1,84 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, request
+
+# Response cache for the dashboard endpoints. Each cached response is keyed on
+# the endpoint, its query string and a cheap "version" of the data behind it
+# (latest log rowid, blocklist file mtimes). Unchanged data is answered from
+# memory, and clients that send back the ETag get an empty 304 Not Modified,
+# so an idle dashboard costs one version probe per poll.
+
+DEFAULT_MAX_ENTRIES = 128
+
+
+class ResponseCache:
+    """LRU cache of serialised JSON responses with ETag revalidation"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (etag, body, valid_until)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def _etag(key, valid_until):
+        # Deterministic, so every worker process hands out the same ETag
+        return hashlib.sha1(repr((key, valid_until)).encode('utf-8')).hexdigest()[:20]
+
+    def respond(self, name, version, build, valid_until=None):
+        """
+        Serve `build()` as JSON, cached until `version` changes.
+
+        `valid_until(data)` may return a timestamp after which the cached
+        response is stale even though the version is unchanged (e.g. the
+        earliest blocklist expiry).
+        """
+        key = (name, request.query_string, version)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[2] is None or entry[2] > now):
+                self._entries.move_to_end(key)
+            else:
+                entry = None
+
+        if entry is None:
+            data = build()
+            until = valid_until(data) if valid_until is not None else None
+            entry = (self._etag(key, until), json.dumps(data).encode('utf-8'), until)
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        else:
+            with self._lock:
+                self.hits += 1
+
+        etag, body, _ = entry
+        if etag in request.if_none_match:
+            with self._lock:
+                self.not_modified += 1
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        # Always revalidate, but let the browser keep the body for 304s
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified
+            }
@@ -0,0 +1,233 @@
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# Fixed-memory streaming summaries for MAC-randomizing deauth floods.
+#
+# A flood tool that puts a fresh random addr2 on every frame turns per-MAC
+# bookkeeping into unbounded growth: one DB row, one threat-table entry and
+# potentially one blocklist entry per frame. Instead, FloodDetector watches
+# each target BSSID with a HyperLogLog of distinct senders per time window and
+# a shared count-min sketch of per-sender frame counts. A target receiving
+# many frames from mostly distinct senders is under a randomized-source flood;
+# while it lasts, frames from one-off senders are folded into a single
+# aggregate event, and memory stays the same however many fake MACs we see.
+#
+# "One-off" is judged over a short sender window (1 s by default), and the
+# count-min sketch is sized for max_rate frames in that window, so a flood
+# faster than the sketch was built for can't saturate it into calling every
+# fake MAC a repeat sender.
+
+MASK64 = (1 << 64) - 1
+
+
+def _hash64(key):
+    # Python's string hash is a keyed 64-bit SipHash: well mixed, and fast
+    # because it is cached on the string object
+    return hash(key) & MASK64
+
+
+class CountMinSketch:
+    """
+    Frequency estimates that never undercount. With conservative update (only
+    the smallest counters are raised) the overcount stays well under the
+    classic 2N/width bound, which matters when most keys are seen once.
+    """
+
+    def __init__(self, width=4096, depth=4):
+        self.width = width
+        self.depth = depth
+        self.clear()
+
+    def _indexes(self, key):
+        h = _hash64(key)
+        h1, h2 = h & 0xffffffff, h >> 32
+        # Kirsch-Mitzenmacher: depth indexes from one 64-bit hash
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key, count=1):
+        """Count `key` and return its new estimate"""
+        cells = list(zip(self.tables, self._indexes(key)))
+        estimate = min(table[index] for table, index in cells) + count
+        for table, index in cells:
+            if table[index] < estimate:
+                table[index] = estimate
+        self.total += count
+        return estimate
+
+    def estimate(self, key):
+        return min(table[index] for table, index in zip(self.tables, self._indexes(key)))
+
+    def clear(self):
+        self.tables = [array('I', bytes(array('I').itemsize * self.width)) for _ in range(self.depth)]
+        self.total = 0
+
+
+class HyperLogLog:
+    """Distinct-count estimate in 2**precision bytes (~1.04/sqrt(2**precision) error)"""
+
+    def __init__(self, precision=10):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        self._rest_bits = 64 - precision
+        self._alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, key):
+        h = _hash64(key)
+        index = h >> self._rest_bits
+        rest = h & ((1 << self._rest_bits) - 1)
+        rank = self._rest_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        registers = self.registers
+        estimate = self._alpha * self.m * self.m / sum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small-range correction: linear counting
+            return self.m * math.log(self.m / zeros)
+        return estimate
+
+    def merge(self, other):
+        registers = self.registers
+        for index, rank in enumerate(other.registers):
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def clear(self):
+        self.registers = bytearray(self.m)
+
+
+class _TargetWindow:
+    __slots__ = ('frames', 'senders', 'flooding', 'flood_started', 'flood_frames', 'flood_senders')
+
+    def __init__(self, precision):
+        self.frames = 0
+        self.senders = HyperLogLog(precision)
+        self.flooding = False
+        self.flood_started = None
+        self.flood_frames = 0
+        self.flood_senders = None
+
+
+class FloodDetector:
+    """
+    Per-target randomized-source flood detection in bounded memory.
+
+    observe() returns (aggregate, events): aggregate is True when the frame
+    belongs to an active flood and comes from a one-off sender, so the
+    caller should count it instead of logging or scoring it. events are
+    ('flood_started' | 'flood_ended', target, stats) tuples to record.
+    """
+
+    CHECK_EVERY = 16   # HLL counts cost O(2**precision); don't evaluate every frame
+
+    def __init__(self, window=10.0, min_frames=50, min_distinct_ratio=0.5, one_off_max=2,
+                 max_targets=256, max_rate=10000, sender_window=1.0, cms_width=None, cms_depth=4,
+                 hll_precision=10):
+        self.window = window
+        self.min_frames = min_frames
+        self.min_distinct_ratio = min_distinct_ratio
+        self.one_off_max = one_off_max
+        self.max_targets = max_targets
+        self.hll_precision = hll_precision
+        self.sender_window = min(sender_window, window)
+        if cms_width is None:
+            # ~4 counters per frame the sender window can hold at max_rate
+            cms_width = 1 << max(10, math.ceil(math.log2(4 * max_rate * self.sender_window)))
+        self.senders = CountMinSketch(cms_width, cms_depth)
+        self.targets = OrderedDict()
+        self.window_end = None
+        self.senders_end = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(window=config.get('flood_window', 10.0),
+                   min_frames=config.get('flood_min_frames', 50),
+                   min_distinct_ratio=config.get('flood_min_distinct_ratio', 0.5),
+                   max_targets=config.get('flood_max_targets', 256),
+                   max_rate=config.get('flood_max_rate', 10000))
+
+    def _flood_condition(self, target):
+        return (target.frames >= self.min_frames
+                and target.senders.count() >= self.min_distinct_ratio * target.frames)
+
+    def _stats(self, key, target, now):
+        return {
+            'target': key,
+            'frames': target.flood_frames,
+            'distinct_senders': round(target.flood_senders.count()),
+            'duration': round(now - target.flood_started, 1)
+        }
+
+    def _rotate(self, now, events):
+        """Close the window: end floods that no longer meet the condition, reset counts"""
+        for key, target in list(self.targets.items()):
+            if target.flooding and not self._flood_condition(target):
+                events.append(('flood_ended', key, self._stats(key, target, now)))
+                target.flooding = False
+                target.flood_senders = None
+            if not target.flooding and target.frames == 0:
+                del self.targets[key]
+                continue
+            target.frames = 0
+            target.senders.clear()
+        self.window_end = now + self.window
+
+    def tick(self, now=None):
+        """Rotate an expired window even when no frames arrive; returns events"""
+        now = time.monotonic() if now is None else now
+        events = []
+        with self._lock:
+            if self.window_end is not None and now >= self.window_end:
+                self._rotate(now, events)
+        return events
+
+    def observe(self, sender, target_key, now=None):
+        now = time.monotonic() if now is None else now
+        events = []
+        with self._lock:
+            if self.window_end is None:
+                self.window_end = now + self.window
+            elif now >= self.window_end:
+                self._rotate(now, events)
+            if self.senders_end is None or now >= self.senders_end:
+                self.senders.clear()
+                self.senders_end = now + self.sender_window
+
+            target = self.targets.get(target_key)
+            if target is None:
+                target = self.targets[target_key] = _TargetWindow(self.hll_precision)
+                if len(self.targets) > self.max_targets:
+                    key, evicted = self.targets.popitem(last=False)
+                    if evicted.flooding:
+                        events.append(('flood_ended', key, self._stats(key, evicted, now)))
+            else:
+                self.targets.move_to_end(target_key)
+
+            target.frames += 1
+            target.senders.add(sender)
+            sender_frames = self.senders.add(sender)
+
+            if target.flooding:
+                target.flood_frames += 1
+                target.flood_senders.add(sender)
+            elif target.frames % self.CHECK_EVERY == 0 and self._flood_condition(target):
+                target.flooding = True
+                target.flood_started = now
+                target.flood_frames = target.frames
+                target.flood_senders = HyperLogLog(self.hll_precision)
+                target.flood_senders.merge(target.senders)
+                events.append(('flood_started', target_key, self._stats(target_key, target, now)))
+
+            aggregate = target.flooding and sender_frames <= self.one_off_max
+        return aggregate, events
+
+    def active_floods(self):
+        with self._lock:
+            return sum(1 for target in self.targets.values() if target.flooding)
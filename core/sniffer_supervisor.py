@@ -0,0 +1,249 @@
+import argparse
+import json
+import logging
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+# The lock itself is shared with the blocklist engine, which lives next to
+# the firewall server
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+from pid_lock import PidLock
+
+# One sniffer per interface. A supervisor process holds an exclusive lock on
+# logs/sniffer-<iface>.supervisor.lock, runs main.py as its child and restarts
+# it with exponential backoff when it dies. main.py takes its own lock on
+# logs/sniffer-<iface>.lock, so a sniffer started by hand can't run next to a
+# supervised one either. Locks are released by the OS when a process dies, so
+# there are no stale pidfiles to clean up.
+#
+# State is shared through small JSON files, which lets any API worker answer
+# /status and /stop no matter which one started the sniffer:
+#   sniffer-<iface>.supervisor.json  supervisor pid, child pid, restarts, backoff
+#   sniffer-<iface>.stats.json       written by the sniffer: frames/s, queue backlog
+
+RUN_DIR = "logs"
+MIN_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+STABLE_AFTER = 30.0        # a child that ran this long resets the backoff
+STATS_STALE_AFTER = 10.0   # sniffer stats older than this are not reported as live
+STOP_TIMEOUT = 10.0
+
+SNIFFER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+def run_files(interface, run_dir=RUN_DIR):
+    """Paths of the lock/status/log files for one interface"""
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", interface)
+    base = os.path.join(run_dir, f"sniffer-{name}")
+    return {
+        'sniffer_lock': base + ".lock",
+        'supervisor_lock': base + ".supervisor.lock",
+        'supervisor_status': base + ".supervisor.json",
+        'stats': base + ".stats.json",
+        'log': base + ".log"
+    }
+
+
+def write_json(path, data):
+    """Atomically replace a small JSON status file"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class SnifferSupervisor:
+    """Keeps one sniffer child running for an interface, restarting it with backoff"""
+
+    def __init__(self, interface, command=None, run_dir=RUN_DIR,
+                 min_backoff=MIN_BACKOFF, max_backoff=MAX_BACKOFF, stable_after=STABLE_AFTER):
+        self.interface = interface
+        self.command = command or [sys.executable, SNIFFER_SCRIPT, "--interface", interface]
+        self.files = run_files(interface, run_dir)
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.lock = PidLock(self.files['supervisor_lock'])
+        self.child = None
+        self.restarts = 0
+        self.backoff = min_backoff
+        self.last_exit_code = None
+        self.started_at = None
+        self.child_started_at = None
+        self._stopping = threading.Event()
+
+    def status(self, state):
+        return {
+            'interface': self.interface,
+            'state': state,
+            'supervisor_pid': os.getpid(),
+            'sniffer_pid': self.child.pid if self.child is not None and self.child.poll() is None else None,
+            'started_at': self.started_at,
+            'sniffer_started_at': self.child_started_at,
+            'restarts': self.restarts,
+            'backoff': self.backoff,
+            'last_exit_code': self.last_exit_code
+        }
+
+    def _publish(self, state):
+        write_json(self.files['supervisor_status'], self.status(state))
+
+    def run(self):
+        """Supervise until stop(); returns False if another supervisor owns the interface"""
+        if not self.lock.acquire():
+            logging.warning(f"⚠️ Sniffer for {self.interface} is already supervised (pid {self.lock.pid()})")
+            return False
+        self.started_at = time.time()
+        try:
+            while not self._stopping.is_set():
+                self._run_child()
+                if self._stopping.is_set():
+                    break
+                self.restarts += 1
+                logging.warning(f"⚠️ Sniffer exited with {self.last_exit_code}; restarting in {self.backoff:.0f}s")
+                self._publish('backoff')
+                self._stopping.wait(self.backoff)
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+        finally:
+            self._publish('stopped')
+            self.lock.release()
+        return True
+
+    def _run_child(self):
+        with open(self.files['log'], 'ab') as log:
+            self.child = subprocess.Popen(self.command, stdout=log, stderr=subprocess.STDOUT)
+        if self._stopping.is_set():   # stop() raced with the spawn
+            self.child.terminate()
+        self.child_started_at = time.time()
+        logging.info(f"🚀 Sniffer started on {self.interface} (pid {self.child.pid})")
+        self._publish('running')
+        self.last_exit_code = self.child.wait()
+        if time.time() - self.child_started_at >= self.stable_after:
+            self.backoff = self.min_backoff
+
+    def stop(self, *_):
+        """Stop supervising and terminate the sniffer (safe from a signal handler)"""
+        self._stopping.set()
+        child = self.child
+        if child is not None and child.poll() is None:
+            child.terminate()
+
+
+# ============================================
+# Control helpers used by the API
+# ============================================
+
+def sniffer_status(interface, run_dir=RUN_DIR):
+    """Supervisor state merged with the sniffer's own stats"""
+    files = run_files(interface, run_dir)
+    supervisor_running = PidLock(files['supervisor_lock']).held_elsewhere()
+    sniffer_running = PidLock(files['sniffer_lock']).held_elsewhere()
+    status = {
+        'interface': interface,
+        'running': sniffer_running,
+        'supervised': supervisor_running,
+        'state': 'stopped'
+    }
+    supervisor = read_json(files['supervisor_status'])
+    if supervisor and supervisor_running:
+        status.update({k: supervisor.get(k) for k in
+                       ('state', 'supervisor_pid', 'sniffer_pid', 'restarts', 'backoff', 'last_exit_code')})
+    elif sniffer_running:
+        status['state'] = 'unsupervised'
+
+    stats = read_json(files['stats'])
+    now = time.time()
+    if sniffer_running and stats:
+        status['uptime'] = round(now - stats['started_at'], 1)
+        if now - stats.get('updated_at', 0) <= STATS_STALE_AFTER:
+            status.update({k: stats.get(k) for k in
+                           ('frames', 'frames_per_sec', 'deauth_frames', 'queue_backlog', 'dropped',
+                            'block_requests', 'flood_frames', 'active_floods', 'firewall', 'top_threats')})
+        else:
+            status['stats_stale'] = True
+    return status
+
+
+def start_sniffer(interface, run_dir=RUN_DIR):
+    """Launch a detached supervisor unless one is already running; returns (started, status)"""
+    files = run_files(interface, run_dir)
+    if PidLock(files['supervisor_lock']).held_elsewhere() or PidLock(files['sniffer_lock']).held_elsewhere():
+        return False, sniffer_status(interface, run_dir)
+
+    os.makedirs(run_dir, exist_ok=True)
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+    else:
+        kwargs['start_new_session'] = True   # survives API worker restarts
+    with open(files['log'], 'ab') as log:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--interface", interface, "--run-dir", run_dir],
+                         stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, **kwargs)
+
+    # Wait briefly so the caller sees the new state; losing a race to a
+    # concurrent /start is harmless, the second supervisor just exits
+    deadline = time.monotonic() + 3.0
+    while time.monotonic() < deadline and not PidLock(files['supervisor_lock']).held_elsewhere():
+        time.sleep(0.05)
+    return True, sniffer_status(interface, run_dir)
+
+
+def _kill(pid, sig=signal.SIGTERM):
+    try:
+        os.kill(pid, sig)
+        return True
+    except (OSError, TypeError):
+        return False
+
+
+def stop_sniffer(interface, run_dir=RUN_DIR, timeout=STOP_TIMEOUT):
+    """Stop the supervisor and its sniffer; returns True if anything was running"""
+    files = run_files(interface, run_dir)
+    supervisor_lock = PidLock(files['supervisor_lock'])
+    sniffer_lock = PidLock(files['sniffer_lock'])
+    was_running = supervisor_lock.held_elsewhere() or sniffer_lock.held_elsewhere()
+    if not was_running:
+        return False
+
+    # Supervisor first so it doesn't restart the sniffer we're stopping
+    if supervisor_lock.held_elsewhere():
+        _kill(supervisor_lock.pid())
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and supervisor_lock.held_elsewhere():
+        time.sleep(0.05)
+    if sniffer_lock.held_elsewhere():
+        _kill(sniffer_lock.pid())
+    while time.monotonic() < deadline and sniffer_lock.held_elsewhere():
+        time.sleep(0.05)
+
+    # Anything still holding a lock didn't honour SIGTERM
+    for lock in (supervisor_lock, sniffer_lock):
+        if lock.held_elsewhere():
+            _kill(lock.pid(), getattr(signal, 'SIGKILL', signal.SIGTERM))
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Shakti sniffer supervisor")
+    parser.add_argument("--interface", required=True)
+    parser.add_argument("--run-dir", default=RUN_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    supervisor = SnifferSupervisor(args.interface, run_dir=args.run_dir)
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    sys.exit(0 if supervisor.run() else 3)
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Per-MAC threat scoring for the sniffer's block decisions. Every deauth frame
+# updates a small state record in O(1): an exponentially weighted RSSI, an
+# exponentially weighted inter-frame interval (its inverse is the frame rate)
+# and the last decision. A policy turns that state into a block decision
+# exactly once per attacker, so a single strong frame can't trigger a block
+# and a flood can't trigger hundreds of firewall calls. The table is a bounded
+# LRU, so a randomized-MAC flood can't grow it without limit.
+
+DEFAULT_CAPACITY = 10000
+REBLOCK_GRACE = 5.0    # seconds to let the blocklist replica catch up after a block
+RETRY_DELAY = 5.0      # after a failed firewall call
+
+WATCH, BLOCKING, BLOCKED = "watch", "blocking", "blocked"
+
+
+class MacState:
+    __slots__ = ('ewma_rssi', 'ewma_interval', 'frames', 'first_seen', 'last_seen',
+                 'decision', 'decided_at', 'retry_at')
+
+    def __init__(self, rssi, now):
+        self.ewma_rssi = float(rssi)
+        self.ewma_interval = None
+        self.frames = 1
+        self.first_seen = now
+        self.last_seen = now
+        self.decision = WATCH
+        self.decided_at = None
+        self.retry_at = 0.0
+
+    @property
+    def rate(self):
+        """Estimated frames per second (0 until two frames have been seen)"""
+        if not self.ewma_interval:
+            return 0.0 if self.ewma_interval is None else float('inf')
+        return 1.0 / self.ewma_interval
+
+    def to_dict(self, now):
+        return {
+            'rssi': round(self.ewma_rssi, 1),
+            'rate': round(self.rate, 2),
+            'frames': self.frames,
+            'active_for': round(now - self.first_seen, 1),
+            'idle_for': round(now - self.last_seen, 1),
+            'decision': self.decision
+        }
+
+
+class ThreatPolicy:
+    """Block once the averaged signal is strong and the attacker is persistent"""
+
+    def __init__(self, rssi_threshold=-50, min_frames=3, min_rate=1.0, rssi_alpha=0.3, interval_alpha=0.3):
+        self.rssi_threshold = rssi_threshold
+        self.min_frames = min_frames
+        self.min_rate = min_rate
+        self.rssi_alpha = rssi_alpha
+        self.interval_alpha = interval_alpha
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(rssi_threshold=config.get('threat_rssi_threshold', -50),
+                   min_frames=config.get('threat_min_frames', 3),
+                   min_rate=config.get('threat_min_rate', 1.0),
+                   rssi_alpha=config.get('threat_rssi_alpha', 0.3))
+
+    def should_block(self, state):
+        return (state.frames >= self.min_frames
+                and state.ewma_rssi > self.rssi_threshold
+                and state.rate >= self.min_rate)
+
+
+class ThreatTable:
+    """Bounded LRU of per-MAC state; observe() says when to block"""
+
+    def __init__(self, policy=None, capacity=DEFAULT_CAPACITY):
+        self.policy = policy or ThreatPolicy()
+        self.capacity = capacity
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, mac):
+        return self._states.get(mac)
+
+    def observe(self, mac, rssi, now=None):
+        """
+        Fold one frame into the MAC's state. Returns (state, block): block is
+        True only for the frame that first satisfies the policy; the caller
+        must then report blocked() or block_failed().
+        """
+        now = time.monotonic() if now is None else now
+        policy = self.policy
+        with self._lock:
+            state = self._states.get(mac)
+            if state is None:
+                state = self._states[mac] = MacState(rssi, now)
+                if len(self._states) > self.capacity:
+                    self._states.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._states.move_to_end(mac)
+                interval = now - state.last_seen
+                if state.ewma_interval is None:
+                    state.ewma_interval = interval
+                else:
+                    state.ewma_interval += policy.interval_alpha * (interval - state.ewma_interval)
+                state.ewma_rssi += policy.rssi_alpha * (rssi - state.ewma_rssi)
+                state.frames += 1
+                state.last_seen = now
+
+            if state.decision == BLOCKED and now - state.decided_at > REBLOCK_GRACE:
+                # Frames only reach us when the firewall no longer blocks this MAC
+                # (TTL expiry or a manual unblock): collect fresh evidence
+                state.decision, state.frames, state.ewma_interval = WATCH, 1, None
+
+            if state.decision == WATCH and now >= state.retry_at and policy.should_block(state):
+                state.decision, state.decided_at = BLOCKING, now
+                return state, True
+            return state, False
+
+    def blocked(self, mac, now=None):
+        with self._lock:
+            state = self._states.get(mac)
+            if state is not None:
+                state.decision = BLOCKED
+                state.decided_at = time.monotonic() if now is None else now
+
+    def block_failed(self, mac, now=None):
+        """Let the next frame after RETRY_DELAY try again"""
+        with self._lock:
+            state = self._states.get(mac)
+            if state is not None:
+                state.decision = WATCH
+                state.retry_at = (time.monotonic() if now is None else now) + RETRY_DELAY
+
+    def top(self, limit=20):
+        """Highest-rate MACs, for diagnostics"""
+        with self._lock:
+            states = list(self._states.items())
+        states.sort(key=lambda item: item[1].rate, reverse=True)
+        now = time.monotonic()
+        return [dict(state.to_dict(now), mac=mac) for mac, state in states[:limit]]
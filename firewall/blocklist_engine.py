@@ -0,0 +1,388 @@
+import logging
+import re
+import threading
+import time
+from blocklist_store import BlocklistStore, snapshot_data
+from blocklist_snapshot import CowBlocklist, load_data, apply_record
+from blocklist_feed import ChangeFeed
+from blocklist_mmap import MmapPublisher
+from server_stats import ServerStats
+from nft_enforcer import NftEnforcer, NftBackend, DryRunBackend
+from mac_table import mac_to_int, int_to_mac, parse_prefix, format_prefix
+from pid_lock import PidLock
+
+# The blocklist itself, as a library: load/save, block/unblock/is_blocked,
+# TTL expiry, kernel enforcement and the change feed. firewall_server.py is a
+# TCP front end over one of these; on a single host the sniffer or the API can
+# host it in-process instead (firewall_mode: embedded in config.yaml), so a
+# check is a function call rather than a localhost round trip.
+#
+# MACs are held as 48-bit integers; prefix rules (OUI /24 etc.) alongside.
+# Readers use `blocklist.snapshot` without locking; changes go through one
+# write transaction at a time, which publishes a new immutable snapshot and
+# journals its records in the same order. Only one engine may own a given
+# blocklist file at a time: start() takes <blocklist_file>.owner.lock.
+
+BLOCK_LOG_FILE = "logs/blocked_macs.json"
+MAC_REGEX = re.compile(r"^([0-9A-Fa-f]{2}:){5}[0-9A-Fa-f]{2}$")
+MAC_LIST_REGEX = re.compile(r"(?:(?:[0-9A-Fa-f]{2}:){5}[0-9A-Fa-f]{2}\n)*")
+EXPIRY_INTERVAL = 1.0
+
+# Kernel enforcement: "none" (blocklist only), "nft" (nftables named sets,
+# needs root) or "dry-run" (write the generated nft scripts to a file)
+ENFORCEMENT_MODES = ("none", "nft", "dry-run")
+NFT_DRY_RUN_FILE = "logs/nftables.nft"
+
+
+def is_valid_mac(mac):
+    """Validate MAC address format"""
+    return MAC_REGEX.match(mac) is not None
+
+
+def embedded_in(config):
+    """
+    Which process hosts the engine per config.yaml: 'sniffer' or 'api' with
+    firewall_mode: embedded (firewall_embedded_in picks, sniffer by default),
+    None when a separate firewall_server.py owns it (firewall_mode: remote)
+    """
+    if config.get('firewall_mode', 'remote') != 'embedded':
+        return None
+    return config.get('firewall_embedded_in', 'sniffer')
+
+
+class BlocklistEngine:
+    """In-memory blocklist with a journal on disk; every front end shares one"""
+
+    def __init__(self, path=BLOCK_LOG_FILE, stats=None):
+        self.path = path
+        self.stats = stats or ServerStats()
+        self.store = BlocklistStore(path, observer=self.stats.record_persistence)
+        # WATCH subscribers get a snapshot, then these per-version deltas
+        self.feed = ChangeFeed()
+        self.blocklist = CowBlocklist(journal=self._on_commit)
+        self.enforcer = None
+        # Sorted binary copy of the blocklist that processes on this host mmap
+        # and search directly (see blocklist_mmap.MmapBlocklist)
+        self.mmap_publisher = None
+        self._stop = threading.Event()
+        self._expiry_thread = None
+        self._owner_lock = None
+        self.store.set_snapshot_source(self._snapshot)
+        self.stats.add_gauge('blocklist_size', lambda: len(self.blocklist.snapshot))
+        self.stats.add_gauge('prefix_rules', lambda: self.blocklist.snapshot.prefix_count())
+        self.stats.add_gauge('blocklist_version', lambda: self.blocklist.snapshot.version)
+
+    # ----- lifecycle -----
+
+    def start(self, enforce="none", mmap_file=None):
+        """Take ownership of the file, load it, then start enforcement, the mmap publisher and the reaper"""
+        self.acquire()
+        self.load()
+        self.start_enforcer(enforce)
+        self.start_mmap_publisher(mmap_file)
+        if self._expiry_thread is None:
+            self._stop.clear()
+            self._expiry_thread = threading.Thread(target=self._expiry_loop, name="blocklist-expiry", daemon=True)
+            self._expiry_thread.start()
+        return self
+
+    def stop(self):
+        """Stop the background threads and flush the journal"""
+        self._stop.set()
+        self._expiry_thread = None
+        if self.enforcer is not None:
+            self.enforcer.stop()
+        if self.mmap_publisher is not None:
+            self.mmap_publisher.stop()
+        self.store.close()
+        if self._owner_lock is not None:
+            self._owner_lock.release()
+            self._owner_lock = None
+
+    def acquire(self):
+        """
+        Become the only engine journaling to this blocklist file; raises
+        OSError if another one (in any process) already does
+        """
+        if self._owner_lock is not None:
+            return
+        lock = PidLock(f"{self.path}.owner.lock")
+        if not lock.acquire():
+            raise OSError(f"{self.path} is already owned by another engine (pid {lock.pid()})")
+        self._owner_lock = lock
+
+    def start_enforcer(self, mode):
+        """Mirror the blocklist into nftables (or a dry-run file)"""
+        if mode == "nft":
+            backend = NftBackend()
+        elif mode == "dry-run":
+            backend = DryRunBackend(NFT_DRY_RUN_FILE)
+        else:
+            return None
+        self.enforcer = NftEnforcer(backend, lambda: self.blocklist.snapshot, observer=self.stats.record_persistence)
+        self.enforcer.start()
+        logging.info(f"🛡️  nftables enforcement enabled ({mode})")
+        return self.enforcer
+
+    def start_mmap_publisher(self, path):
+        """Publish every committed version as a memory-mapped file"""
+        if self.mmap_publisher is not None:
+            self.mmap_publisher.stop()
+        self.mmap_publisher = None
+        if not path:
+            return None
+        publisher = MmapPublisher(path, lambda: self.blocklist.snapshot, observer=self.stats.record_persistence)
+        self.mmap_publisher = publisher.start()
+        self.stats.add_gauge('mmap_generation', lambda: publisher.generation)
+        logging.info(f"🗺️  Publishing memory-mapped blocklist to {publisher.path}")
+        return publisher
+
+    # ----- persistence -----
+
+    def _on_commit(self, records):
+        # Runs under the write lock right after the new snapshot is published
+        self.feed.publish(self.blocklist.snapshot.version, records)
+        if self.enforcer is not None:
+            self.enforcer.queue(records)
+        if self.mmap_publisher is not None:
+            self.mmap_publisher.notify()
+        self._persist(records)
+
+    def _persist(self, records):
+        """Append committed changes to the journal (O(1), fsync'd in groups)"""
+        started = time.perf_counter()
+        try:
+            self.store.append_many(records)
+        except Exception as e:
+            logging.error(f"Error journaling blocklist change: {e}")
+        self.stats.record_persistence('journal', time.perf_counter() - started)
+
+    def _snapshot(self):
+        # Snapshots are immutable, so compaction needs no copy or lock
+        snap = self.blocklist.snapshot
+        expiring = {int_to_mac(key): expires_at for key, expires_at in snap.expirations().items()}
+        return snapshot_data(snap.macs(), snap.prefix_rules(), expiring)
+
+    def load(self):
+        """Load previously blocked MACs from snapshot + journal"""
+        try:
+            data, records = self.store.load()
+            self.blocklist.reset()
+            # Replaying what is already on disk, so nothing is journaled here
+            with self.blocklist.transaction() as txn:
+                load_data(txn, data)
+                for record in records:
+                    apply_record(txn, record)
+            self.feed.reset(self.blocklist.snapshot.version)
+            expired = self.expire_due()
+            if expired:
+                logging.info(f"⌛ Dropped {len(expired)} blocks that expired while offline")
+            snap = self.blocklist.snapshot
+            if data or records:
+                logging.info(f"📋 Loaded {len(snap)} previously blocked MACs and "
+                             f"{snap.prefix_count()} prefix rules ({len(records)} journal records)")
+                logging.info(f"💾 Blocklist memory: {snap.memory_usage()}")
+            else:
+                logging.info("📋 No previous blocklist found, starting fresh")
+        except Exception as e:
+            logging.error(f"Error loading blocklist: {e}")
+            self.blocklist.reset()
+            self.feed.reset(self.blocklist.snapshot.version)
+
+    def save(self):
+        """Compact the journal into a fresh snapshot file"""
+        try:
+            self.store.compact()
+        except Exception as e:
+            logging.error(f"Error saving blocklist: {e}")
+
+    @staticmethod
+    def _journal(txn, op, **fields):
+        """Queue a change record; it is written when the transaction commits"""
+        txn.journal({'op': op, **fields, 'ts': time.time()})
+
+    # ----- expiry -----
+
+    def expire_due(self, now=None):
+        """Remove blocks whose TTL has passed; O(k log n) for k due entries"""
+        now = time.time() if now is None else now
+        next_expiry = self.blocklist.next_expiry()
+        if next_expiry is None or next_expiry > now:
+            return []
+        with self.blocklist.transaction() as txn:
+            expired = [int_to_mac(key) for key in txn.expire_due(now)]
+            if expired:
+                self._journal(txn, 'expire', macs=expired)
+        if expired:
+            logging.info(f"⌛ Expired {len(expired)} blocks")
+        return expired
+
+    def _expiry_loop(self):
+        """Background reaper for time-bounded blocks"""
+        while not self._stop.wait(EXPIRY_INTERVAL):
+            try:
+                self.expire_due()
+            except Exception as e:
+                logging.error(f"Error expiring blocks: {e}")
+
+    # ----- changes -----
+
+    def block_mac(self, mac, ttl=None):
+        """Block a MAC permanently or for `ttl` seconds; returns (success, message)"""
+        try:
+            mac_lower = mac.lower()
+            key = mac_to_int(mac_lower)
+            expires_at = time.time() + ttl if ttl else None
+
+            with self.blocklist.transaction() as txn:
+                # Re-blocking only matters if it lengthens the block
+                if not txn.add(key):
+                    current = txn.expires_at(key)
+                    if current is None or (expires_at is not None and expires_at <= current):
+                        return True, f"MAC {mac} already blocked (total: {len(txn)})"
+                txn.set_expiry(key, expires_at)
+                if expires_at is None:
+                    self._journal(txn, 'block', mac=mac_lower)
+                else:
+                    self._journal(txn, 'block', mac=mac_lower, expires=expires_at)
+                total = len(txn)
+
+            logging.info(f"✅ Added {mac} to blocklist" + (f" for {ttl:g}s" if ttl else ""))
+            return True, f"Successfully added {mac} to blocklist (total: {total})"
+
+        except Exception as e:
+            return False, f"Exception: {str(e)}"
+
+    def block_many(self, macs, ttl=None, show_invalid=True):
+        """
+        Block a batch of MACs atomically: either every entry is valid and the
+        whole batch is applied with a single journal write, or nothing changes.
+        With `ttl` the MACs expire after that many seconds; MACs already
+        blocked follow block_mac's rule and only ever get a longer block
+        (a permanent one included). The rejection message quotes invalid
+        entries only with show_invalid.
+        """
+        try:
+            # Validate the whole batch in one regex pass; only scan on failure
+            if MAC_LIST_REGEX.fullmatch("\n".join(macs) + "\n"):
+                invalid = []
+            else:
+                invalid = [mac for mac in macs if not is_valid_mac(mac)]
+            if invalid and not show_invalid:
+                return False, f"{len(invalid)} invalid MAC address(es), batch rejected"
+            if invalid:
+                preview = ', '.join(invalid[:5])
+                return False, f"{len(invalid)} invalid MAC address(es), batch rejected: {preview}"
+
+            # One transaction: readers see the whole batch or none of it
+            expires_at = time.time() + ttl if ttl else None
+            with self.blocklist.transaction() as txn:
+                new_macs, extended = [], []
+                for mac in macs:
+                    key = mac_to_int(mac)
+                    if txn.add(key):
+                        new_macs.append(mac.lower())
+                    else:
+                        # Same rule as block_mac: only a longer block changes an existing one
+                        current = txn.expires_at(key)
+                        if current is None or (expires_at is not None and expires_at <= current):
+                            continue
+                        extended.append(mac.lower())
+                    txn.set_expiry(key, expires_at)
+                changed = new_macs + extended
+                if changed and expires_at is not None:
+                    self._journal(txn, 'block_many', macs=changed, expires=expires_at)
+                elif changed:
+                    self._journal(txn, 'block_many', macs=changed)
+                total = len(txn)
+            if new_macs:
+                logging.info(f"✅ Added {len(new_macs)} MACs to blocklist in one batch")
+            if extended:
+                logging.info(f"✅ Lengthened {len(extended)} existing blocks")
+
+            already = len(macs) - len(new_macs)
+            note = f", {len(extended)} lengthened" if extended else ""
+            return True, f"Blocked {len(new_macs)} MACs ({already} already blocked{note}, total: {total})"
+
+        except Exception as e:
+            return False, f"Exception: {str(e)}"
+
+    def block_prefix(self, rule):
+        """Block every MAC under a prefix rule (e.g. an OUI: aa:bb:cc:*:*:*)"""
+        try:
+            prefix_len, prefix = parse_prefix(rule)
+            canonical = format_prefix(prefix_len, prefix)
+            with self.blocklist.transaction() as txn:
+                if not txn.add_prefix(prefix_len, prefix):
+                    return True, f"Prefix {canonical} already blocked"
+                self._journal(txn, 'block_prefix', rule=canonical)
+            logging.info(f"✅ Added prefix rule {canonical} to blocklist")
+            return True, f"Blocked prefix {canonical} (prefix rules: {self.blocklist.snapshot.prefix_count()})"
+        except ValueError as e:
+            return False, str(e)
+        except Exception as e:
+            return False, f"Exception: {str(e)}"
+
+    def unblock_prefix(self, rule):
+        """Remove a prefix rule"""
+        try:
+            prefix_len, prefix = parse_prefix(rule)
+            canonical = format_prefix(prefix_len, prefix)
+            with self.blocklist.transaction() as txn:
+                if not txn.discard_prefix(prefix_len, prefix):
+                    return False, f"Prefix {canonical} not in blocklist"
+                self._journal(txn, 'unblock_prefix', rule=canonical)
+            return True, f"Removed prefix {canonical} from blocklist"
+        except ValueError as e:
+            return False, str(e)
+        except Exception as e:
+            return False, f"Exception: {str(e)}"
+
+    def unblock_mac(self, mac):
+        """Remove MAC from blocklist"""
+        try:
+            mac_lower = mac.lower()
+            with self.blocklist.transaction() as txn:
+                if not txn.discard(mac_to_int(mac_lower)):
+                    return False, f"MAC {mac} not in blocklist"
+                self._journal(txn, 'unblock', mac=mac_lower)
+            return True, f"Removed {mac} from blocklist"
+        except Exception as e:
+            return False, f"Exception: {str(e)}"
+
+    # ----- lookups (lock-free) -----
+
+    def blocked_by(self, mac):
+        """Return 'exact', the matching prefix rule, or None"""
+        try:
+            return self.blocklist.snapshot.match(mac_to_int(mac))
+        except ValueError:
+            return None
+
+    def is_blocked(self, mac):
+        """Check if MAC is in blocklist (exact entry or prefix rule)"""
+        return self.blocked_by(mac) is not None
+
+    def check_many(self, macs):
+        """Check a batch of MACs against one snapshot, one response line per MAC"""
+        snap = self.blocklist.snapshot
+        now = time.time()
+        lines = []
+        for mac in macs:
+            if not is_valid_mac(mac):
+                lines.append(f"Invalid MAC address format: {mac}")
+            else:
+                blocked = snap.match(mac_to_int(mac), now) is not None
+                lines.append(f"MAC {mac}: {'BLOCKED' if blocked else 'NOT BLOCKED'}")
+        return lines
+
+    def get_blocklist(self):
+        """Get current blocklist"""
+        return self.blocklist.snapshot.macs()
+
+    def get_prefix_rules(self):
+        """Get current prefix rules"""
+        return self.blocklist.snapshot.prefix_rules()
+
+    def __len__(self):
+        return len(self.blocklist.snapshot)
@@ -0,0 +1,66 @@
+import threading
+import uuid
+from collections import deque
+
+# Change feed behind the WATCH command. Every committed blocklist transaction
+# is recorded here as (version, journal records); watchers receive a full
+# snapshot once and then only these deltas. A bounded history lets a replica
+# that reconnects resume from its last version; anyone further behind than
+# the history (or from a previous server run, i.e. another epoch) gets a
+# fresh snapshot instead.
+
+DEFAULT_HISTORY = 10000   # committed transactions kept for resume
+
+
+class ChangeFeed:
+    """Bounded, versioned history of committed changes with blocking waits"""
+
+    def __init__(self, history=DEFAULT_HISTORY):
+        self.epoch = uuid.uuid4().hex[:12]
+        self._entries = deque()
+        self._history = history
+        self._floor = 0      # deltas after this version are all retained
+        self._latest = 0
+        self._cond = threading.Condition()
+
+    @property
+    def latest(self):
+        return self._latest
+
+    def reset(self, version):
+        """Start a new history at `version` (after loading from disk)"""
+        with self._cond:
+            self._entries.clear()
+            self._floor = self._latest = version
+            self._cond.notify_all()
+
+    def publish(self, version, records):
+        """Record the journal records of the transaction that made `version`"""
+        with self._cond:
+            self._entries.append((version, records))
+            if len(self._entries) > self._history:
+                self._floor = self._entries.popleft()[0]
+            self._latest = version
+            self._cond.notify_all()
+
+    def can_resume(self, epoch, version):
+        return epoch == self.epoch and self._floor <= version <= self._latest
+
+    def since(self, version):
+        """
+        Changes committed after `version` as [(version, records)], or None
+        if some of them have already been dropped from the history.
+        """
+        with self._cond:
+            if version < self._floor:
+                return None
+            if version >= self._latest:
+                return []
+            return [entry for entry in self._entries if entry[0] > version]
+
+    def wait(self, version, timeout):
+        """Block until something newer than `version` is published"""
+        with self._cond:
+            if self._latest <= version:
+                self._cond.wait(timeout)
+            return self._latest > version
@@ -0,0 +1,394 @@
+import bisect
+import itertools
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from mac_table import MAC_BITS, mac_to_int, parse_prefix
+
+# Shared, memory-mapped blocklist for processes on the firewall's host. The
+# firewall publishes every committed version as an immutable binary file:
+#
+#   header   64 bytes (HEADER below)
+#   keys     count x u64, sorted exact MACs (48-bit values)
+#   expiry   count x f64, expires_at per key, 0 = permanent (if FLAG_EXPIRY)
+#   lows     ranges x u64, sorted prefix-rule ranges, disjoint
+#   highs    ranges x u64
+#
+# Each generation is written to its own file next to `path`, and `path`
+# itself is a small pointer file naming the current one, so a file someone
+# has mapped is never replaced (Windows refuses that). The firewall then
+# sets the `superseded` field in the old file's header, which every reader
+# sees through its shared mapping, so readers only re-read the pointer when
+# something changed. A lookup is a binary search directly on the mapped
+# pages: no syscalls, no parsing and no copy of the list per process.
+#
+# The file is host-local, so keys are in native byte order (recorded in the
+# flags and checked on open).
+
+MAGIC = b"SHKBLKv1"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("=8sIIQQQQQd")   # magic, format, flags, superseded, generation,
+HEADER_SIZE = 64                       # blocklist version, count, ranges, published_at
+SUPERSEDED_OFFSET = 16
+FLAG_EXPIRY = 1
+FLAG_BIG_ENDIAN = 2
+DEFAULT_PUBLISH_INTERVAL = 0.05   # seconds to coalesce commits into one file
+RETRY_DELAY = 1.0
+STALE_RETRY = 0.1                 # readers holding a stale pointer re-check this often
+
+_NATIVE_FLAGS = FLAG_BIG_ENDIAN if sys.byteorder == "big" else 0
+_publishers = itertools.count(1)
+
+
+def prefix_intervals(rules):
+    """Prefix rules -> sorted, disjoint (low, high) key ranges"""
+    intervals = []
+    for prefix_len, prefix in sorted(parse_prefix(rule) for rule in rules):
+        shift = MAC_BITS - prefix_len
+        low = prefix << shift
+        high = low | ((1 << shift) - 1)
+        intervals.append((low, high))
+    intervals.sort()
+    merged = []
+    for low, high in intervals:
+        if merged and low <= merged[-1][1] + 1:
+            if high > merged[-1][1]:
+                merged[-1] = (merged[-1][0], high)
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def read_pointer(path):
+    """Path of the generation file the pointer file names"""
+    with open(path, 'rb') as f:
+        name = f.read(256).decode('utf-8', 'replace').strip()
+    if not name or os.path.basename(name) != name:
+        raise ValueError(f"{path} is not a blocklist pointer file")
+    return os.path.join(os.path.dirname(path), name)
+
+
+def encode(snap, generation, published_at=None):
+    """Serialize a BlocklistSnapshot into the mmap file format"""
+    keys = array('Q', sorted(snap.keys()))
+    expirations = snap.expirations()
+    flags = _NATIVE_FLAGS
+    expiry = None
+    if expirations:
+        flags |= FLAG_EXPIRY
+        expiry = array('d', (expirations.get(key, 0.0) for key in keys))
+    intervals = prefix_intervals(snap.prefix_rules())
+    lows = array('Q', (low for low, _ in intervals))
+    highs = array('Q', (high for _, high in intervals))
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, flags, 0, generation, snap.version,
+                         len(keys), len(intervals),
+                         time.time() if published_at is None else published_at)
+    parts = [header.ljust(HEADER_SIZE, b"\0"), keys.tobytes()]
+    if expiry is not None:
+        parts.append(expiry.tobytes())
+    parts += [lows.tobytes(), highs.tobytes()]
+    return b"".join(parts)
+
+
+class _Mapping:
+    """One opened generation: the mmap and typed views into its sections"""
+
+    __slots__ = ('mm', 'header', 'keys', 'expiry', 'lows', 'highs',
+                 'generation', 'version', 'count', 'published_at')
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, fmt, flags, _, self.generation, self.version, self.count,
+             ranges, self.published_at) = HEADER.unpack_from(self.mm)
+        except struct.error:
+            raise ValueError(f"{path} is too short for a blocklist header")
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a format {FORMAT_VERSION} blocklist file")
+        if flags & FLAG_BIG_ENDIAN != _NATIVE_FLAGS:
+            raise ValueError(f"{path} was written with a different byte order")
+        expiry_bytes = 8 * self.count if flags & FLAG_EXPIRY else 0
+        if len(self.mm) != HEADER_SIZE + 8 * self.count + expiry_bytes + 16 * ranges:
+            raise ValueError(f"{path} is truncated")
+
+        view = memoryview(self.mm)
+        self.header = view[:HEADER_SIZE].cast('Q')
+        offset = HEADER_SIZE
+        self.keys = view[offset:offset + 8 * self.count].cast('Q')
+        offset += 8 * self.count
+        self.expiry = view[offset:offset + expiry_bytes].cast('d') if expiry_bytes else None
+        offset += expiry_bytes
+        self.lows = view[offset:offset + 8 * ranges].cast('Q')
+        offset += 8 * ranges
+        self.highs = view[offset:offset + 8 * ranges].cast('Q')
+
+    @property
+    def superseded(self):
+        return self.header[SUPERSEDED_OFFSET // 8] != 0
+
+
+class MmapBlocklist:
+    """
+    Read-only view of the firewall's published blocklist file.
+
+    Lookups binary-search the shared mapping; the next lookup after the
+    firewall publishes a new generation follows the pointer file to it.
+    Until a generation exists (or if it can't be read, or the firewall
+    could not point readers past a superseded one) `ready` is False and
+    lookups say "not blocked", so callers should fall back to another source.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mapping = None
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+        self._last_error = None
+        self.reopens = 0
+
+    def _current(self):
+        mapping = self._mapping
+        if mapping is None or mapping.superseded:
+            # No usable file: look again every STALE_RETRY, not on every lookup
+            if time.monotonic() < self._retry_at:
+                return mapping
+            mapping = self.refresh()
+        return mapping
+
+    def refresh(self):
+        """Map the newest generation now; returns it, or None if unavailable"""
+        with self._lock:
+            mapping = self._mapping
+            if mapping is not None and not mapping.superseded:
+                return mapping
+            self._retry_at = time.monotonic() + STALE_RETRY
+            try:
+                # Views into the old mapping stay valid for threads still
+                # using it; it is unmapped once the last reference goes
+                mapping = _Mapping(read_pointer(self.path))
+                self.reopens += 1
+            except FileNotFoundError:
+                return self._mapping
+            except (OSError, ValueError) as e:
+                if str(e) != self._last_error:
+                    logging.warning(f"⚠️  Can't map blocklist file {self.path}: {e}")
+                    self._last_error = str(e)
+                return self._mapping
+            self._last_error = None
+            if mapping.superseded:
+                # The firewall couldn't update the pointer: nothing current
+                # to answer from until it does
+                self._mapping = None
+                return None
+            self._retry_at = 0.0
+            self._mapping = mapping
+            return mapping
+
+    @property
+    def ready(self):
+        return self._current() is not None
+
+    @property
+    def generation(self):
+        mapping = self._current()
+        return mapping.generation if mapping is not None else None
+
+    @property
+    def version(self):
+        """Blocklist version the current generation was built from"""
+        mapping = self._current()
+        return mapping.version if mapping is not None else None
+
+    def __len__(self):
+        mapping = self._current()
+        return mapping.count if mapping is not None else 0
+
+    def blocked_by(self, mac, now=None):
+        """Return 'exact', 'prefix' or None"""
+        mapping = self._current()
+        if mapping is None:
+            return None
+        try:
+            key = mac_to_int(mac) if isinstance(mac, str) else mac
+        except ValueError:
+            return None
+        keys = mapping.keys
+        i = bisect.bisect_left(keys, key)
+        if i < mapping.count and keys[i] == key:
+            expires_at = mapping.expiry[i] if mapping.expiry is not None else 0.0
+            if not expires_at or expires_at > (time.time() if now is None else now):
+                return 'exact'
+        lows = mapping.lows
+        if len(lows):
+            j = bisect.bisect_right(lows, key) - 1
+            if j >= 0 and key <= mapping.highs[j]:
+                return 'prefix'
+        return None
+
+    def is_blocked(self, mac, now=None):
+        return self.blocked_by(mac, now) is not None
+
+    def __contains__(self, mac):
+        return self.is_blocked(mac)
+
+
+class MmapPublisher:
+    """Writes a new generation of the mmap file after blocklist commits"""
+
+    def __init__(self, path, snapshot_fn, interval=DEFAULT_PUBLISH_INTERVAL, observer=None):
+        self.path = os.path.abspath(path)
+        self.snapshot_fn = snapshot_fn     # returns the current BlocklistSnapshot
+        self.interval = interval
+        self.observer = observer           # observer('mmap', seconds) per publish
+        self.generation = 0
+        self.published_version = None
+        self.last_publish_seconds = 0.0
+        self._published = None             # writable mapping of the live file's header
+        self._published_path = None
+        self._stale = set()                # superseded generation files left to delete
+        # Unique per publisher: a restarted firewall must not rewrite a file
+        # the previous run's readers still have mapped
+        self._token = f"{os.getpid()}-{next(_publishers)}"
+        self._cond = threading.Condition()
+        self._dirty = True
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        self.publish()
+        self._thread = threading.Thread(target=self._run, name="blocklist-mmap", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def notify(self):
+        """A commit happened (cheap; called under the write lock)"""
+        with self._cond:
+            self._dirty = True
+            self._cond.notify()
+
+    def publish(self):
+        """Write the current snapshot as the next generation; False on failure"""
+        with self._cond:
+            self._dirty = False
+        snap = self.snapshot_fn()
+        if snap.version == self.published_version and self._published is not None:
+            return True
+        started = time.perf_counter()
+        generation = self.generation + 1
+        live_path = f"{self.path}.{self._token}.{generation}"
+        tmp_path = f"{self.path}.tmp"
+        if self._published is None:
+            # A generation left by an earlier run may still be mapped by readers
+            self._published, self._published_path = self._open_pointed()
+            self._stale.update(self._leftovers())
+        previous = self._published
+        published = None
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            try:
+                # Unlink rather than truncate: a reused pid must not corrupt
+                # pages a reader still has mapped
+                os.remove(live_path)
+            except FileNotFoundError:
+                pass
+            # No fsync: the files are derived state, rebuilt on every start
+            with open(live_path, 'wb') as f:
+                f.write(encode(snap, generation))
+            published = self._open_live(live_path)
+            with open(tmp_path, 'w') as f:
+                f.write(os.path.basename(live_path) + "\n")
+            # Only the pointer is replaced, and readers never keep it open
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"⚠️  Failed to publish blocklist file {self.path}: {e}")
+            if published is not None:
+                published.close()
+            if previous is not None:
+                # Don't let readers keep answering from a generation that
+                # misses this commit: they fall back until the retry lands
+                struct.pack_into("=Q", previous, SUPERSEDED_OFFSET, generation)
+            self._stale.add(live_path)
+            with self._cond:
+                self._dirty = True
+            return False
+
+        if previous is not None:
+            # Readers of the old generation re-open on their next lookup
+            struct.pack_into("=Q", previous, SUPERSEDED_OFFSET, generation)
+            previous.close()
+            self._stale.add(self._published_path)
+        self._published, self._published_path = published, live_path
+        self._stale.discard(live_path)
+        self._remove_stale()
+        self.generation = generation
+        self.published_version = snap.version
+        self.last_publish_seconds = time.perf_counter() - started
+        if self.observer is not None:
+            self.observer('mmap', self.last_publish_seconds)
+        return True
+
+    def _open_live(self, path):
+        """Writable mapping of a generation file's header"""
+        with open(path, 'r+b') as f:
+            return mmap.mmap(f.fileno(), HEADER_SIZE)
+
+    def _open_pointed(self):
+        """(mapping, path) of the generation the pointer names, or (None, None)"""
+        try:
+            path = read_pointer(self.path)
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return None, None
+            return self._open_live(path), path
+        except (OSError, ValueError):
+            return None, None
+
+    def _leftovers(self):
+        """Generation files of earlier runs (other than the one readers are on)"""
+        directory, base = os.path.split(self.path)
+        pattern = re.compile(re.escape(base) + r"\.\d+-\d+\.\d+$")
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return set()
+        return {os.path.join(directory, name) for name in names
+                if pattern.match(name) and os.path.join(directory, name) != self._published_path}
+
+    def _remove_stale(self):
+        for path in list(self._stale):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue   # still mapped somewhere (Windows); try after the next publish
+            self._stale.discard(path)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+            # Let a burst of commits land in one generation; with a large
+            # list, never spend more than half the time rebuilding the file
+            time.sleep(max(self.interval, self.last_publish_seconds))
+            if not self.publish():
+                time.sleep(RETRY_DELAY)
@@ -0,0 +1,141 @@
+import json
+import logging
+import socket
+import threading
+import time
+
+from blocklist_snapshot import CowBlocklist, load_data, apply_record
+from mac_table import mac_to_int
+
+# Client-side copy of the firewall blocklist. A background thread keeps a
+# WATCH subscription open, applies the snapshot and every delta to a local
+# copy-on-write blocklist, and reconnects with EPOCH/FROM so only the changes
+# missed while disconnected are sent again. Lookups are answered in memory
+# without touching the network.
+
+DEFAULT_RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+READ_TIMEOUT = 30.0   # server pings every few seconds; silence means it's gone
+
+
+class BlocklistReplica:
+    """Local, continuously updated replica of the firewall blocklist"""
+
+    def __init__(self, host="127.0.0.1", port=9000, reconnect_delay=DEFAULT_RECONNECT_DELAY,
+                 listener=None):
+        self.host = host
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+        # Optional listener(message), called after each snapshot/delta is applied
+        self.listener = listener
+        self.blocklist = CowBlocklist()
+        self.epoch = None
+        self.version = None
+        self.connected = False
+        self.snapshots_loaded = 0   # full resyncs; resumed reconnects don't count
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._sock = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="blocklist-replica", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def wait_ready(self, timeout=None):
+        """Wait until the first snapshot has been applied"""
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def is_blocked(self, mac):
+        return self.blocked_by(mac) is not None
+
+    def blocked_by(self, mac):
+        """Return 'exact', the matching prefix rule, or None"""
+        try:
+            return self.blocklist.snapshot.match(mac_to_int(mac))
+        except ValueError:
+            return None
+
+    def __contains__(self, mac):
+        return self.is_blocked(mac)
+
+    def __len__(self):
+        return len(self.blocklist.snapshot)
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                self._watch()
+                delay = self.reconnect_delay
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logging.warning(f"⚠️  Blocklist replica disconnected ({e}), retrying in {delay:g}s")
+            finally:
+                self.connected = False
+                self._sock = None
+            if self._stop.wait(delay):
+                break
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _watch(self):
+        with socket.create_connection((self.host, self.port), timeout=READ_TIMEOUT) as sock:
+            self._sock = sock
+            request = "WATCH"
+            if self.epoch is not None:
+                request += f" EPOCH={self.epoch} FROM={self.version}"
+            sock.sendall(f"{request}\n".encode('utf-8'))
+            self.connected = True
+            with sock.makefile('rb') as stream:
+                for line in stream:
+                    self.apply(json.loads(line))
+        raise ConnectionError("stream closed by server")
+
+    def apply(self, message):
+        """Apply one WATCH message to the local copy"""
+        kind = message.get('type')
+        if kind == 'snapshot':
+            self.blocklist.reset()
+            with self.blocklist.transaction() as txn:
+                load_data(txn, message)
+            self.epoch = message['epoch']
+            self.version = message['version']
+            self.snapshots_loaded += 1
+            self._ready.set()
+            logging.info(f"📥 Blocklist replica loaded {len(self)} MACs at version {self.version}")
+        elif kind == 'resume':
+            self._ready.set()
+            logging.info(f"📥 Blocklist replica resumed at version {self.version}")
+        elif kind == 'delta':
+            if message['version'] <= self.version:
+                return
+            with self.blocklist.transaction() as txn:
+                for record in message['records']:
+                    apply_record(txn, record)
+                txn.expire_due(time.time())
+            self.version = message['version']
+        else:
+            return
+        if self.listener is not None:
+            try:
+                self.listener(message)
+            except Exception as e:
+                logging.error(f"Error in blocklist replica listener: {e}")
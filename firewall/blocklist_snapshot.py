@@ -0,0 +1,310 @@
+import heapq
+import threading
+import time
+
+from mac_table import IntHashSet, PrefixTable, int_to_mac, mac_to_int, parse_prefix, memory_report
+
+# Copy-on-write blocklist. Readers grab `blocklist.snapshot` (a single
+# attribute read) and query that immutable object without taking any lock.
+# One writer at a time opens a transaction, mutates private copies and
+# publishes a new snapshot when it commits, so readers see either all of a
+# transaction or none of it.
+#
+# To keep a single block O(1) rather than O(n), a snapshot is a large frozen
+# base table plus small frozen delta sets (added / removed / expiry changes).
+# A commit copies only the deltas; once they grow past max_delta they are
+# merged into a fresh base, which amortizes to O(n / max_delta) per write.
+
+DEFAULT_MAX_DELTA = 4096
+
+
+class BlocklistSnapshot:
+    """Immutable, versioned view of the blocklist"""
+
+    __slots__ = ('version', 'base', 'base_expiry', 'added', 'removed',
+                 'delta_expiry', 'prefixes', 'size')
+
+    def __init__(self, version, base, base_expiry, added, removed, delta_expiry, prefixes):
+        self.version = version
+        self.base = base                    # IntHashSet, never mutated once published
+        self.base_expiry = base_expiry      # key -> expires_at
+        self.added = added                  # frozenset, disjoint from base
+        self.removed = removed              # frozenset, subset of base
+        self.delta_expiry = delta_expiry    # key -> expires_at, None = cleared
+        self.prefixes = prefixes            # PrefixTable
+        self.size = len(base) + len(added) - len(removed)
+
+    @classmethod
+    def empty(cls):
+        return cls(0, IntHashSet(), {}, frozenset(), frozenset(), {}, PrefixTable())
+
+    def __len__(self):
+        return self.size
+
+    def contains_exact(self, key):
+        if key in self.added:
+            return True
+        if key in self.removed:
+            return False
+        return key in self.base
+
+    def expires_at(self, key):
+        """Expiry time of an exact entry, or None if permanent"""
+        if key in self.delta_expiry:
+            return self.delta_expiry[key]
+        return self.base_expiry.get(key)
+
+    def match(self, key, now=None):
+        """Return 'exact', the matching prefix rule, or None"""
+        if self.contains_exact(key):
+            expires_at = self.expires_at(key)
+            # The reaper runs periodically; a lapsed TTL no longer matches
+            if expires_at is None or expires_at > (time.time() if now is None else now):
+                return 'exact'
+        return self.prefixes.match(key)
+
+    def __contains__(self, key):
+        return self.match(key) is not None
+
+    def remaining_ttl(self, key, now=None):
+        """Seconds until an exact entry expires, or None if permanent"""
+        expires_at = self.expires_at(key)
+        if expires_at is None:
+            return None
+        return expires_at - (time.time() if now is None else now)
+
+    def keys(self):
+        yield from self.added
+        removed = self.removed
+        for key in self.base:
+            if key not in removed:
+                yield key
+
+    def macs(self):
+        """Exact MACs as strings"""
+        return [int_to_mac(key) for key in self.keys()]
+
+    def prefix_rules(self):
+        return self.prefixes.rules()
+
+    def prefix_count(self):
+        return len(self.prefixes)
+
+    def expirations(self):
+        """All pending expiries as {key: expires_at}"""
+        merged = dict(self.base_expiry)
+        for key, expires_at in self.delta_expiry.items():
+            if expires_at is None:
+                merged.pop(key, None)
+            else:
+                merged[key] = expires_at
+        return merged
+
+    def memory_usage(self):
+        report = memory_report(self.base, self.prefixes)
+        report['delta_entries'] = len(self.added) + len(self.removed) + len(self.delta_expiry)
+        report['version'] = self.version
+        return report
+
+
+class CowBlocklist:
+    """Single-writer, lock-free-reader blocklist"""
+
+    def __init__(self, journal=None, max_delta=DEFAULT_MAX_DELTA):
+        self.snapshot = BlocklistSnapshot.empty()
+        self.max_delta = max_delta
+        self._journal = journal
+        self._write_lock = threading.Lock()
+        self._expiry_heap = []   # (expires_at, key); stale entries skipped on pop
+
+    def next_expiry(self):
+        """Earliest pending expiry time (possibly stale), or None"""
+        try:
+            return self._expiry_heap[0][0]
+        except IndexError:
+            return None
+
+    def transaction(self):
+        """Open a write transaction: `with blocklist.transaction() as txn:`"""
+        return Transaction(self)
+
+    def reset(self):
+        """Drop everything (used before replaying persisted state)"""
+        with self._write_lock:
+            self._expiry_heap = []
+            self.snapshot = BlocklistSnapshot(self.snapshot.version + 1, IntHashSet(), {},
+                                              frozenset(), frozenset(), {}, PrefixTable())
+
+
+class Transaction:
+    """Private working copy of the deltas, published atomically on exit"""
+
+    def __init__(self, owner):
+        self._owner = owner
+
+    def __enter__(self):
+        owner = self._owner
+        owner._write_lock.acquire()
+        snap = owner.snapshot
+        self._snap = snap
+        self._added = set(snap.added)
+        self._removed = set(snap.removed)
+        self._delta_expiry = dict(snap.delta_expiry)
+        self._prefixes = snap.prefixes
+        self._changed = False
+        self.records = []
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        owner = self._owner
+        try:
+            if exc_type is None and self._changed:
+                owner.snapshot = self._build()
+                if self.records and owner._journal is not None:
+                    # Journaled under the write lock so disk order == apply order
+                    owner._journal(self.records)
+        finally:
+            owner._write_lock.release()
+        return False
+
+    @property
+    def version(self):
+        return self._snap.version + (1 if self._changed else 0)
+
+    def journal(self, record):
+        """Queue a persistence record, written once the snapshot is published"""
+        self.records.append(record)
+
+    def __len__(self):
+        return len(self._snap.base) + len(self._added) - len(self._removed)
+
+    def contains_exact(self, key):
+        if key in self._added:
+            return True
+        if key in self._removed:
+            return False
+        return key in self._snap.base
+
+    def expires_at(self, key):
+        if key in self._delta_expiry:
+            return self._delta_expiry[key]
+        return self._snap.base_expiry.get(key)
+
+    def add(self, key):
+        """Add an exact MAC; returns False if it was already present"""
+        if key in self._removed:
+            self._removed.discard(key)
+        elif key in self._added or key in self._snap.base:
+            return False
+        else:
+            self._added.add(key)
+        self._changed = True
+        return True
+
+    def discard(self, key):
+        """Remove an exact MAC (and its expiry); returns False if absent"""
+        if key in self._added:
+            self._added.discard(key)
+        elif key in self._snap.base and key not in self._removed:
+            self._removed.add(key)
+        else:
+            return False
+        self.set_expiry(key, None)
+        self._changed = True
+        return True
+
+    def set_expiry(self, key, expires_at):
+        """Give an exact MAC an expiry time, or make it permanent (None)"""
+        if self.expires_at(key) == expires_at:
+            return
+        self._delta_expiry[key] = expires_at
+        if expires_at is not None:
+            heapq.heappush(self._owner._expiry_heap, (expires_at, key))
+        self._changed = True
+
+    def add_prefix(self, prefix_len, prefix):
+        self._own_prefixes()
+        if self._prefixes.add(prefix_len, prefix):
+            self._changed = True
+            return True
+        return False
+
+    def discard_prefix(self, prefix_len, prefix):
+        self._own_prefixes()
+        if self._prefixes.discard(prefix_len, prefix):
+            self._changed = True
+            return True
+        return False
+
+    def _own_prefixes(self):
+        # Prefix tables are tiny; copy on first write within the transaction
+        if self._prefixes is self._snap.prefixes:
+            self._prefixes = self._prefixes.copy()
+
+    def expire_due(self, now=None):
+        """Remove entries whose TTL has passed; O(k log n) for k due entries"""
+        now = time.time() if now is None else now
+        heap = self._owner._expiry_heap
+        expired = []
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            if self.expires_at(key) == expires_at and self.discard(key):
+                expired.append(key)
+        return expired
+
+    def _build(self):
+        snap = self._snap
+        version = snap.version + 1
+        delta = len(self._added) + len(self._removed) + len(self._delta_expiry)
+        if delta <= self._owner.max_delta:
+            return BlocklistSnapshot(version, snap.base, snap.base_expiry,
+                                     frozenset(self._added), frozenset(self._removed),
+                                     self._delta_expiry, self._prefixes)
+
+        # Merge the deltas into a fresh base; the published base stays intact
+        base = snap.base.copy()
+        for key in self._removed:
+            base.discard(key)
+        base.reserve(len(self._added))
+        for key in self._added:
+            base.add(key)
+        base_expiry = dict(snap.base_expiry)
+        for key, expires_at in self._delta_expiry.items():
+            if expires_at is None:
+                base_expiry.pop(key, None)
+            else:
+                base_expiry[key] = expires_at
+        return BlocklistSnapshot(version, base, base_expiry, frozenset(), frozenset(), {}, self._prefixes)
+
+
+def load_data(txn, data):
+    """Apply snapshot data (blocked_macs / prefix_rules / expirations)"""
+    for mac in data.get('blocked_macs', []):
+        txn.add(mac_to_int(mac))
+    for rule in data.get('prefix_rules', []):
+        txn.add_prefix(*parse_prefix(rule))
+    for mac, expires_at in data.get('expirations', {}).items():
+        txn.set_expiry(mac_to_int(mac), expires_at)
+
+
+def apply_record(txn, record):
+    """Replay one journal / change-feed record inside a write transaction"""
+    op = record.get('op')
+    if op == 'block':
+        key = mac_to_int(record['mac'])
+        txn.add(key)
+        txn.set_expiry(key, record.get('expires'))
+    elif op == 'unblock':
+        txn.discard(mac_to_int(record['mac']))
+    elif op == 'block_many':
+        for mac in record['macs']:
+            key = mac_to_int(mac)
+            txn.add(key)
+            txn.set_expiry(key, record.get('expires'))
+    elif op == 'expire':
+        for mac in record['macs']:
+            txn.discard(mac_to_int(mac))
+    elif op == 'block_prefix':
+        txn.add_prefix(*parse_prefix(record['rule']))
+    elif op == 'unblock_prefix':
+        txn.discard_prefix(*parse_prefix(record['rule']))
@@ -0,0 +1,305 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+# Blocklist persistence: every change is appended to a journal next to the
+# snapshot (logs/blocked_macs.json) so a block costs one small write no matter
+# how large the list is. The journal is fsync'd in groups by a background
+# thread and periodically compacted into a new snapshot, which is written to a
+# temp file and renamed into place so a crash never leaves a truncated file.
+
+DEFAULT_FSYNC_INTERVAL = 0.05   # seconds between group fsyncs
+DEFAULT_COMPACT_EVERY = 5000    # journal records before compaction
+DEFAULT_COMPACT_BYTES = 8 * 1024 * 1024  # journal size before compaction
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _read_journal(path):
+    """Read journal records, skipping a torn final line left by a crash"""
+    records = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logging.warning(f"⚠️  Skipping corrupt journal record in {path}")
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def write_atomic(path, data):
+    """Write JSON to a temp file, fsync it and rename it over path"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class BlocklistStore:
+    """Snapshot + append-only journal with group fsync and compaction"""
+
+    def __init__(self, snapshot_path, fsync_interval=DEFAULT_FSYNC_INTERVAL,
+                 compact_every=DEFAULT_COMPACT_EVERY, compact_bytes=DEFAULT_COMPACT_BYTES,
+                 observer=None):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + ".journal"
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.compact_bytes = compact_bytes
+        # Optional observer(kind, seconds) told how long each fsync/compaction took
+        self.observer = observer
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._journal = None
+        self._records = 0
+        self._bytes = 0
+        self._dirty = False
+        self._snapshot_fn = None
+        self._compact_requested = False
+        self._thread = None
+        self._stopping = False
+
+    def load(self):
+        """Return (snapshot dict, journal records) for replay on startup"""
+        data = _read_json(self.snapshot_path)
+        # A journal rotated out by an interrupted compaction comes first
+        records = _read_journal(self.journal_path + ".1")
+        records += _read_journal(self.journal_path)
+        self._records = len(records)
+        if os.path.exists(self.journal_path):
+            self._bytes = os.path.getsize(self.journal_path)
+        return data, records
+
+    def set_snapshot_source(self, snapshot_fn):
+        """Register the callable that returns the current snapshot dict"""
+        self._snapshot_fn = snapshot_fn
+
+    def append(self, record):
+        """Append one change record; durability follows within fsync_interval"""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Append several change records with a single write"""
+        if not records:
+            return
+        payload = ''.join(json.dumps(r, separators=(',', ':')) + "\n" for r in records)
+        with self._lock:
+            self._ensure_started()
+            self._journal.write(payload)
+            self._journal.flush()
+            self._records += len(records)
+            self._bytes += len(payload)
+            self._dirty = True
+            due = self._records >= self.compact_every or self._bytes >= self.compact_bytes
+            if due and self._snapshot_fn:
+                self._compact_requested = True
+            self._wakeup.notify()
+
+    def sync(self):
+        """Force pending journal writes to disk"""
+        started = time.perf_counter()
+        with self._lock:
+            synced = self._fsync_locked()
+        if synced:
+            self._observe('fsync', time.perf_counter() - started)
+
+    def compact(self):
+        """Write a fresh snapshot and drop the journal records it covers"""
+        started = time.perf_counter()
+        with self._lock:
+            if self._snapshot_fn is None:
+                return
+            data = self._snapshot_fn()
+            rotated = self._rotate_locked()
+        write_atomic(self.snapshot_path, data)
+        if rotated:
+            os.remove(self.journal_path + ".1")
+        self._observe('compact', time.perf_counter() - started)
+
+    def _observe(self, kind, seconds):
+        if self.observer is not None:
+            try:
+                self.observer(kind, seconds)
+            except Exception:
+                pass
+
+    def close(self):
+        """Stop the background thread and write a final snapshot"""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.compact()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _ensure_started(self):
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+            torn = False
+            if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0:
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self._journal = open(self.journal_path, 'a')
+            if torn:
+                # Terminate a torn final record so the next one parses
+                self._journal.write("\n")
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="blocklist-store")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _fsync_locked(self):
+        if self._dirty and self._journal is not None:
+            os.fsync(self._journal.fileno())
+            self._dirty = False
+            return True
+        return False
+
+    def _rotate_locked(self):
+        """Move the live journal aside so new appends go to a fresh file"""
+        self._fsync_locked()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self._records = 0
+        self._bytes = 0
+        self._compact_requested = False
+        if not os.path.exists(self.journal_path):
+            return False
+        rotated_path = self.journal_path + ".1"
+        if os.path.exists(rotated_path):
+            # Left over from an interrupted compaction: keep its records
+            with open(self.journal_path, 'r') as src, open(rotated_path, 'a') as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, rotated_path)
+        self._journal = open(self.journal_path, 'a')
+        return True
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._wakeup.wait(self.fsync_interval)
+                if self._stopping:
+                    self._fsync_locked()
+                    return
+                compact = self._compact_requested
+            # Give concurrent appends a moment to join this fsync group
+            time.sleep(self.fsync_interval)
+            try:
+                self.sync()
+                if compact:
+                    started = time.perf_counter()
+                    self.compact()
+                    logging.info(f"🗜️  Compacted blocklist journal in {(time.perf_counter() - started) * 1000:.1f} ms")
+            except Exception as e:
+                logging.error(f"Error persisting blocklist: {e}")
+
+
+def snapshot_data(blocked_macs, prefix_rules=(), expirations=None):
+    """Build the on-disk snapshot dict for a collection of MACs"""
+    macs = list(blocked_macs)
+    return {
+        'blocked_macs': macs,
+        'prefix_rules': list(prefix_rules),
+        'expirations': dict(expirations or {}),
+        'last_updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'total_blocked': len(macs)
+    }
+
+
+def blocklist_version(snapshot_path):
+    """
+    Cheap change marker for the persisted blocklist: (mtime_ns, size) of the
+    snapshot and both journals. Any block/unblock/compaction changes it.
+    """
+    version = []
+    for path in (snapshot_path, snapshot_path + ".journal.1", snapshot_path + ".journal"):
+        try:
+            st = os.stat(path)
+            version.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+def read_blocklist(snapshot_path, now=None):
+    """Replay snapshot + journal for readers outside the firewall server"""
+    store = BlocklistStore(snapshot_path)
+    data, records = store.load()
+    macs = set(data.get('blocked_macs', []))
+    rules = set(data.get('prefix_rules', []))
+    expirations = dict(data.get('expirations', {}))
+    last_updated = data.get('last_updated')
+    for record in records:
+        op = record.get('op')
+        if op == 'block':
+            macs.add(record['mac'])
+            _set_expiry(expirations, record['mac'], record.get('expires'))
+        elif op == 'unblock':
+            macs.discard(record['mac'])
+            expirations.pop(record['mac'], None)
+        elif op == 'block_many':
+            macs.update(record['macs'])
+            for mac in record['macs']:
+                _set_expiry(expirations, mac, record.get('expires'))
+        elif op == 'expire':
+            macs.difference_update(record['macs'])
+            for mac in record['macs']:
+                expirations.pop(mac, None)
+        elif op == 'block_prefix':
+            rules.add(record['rule'])
+        elif op == 'unblock_prefix':
+            rules.discard(record['rule'])
+        if 'ts' in record:
+            last_updated = datetime.fromtimestamp(record['ts']).strftime("%Y-%m-%d %H:%M:%S")
+
+    # Blocks past their TTL are gone even if the server hasn't journaled it yet
+    now = time.time() if now is None else now
+    lapsed = [mac for mac, expires_at in expirations.items() if expires_at <= now]
+    macs.difference_update(lapsed)
+    for mac in lapsed:
+        del expirations[mac]
+
+    return {
+        'blocked_macs': sorted(macs),
+        'prefix_rules': sorted(rules),
+        'expirations': expirations,
+        'last_updated': last_updated,
+        'total_blocked': len(macs)
+    }
+
+
+def _set_expiry(expirations, mac, expires_at):
+    if expires_at is None:
+        expirations.pop(mac, None)
+    else:
+        expirations[mac] = expires_at
@@ -1,135 +1,231 @@
+import os
 import socket
 import threading
 import logging
-import re
 import json
-from datetime import datetime
+import time
+import argparse
+from blocklist_store import read_blocklist
+from blocklist_engine import BlocklistEngine, BLOCK_LOG_FILE, ENFORCEMENT_MODES, NFT_DRY_RUN_FILE, is_valid_mac
+from mac_table import mac_to_int, int_to_mac
 
 logging.basicConfig(level=logging.INFO)
 
 HOST = "127.0.0.1"
 PORT = 9000
-MAC_REGEX = re.compile(r"^([0-9A-Fa-f]{2}:){5}[0-9A-Fa-f]{2}$")
 
-# In-memory blocklist (simulates firewall blocking)
-# In production, this would integrate with actual Windows Firewall
-blocked_macs = set()
-block_log_file = "logs/blocked_macs.json"
+# Batch commands carry a body of MACs terminated by EOF or an END line
+BATCH_COMMANDS = {"BLOCK_MANY", "CHECK_MANY", "IMPORT"}
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+# IMPORT <name> only reads files under this directory ('' = body form only)
+IMPORT_DIR = "logs/imports"
 
-def load_blocklist():
-    """Load previously blocked MACs from file"""
-    global blocked_macs
-    try:
-        with open(block_log_file, 'r') as f:
-            data = json.load(f)
-            blocked_macs = set(data.get('blocked_macs', []))
-            logging.info(f"📋 Loaded {len(blocked_macs)} previously blocked MACs")
-    except FileNotFoundError:
-        blocked_macs = set()
-        logging.info("📋 No previous blocklist found, starting fresh")
-    except Exception as e:
-        logging.error(f"Error loading blocklist: {e}")
-        blocked_macs = set()
+# TCP front end over a BlocklistEngine (blocklist_engine.py). Run on its own
+# this process owns the blocklist; a sniffer or API hosting the engine
+# in-process (firewall_mode: embedded) serves the same protocol with
+# start_front_end() so replicas, the dashboard and scripts keep working.
+# In production, the engine would integrate with actual Windows Firewall
+block_log_file = BLOCK_LOG_FILE
+engine = BlocklistEngine(block_log_file)
 
-def save_blocklist():
-    """Save blocked MACs to file"""
-    try:
-        import os
-        os.makedirs('logs', exist_ok=True)
-        
-        data = {
-            'blocked_macs': list(blocked_macs),
-            'last_updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'total_blocked': len(blocked_macs)
-        }
-        
-        with open(block_log_file, 'w') as f:
-            json.dump(data, f, indent=2)
-            
-    except Exception as e:
-        logging.error(f"Error saving blocklist: {e}")
+# The standalone server's engine, under the names scripts and tests use
+stats = engine.stats
+store = engine.store
+feed = engine.feed
+blocklist = engine.blocklist
+load_blocklist = engine.load
+save_blocklist = engine.save
+expire_due = engine.expire_due
+start_enforcer = engine.start_enforcer
+block_mac = engine.block_mac
+block_many = engine.block_many
+block_prefix = engine.block_prefix
+unblock_prefix = engine.unblock_prefix
+unblock_mac = engine.unblock_mac
+check_many = engine.check_many
+is_blocked = engine.is_blocked
+blocked_by = engine.blocked_by
+get_blocklist = engine.get_blocklist
+get_prefix_rules = engine.get_prefix_rules
 
-def is_valid_mac(mac):
-    """Validate MAC address format"""
-    return MAC_REGEX.match(mac) is not None
+# Commands tracked individually in STATS; anything else is a plain block
+KNOWN_COMMANDS = {"BLOCK", "UNBLOCK", "LIST", "CHECK", "BLOCK_MANY", "CHECK_MANY", "IMPORT",
+                  "BLOCK_PREFIX", "UNBLOCK_PREFIX", "MEMORY", "STATS", "WATCH"}
+WATCH_HEARTBEAT = 5.0
 
-def block_mac(mac):
-    """
-    Block MAC address (Windows-compatible simulation)
-    
-    Note: Real Windows firewall blocking by MAC requires:
-    - Network driver support
-    - Advanced firewall rules
-    - Or third-party tools
-    
-    This implementation maintains a blocklist that can be used by:
-    1. The detection engine to ignore/alert on blocked MACs
-    2. Integration with network equipment
-    3. Export to actual firewall solutions
+MMAP_FILE = "logs/blocked_macs.mmap"
+
+def start_mmap_publisher(path=MMAP_FILE):
+    return engine.start_mmap_publisher(path)
+
+def parse_mac_list(text):
+    """Split a batch body into MACs (whitespace/comma separated, # comments)"""
+    if '#' in text:
+        text = "\n".join(line.split('#', 1)[0] for line in text.splitlines())
+    return [token for token in text.replace(',', ' ').split() if token.upper() != "END"]
+
+def read_request(conn):
+    """Read one request; batch commands keep reading until EOF or END"""
+    data = conn.recv(65536)
+    words = data.split(None, 2)
+    command = words[0].decode('utf-8', 'replace').upper() if words else ""
+    if command not in BATCH_COMMANDS:
+        return data.decode('utf-8')
+    # IMPORT <path> names a server-side file and has no body (TTL= alone doesn't)
+    args = [word for word in data.split(b"\n", 1)[0].split()[1:] if not word.upper().startswith(b"TTL=")]
+    if command == "IMPORT" and args:
+        return data.decode('utf-8')
+
+    chunks = [data]
+    size = len(data)
+    tail = data[-8:]
+    while not (tail.rstrip().endswith(b"\nEND") or tail.strip() == b"END"):
+        chunk = conn.recv(1024 * 1024)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > MAX_REQUEST_BYTES:
+            raise ValueError(f"Batch request exceeds {MAX_REQUEST_BYTES} bytes")
+        tail = (tail + chunk)[-8:]
+    return b"".join(chunks).decode('utf-8')
+
+def import_path(name):
+    """Resolve IMPORT <name> inside IMPORT_DIR; anything outside it is refused"""
+    if not IMPORT_DIR:
+        raise ValueError("IMPORT from a server-side file is disabled; send the MACs in the body")
+    root = os.path.realpath(IMPORT_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise ValueError(f"IMPORT: no such file in the import directory: {name}")
+    return path
+
+def split_ttl(tokens):
+    """Pull an optional TTL=<seconds> token out of a command line"""
+    ttl = None
+    rest = []
+    for token in tokens:
+        if token.upper().startswith("TTL="):
+            ttl = float(token[4:])
+            if ttl <= 0:
+                raise ValueError(f"TTL must be positive: {token}")
+        else:
+            rest.append(token)
+    return ttl, rest
+
+def snapshot_message(snap, engine):
+    """Full blocklist state for a WATCH subscriber"""
+    return {
+        'type': 'snapshot',
+        'epoch': engine.feed.epoch,
+        'version': snap.version,
+        'blocked_macs': snap.macs(),
+        'prefix_rules': snap.prefix_rules(),
+        'expirations': {int_to_mac(key): expires_at for key, expires_at in snap.expirations().items()}
+    }
+
+def serve_watch(conn, args, engine):
     """
-    try:
-        mac_lower = mac.lower()
-        
-        if mac_lower in blocked_macs:
-            return True, f"MAC {mac} already blocked (total: {len(blocked_macs)})"
-        
-        # Add to blocklist
-        blocked_macs.add(mac_lower)
-        
-        # Save to persistent storage
-        save_blocklist()
-        
-        # Log the block
-        logging.info(f"✅ Added {mac} to blocklist")
-        
-        return True, f"Successfully added {mac} to blocklist (total: {len(blocked_macs)})"
-        
-    except Exception as e:
-        return False, f"Exception: {str(e)}"
+    WATCH [EPOCH=<id> FROM=<version>]: stream the blocklist as JSON lines.
 
-def is_blocked(mac):
-    """Check if MAC is in blocklist"""
-    return mac.lower() in blocked_macs
+    A new subscriber gets one 'snapshot' message; a replica that passes the
+    epoch and version it last applied gets 'resume' instead. After that every
+    committed change arrives as a 'delta' message carrying the journal
+    records for one version, with a 'ping' when nothing changed for a while.
+    """
+    options = dict(arg.split('=', 1) for arg in args if '=' in arg)
+    epoch = options.get('EPOCH', options.get('epoch'))
+    version = options.get('FROM', options.get('from'))
+    version = int(version) if version is not None else None
+    out = conn.makefile('wb')
 
-def get_blocklist():
-    """Get current blocklist"""
-    return list(blocked_macs)
+    def send(message):
+        out.write(json.dumps(message, separators=(',', ':')).encode('utf-8') + b"\n")
 
-def unblock_mac(mac):
-    """Remove MAC from blocklist"""
     try:
-        mac_lower = mac.lower()
-        if mac_lower in blocked_macs:
-            blocked_macs.remove(mac_lower)
-            save_blocklist()
-            return True, f"Removed {mac} from blocklist"
+        if version is not None and engine.feed.can_resume(epoch, version):
+            send({'type': 'resume', 'epoch': engine.feed.epoch, 'version': version})
+            logging.info(f"👀 Watcher resumed from version {version}")
         else:
-            return False, f"MAC {mac} not in blocklist"
-    except Exception as e:
-        return False, f"Exception: {str(e)}"
+            snap = engine.blocklist.snapshot
+            send(snapshot_message(snap, engine))
+            version = snap.version
+            logging.info(f"👀 Watcher subscribed at version {version}")
+        out.flush()
 
-def handle_client(conn, addr):
-    """Handle client connection and blocking requests"""
+        while True:
+            changes = engine.feed.since(version)
+            if changes is None:
+                # Fell further behind than the feed history: start over
+                snap = engine.blocklist.snapshot
+                send(snapshot_message(snap, engine))
+                version = snap.version
+            else:
+                for version, records in changes:
+                    send({'type': 'delta', 'version': version, 'records': records})
+            out.flush()
+            if not engine.feed.wait(version, WATCH_HEARTBEAT):
+                send({'type': 'ping', 'version': version})
+                out.flush()
+    except OSError:
+        logging.info(f"👋 Watcher disconnected at version {version}")
+
+def handle_client(conn, addr, engine=engine):
+    """Handle client connection and blocking requests against `engine`"""
     logging.info(f"🔗 New connection from {addr}")
+    engine.stats.connection_opened()
+    command = None
+    ok = True
     
     try:
-        data = conn.recv(1024).decode('utf-8').strip()
+        data = read_request(conn).strip()
+        started = time.perf_counter()
         
         if not data:
             return
         
         # Handle different commands
-        parts = data.split()
+        line, _, body = data.partition("\n")
+        parts = line.split()
         command = parts[0].upper() if parts else ""
         mac = parts[1] if len(parts) > 1 else data.strip()
         
-        if command == "UNBLOCK":
+        if command == "WATCH":
+            # Long-lived subscription; returns when the watcher goes away
+            serve_watch(conn, parts[1:], engine)
+            return
+
+        if command in ("BLOCK_MANY", "IMPORT"):
+            # Batch block: MACs on the command line and/or in the body
+            ttl, args = split_ttl(parts[1:])
+            if command == "IMPORT" and args and not body:
+                with open(import_path(args[0]), 'r') as f:
+                    macs = parse_mac_list(f.read())
+                source = args[0]
+            else:
+                macs = parse_mac_list(" ".join(args) + "\n" + body)
+                source = "request body"
+            logging.info(f"🚫 Batch block request for {len(macs)} MACs from {source}")
+            # Never echo tokens read from a server-side file back to the client
+            success, message = engine.block_many(macs, ttl, show_invalid=source == "request body")
+            response = f"{message}\n"
+            if success:
+                logging.info(f"✅ {message}")
+            else:
+                logging.warning(f"⚠️  {message}")
+
+        elif command == "CHECK_MANY":
+            macs = parse_mac_list(" ".join(parts[1:]) + "\n" + body)
+            response = "\n".join(engine.check_many(macs)) + "\n"
+            logging.info(f"🔍 Checked {len(macs)} MACs")
+
+        elif command == "UNBLOCK":
             # Unblock command
             if not is_valid_mac(mac):
                 response = f"Invalid MAC address format: {mac}\n"
                 logging.warning(f"⚠️  {response.strip()}")
             else:
-                success, message = unblock_mac(mac)
+                success, message = engine.unblock_mac(mac)
                 response = f"{message}\n"
                 if success:
                     logging.info(f"♻️  {message}")
@@ -137,31 +233,70 @@ def handle_client(conn, addr):
                     logging.warning(f"⚠️  {message}")
                     
         elif command == "LIST":
-            # List all blocked MACs
-            macs = get_blocklist()
+            # List all blocked MACs (one snapshot, so both parts agree)
+            snap = engine.blocklist.snapshot
+            macs = snap.macs()
             response = f"Blocked MACs ({len(macs)}): {', '.join(macs)}\n"
-            logging.info(f"📋 Sent blocklist: {len(macs)} MACs")
+            rules = snap.prefix_rules()
+            if rules:
+                response += f"Prefix rules ({len(rules)}): {', '.join(rules)}\n"
+            logging.info(f"📋 Sent blocklist: {len(macs)} MACs, {len(rules)} prefix rules")
+
+        elif command in ("BLOCK_PREFIX", "UNBLOCK_PREFIX"):
+            # Prefix rules: aa:bb:cc:*:*:*, aa:bb:cc or aa:bb:cc:00:00:00/24
+            if command == "BLOCK_PREFIX":
+                success, message = engine.block_prefix(mac)
+            else:
+                success, message = engine.unblock_prefix(mac)
+            response = f"{message}\n"
+            if success:
+                logging.info(f"✅ {message}")
+            else:
+                logging.warning(f"⚠️  {message}")
+
+        elif command == "MEMORY":
+            response = json.dumps(engine.blocklist.snapshot.memory_usage()) + "\n"
+
+        elif command == "STATS":
+            # STATS -> JSON, STATS PROMETHEUS -> text exposition format
+            if len(parts) > 1 and parts[1].upper() == "PROMETHEUS":
+                response = engine.stats.prometheus()
+            else:
+                response = json.dumps(engine.stats.snapshot()) + "\n"
             
         elif command == "CHECK":
             # Check if MAC is blocked
             if not is_valid_mac(mac):
                 response = f"Invalid MAC address format: {mac}\n"
             else:
-                blocked = is_blocked(mac)
-                response = f"MAC {mac}: {'BLOCKED' if blocked else 'NOT BLOCKED'}\n"
+                snap = engine.blocklist.snapshot
+                match = snap.match(mac_to_int(mac))
+                if match is None:
+                    response = f"MAC {mac}: NOT BLOCKED\n"
+                elif match == 'exact':
+                    ttl = snap.remaining_ttl(mac_to_int(mac))
+                    if ttl is None:
+                        response = f"MAC {mac}: BLOCKED\n"
+                    else:
+                        response = f"MAC {mac}: BLOCKED (expires in {max(ttl, 0):.0f}s)\n"
+                else:
+                    response = f"MAC {mac}: BLOCKED (prefix {match})\n"
                 
         else:
-            # Default: Block MAC
-            mac = data.strip()
+            # Default: Block MAC ("<MAC>" or "BLOCK <MAC> [TTL=<seconds>]")
+            ttl, args = split_ttl(parts[1:] if command == "BLOCK" else parts)
+            mac = " ".join(args)
             logging.info(f"🚫 Block request for MAC: {mac}")
             
             if not is_valid_mac(mac):
                 response = f"Invalid MAC address format: {mac}\n"
                 logging.warning(f"⚠️  {response.strip()}")
             else:
-                success, message = block_mac(mac)
+                success, message = engine.block_mac(mac, ttl)
                 
-                if success:
+                if success and ttl:
+                    response = f"Blocked MAC: {mac} (expires in {ttl:g}s)\n"
+                elif success:
                     response = f"Blocked MAC: {mac}\n"
                     logging.info(f"✅ {message}")
                 else:
@@ -170,12 +305,23 @@ def handle_client(conn, addr):
         
         conn.sendall(response.encode('utf-8'))
         
+    except ValueError as e:
+        # Malformed arguments (bad TTL, oversized batch, ...)
+        ok = False
+        logging.warning(f"⚠️  {e}")
+        conn.sendall(f"{e}\n".encode('utf-8'))
     except Exception as e:
+        ok = False
         logging.error(f"Error handling client: {e}")
     finally:
         conn.close()
+        engine.stats.connection_closed()
+        # WATCH is a long-lived stream, its duration isn't a request latency
+        if command is not None and command != "WATCH":
+            name = command if command in KNOWN_COMMANDS else "BLOCK"
+            engine.stats.record(name, time.perf_counter() - started, ok)
 
-def start_firewall_server():
+def start_firewall_server(enforce="none", mmap_file=MMAP_FILE):
     """Start the firewall server"""
     print("=" * 70)
     print("🔥 Shakti Firewall Server (Windows Edition)")
@@ -184,61 +330,156 @@ def start_firewall_server():
     print()
     print("📝 Commands:")
     print("   <MAC>          - Block MAC address")
+    print("   BLOCK <MAC> [TTL=<s>] - Block MAC address, optionally for <s> seconds")
     print("   UNBLOCK <MAC>  - Unblock MAC address")
     print("   LIST           - Show all blocked MACs")
     print("   CHECK <MAC>    - Check if MAC is blocked")
+    print("   BLOCK_MANY [TTL=<s>]  - Block MACs listed in the body (EOF or END terminated)")
+    print("   CHECK_MANY     - Check MACs listed in the body")
+    print(f"   IMPORT [name]  - Block MACs from a file in {IMPORT_DIR or '(disabled)'} or the body")
+    print("   BLOCK_PREFIX <rule>   - Block a prefix (aa:bb:cc:*:*:* or .../24)")
+    print("   UNBLOCK_PREFIX <rule> - Remove a prefix rule")
+    print("   MEMORY         - Report blocklist memory usage")
+    print("   WATCH [EPOCH=<id> FROM=<v>] - Stream snapshot + changes (JSON lines)")
+    print("   STATS [PROMETHEUS]    - Request counters, latency histograms, gauges")
     print()
     print("ℹ️  Note: This maintains a persistent blocklist in logs/blocked_macs.json")
-    print("   Integrate with your network equipment for actual blocking")
+    print("   (changes are journaled to logs/blocked_macs.json.journal and compacted)")
+    if mmap_file:
+        print(f"   Local processes can mmap the sorted blocklist in {mmap_file}")
+    if enforce == "nft":
+        print("   Enforced in the kernel via the nftables set inet shakti blocked_macs")
+    elif enforce == "dry-run":
+        print(f"   nftables dry run: generated rulesets are written to {NFT_DRY_RUN_FILE}")
+    else:
+        print("   Integrate with your network equipment for actual blocking")
     print()
     print("Press Ctrl+C to stop")
     print("=" * 70)
     
-    # Load existing blocklist
-    load_blocklist()
-    
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    
+    # Bind first: if an embedded engine already owns the port, its blocklist
+    # and mmap files are left alone
     try:
-        server_socket.bind((HOST, PORT))
-        server_socket.listen(5)
-        logging.info(f"✅ Server started successfully")
-        
-        while True:
-            conn, addr = server_socket.accept()
-            # Handle each client in a separate thread
-            client_thread = threading.Thread(target=handle_client, args=(conn, addr))
-            client_thread.daemon = True
-            client_thread.start()
-            
+        server_socket = listen(HOST, PORT)
+    except OSError as e:
+        logging.error(f"Server error: {e}")
+        return
+    # Load existing blocklist, then enforcement, the mmap copy and the reaper
+    try:
+        engine.start(enforce, mmap_file)
+    except OSError as e:
+        # e.g. an embedded engine without a front end owns the blocklist
+        logging.error(f"Server error: {e}")
+        server_socket.close()
+        return
+    logging.info(f"✅ Server started successfully")
+
+    try:
+        serve(server_socket)
     except KeyboardInterrupt:
         print("\n🛑 Shutting down firewall server...")
-        print(f"📊 Final stats: {len(blocked_macs)} MACs blocked")
-        save_blocklist()
+        print(f"📊 Final stats: {len(engine)} MACs blocked")
+        engine.stop()
     except Exception as e:
         logging.error(f"Server error: {e}")
     finally:
         server_socket.close()
         logging.info("✅ Server stopped")
 
+def listen(host, port):
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+        # On Windows SO_REUSEADDR would let a second server bind the same port
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+    else:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        server_socket.bind((host, port))
+        server_socket.listen(128)
+    except OSError:
+        server_socket.close()
+        raise
+    return server_socket
+
+def serve(server_socket, engine=engine):
+    """Accept connections until the socket is closed, one handler thread each"""
+    while True:
+        try:
+            conn, addr = server_socket.accept()
+        except OSError:
+            if server_socket.fileno() == -1:
+                return
+            raise
+        # Handle each client in a separate thread
+        client_thread = threading.Thread(target=handle_client, args=(conn, addr, engine))
+        client_thread.daemon = True
+        client_thread.start()
+
+def start_front_end(engine, server_socket):
+    """Serve an in-process engine over TCP from a background thread; close the socket to stop"""
+    threading.Thread(target=serve, args=(server_socket, engine), name="firewall-front-end", daemon=True).start()
+    host, port = server_socket.getsockname()[:2]
+    logging.info(f"🌐 Firewall front end listening on {host}:{port}")
+
+def start_embedded(config):
+    """
+    Host an engine in this process as config.yaml describes, with the TCP
+    front end on firewall_host:firewall_port unless firewall_listen is off.
+    The port is bound before the blocklist is loaded, so if a standalone
+    server already owns it (or another engine owns the blocklist file) this
+    raises OSError instead of sharing the files.
+    """
+    hosted = BlocklistEngine(config.get('blocklist_file', BLOCK_LOG_FILE))
+    server_socket = None
+    if config.get('firewall_listen', True):
+        server_socket = listen(config.get('firewall_host', HOST), config.get('firewall_port', PORT))
+    try:
+        hosted.start(config.get('firewall_enforce', "none"), config.get('blocklist_mmap', MMAP_FILE))
+    except OSError:
+        if server_socket is not None:
+            server_socket.close()
+        raise
+    if server_socket is not None:
+        start_front_end(hosted, server_socket)
+    logging.info(f"🔥 Blocklist engine running in-process ({len(hosted)} MACs blocked)")
+    return hosted
+
 if __name__ == "__main__":
-    start_firewall_server()
+    parser = argparse.ArgumentParser(description="Shakti firewall server")
+    parser.add_argument("--enforce", choices=ENFORCEMENT_MODES, default="none",
+                        help="mirror the blocklist into nftables (nft) or a dry-run file")
+    parser.add_argument("--import-dir", default=IMPORT_DIR,
+                        help="directory IMPORT <name> may read from ('' to allow only the body form)")
+    parser.add_argument("--mmap-file", default=MMAP_FILE,
+                        help="memory-mapped blocklist for local readers ('' to disable)")
+    args = parser.parse_args()
+    IMPORT_DIR = args.import_dir
+    start_firewall_server(enforce=args.enforce, mmap_file=args.mmap_file)
 
 # Add this to the end of firewall_server.py
 
-import flask
-from flask import Flask, jsonify
-app = Flask("blocklist_api")
+try:
+    from flask import Flask, Response, jsonify
+    FLASK_AVAILABLE = True
+except ImportError:
+    # The TCP server itself only needs the standard library
+    FLASK_AVAILABLE = False
 
-@app.route("/blocklist")
-def blocklist():
-    try:
-        with open("logs/blocked_macs.json","r") as f:
-            data = json.load(f)
-        return jsonify(data.get("blocked_macs",[]))
-    except:
-        return jsonify([])
+if FLASK_AVAILABLE:
+    app = Flask("blocklist_api")
+
+    @app.route("/blocklist")
+    def blocklist_api():
+        try:
+            data = read_blocklist(block_log_file)
+            return jsonify(data.get("blocked_macs",[]))
+        except:
+            return jsonify([])
+
+    @app.route("/metrics")
+    def metrics_api():
+        # Prometheus scrape endpoint (same data as STATS PROMETHEUS)
+        return Response(engine.stats.prometheus(), mimetype="text/plain; version=0.0.4")
     
 if __name__ == "__main__":
     # (Don't run Flask by default here; run only if passed a flag!)
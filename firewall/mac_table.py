@@ -0,0 +1,255 @@
+import re
+import sys
+from array import array
+
+# Compact blocklist storage. MACs are kept as 48-bit integers in an
+# open-addressing hash set backed by array('Q') (8 bytes per slot instead of a
+# ~60 byte str object), and prefix rules (OUI /24 or any /1-/48 mask) live in
+# one hash set per prefix length so a lookup costs one probe per length in use.
+
+MAC_BITS = 48
+_EMPTY = 0xFFFFFFFFFFFFFFFF
+_DELETED = 0xFFFFFFFFFFFFFFFE
+_HASH_MULT = 0x9E3779B97F4A7C15
+_U64 = 0xFFFFFFFFFFFFFFFF
+_MAX_LOAD = 0.7
+_OCTET_REGEX = re.compile(r"^[0-9a-f]{2}$")
+
+
+def mac_to_int(mac):
+    """'aa:bb:cc:dd:ee:ff' -> 48-bit integer"""
+    return int(mac.replace(':', ''), 16)
+
+
+def int_to_mac(value):
+    """48-bit integer -> 'aa:bb:cc:dd:ee:ff'"""
+    return value.to_bytes(6, 'big').hex(':')
+
+
+def parse_prefix(rule):
+    """
+    Parse a prefix rule into (prefix_len, prefix_value).
+
+    Accepted forms: 'aa:bb:cc:00:00:00/24', 'aa:bb:cc:*:*:*' and the short
+    OUI form 'aa:bb:cc'. Raises ValueError for anything else.
+    """
+    rule = rule.strip().lower()
+    if '/' in rule:
+        address, length = rule.split('/', 1)
+        octets = address.split(':')
+        prefix_len = int(length)
+    else:
+        octets = rule.split(':')
+        fixed = []
+        for octet in octets:
+            if octet == '*':
+                break
+            fixed.append(octet)
+        if any(octet != '*' for octet in octets[len(fixed):]):
+            raise ValueError(f"Invalid prefix rule: {rule}")
+        prefix_len = 8 * len(fixed)
+        octets = fixed + ['00'] * (6 - len(fixed))
+
+    if len(octets) != 6 or not all(_OCTET_REGEX.match(o) for o in octets):
+        raise ValueError(f"Invalid prefix rule: {rule}")
+    if not 1 <= prefix_len <= MAC_BITS:
+        raise ValueError(f"Prefix length must be between 1 and {MAC_BITS}: {rule}")
+    return prefix_len, int(''.join(octets), 16) >> (MAC_BITS - prefix_len)
+
+
+def format_prefix(prefix_len, prefix):
+    """(24, 0xaabbcc) -> 'aa:bb:cc:00:00:00/24'"""
+    return f"{int_to_mac(prefix << (MAC_BITS - prefix_len))}/{prefix_len}"
+
+
+class IntHashSet:
+    """Set of 48-bit integers using linear probing over a flat array('Q')"""
+
+    __slots__ = ('_slots', '_shift', '_mask', '_size', '_used')
+
+    def __init__(self, capacity=0):
+        slots = 16
+        while slots * _MAX_LOAD < capacity:
+            slots *= 2
+        self._allocate(slots)
+
+    def _allocate(self, slots):
+        self._slots = array('Q', [_EMPTY]) * slots
+        self._mask = slots - 1
+        self._shift = 64 - (slots.bit_length() - 1)
+        self._size = 0
+        self._used = 0
+
+    def _home(self, key):
+        return ((key * _HASH_MULT) & _U64) >> self._shift
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        slots = self._slots
+        mask = self._mask
+        i = self._home(key)
+        while True:
+            value = slots[i]
+            if value == key:
+                return True
+            if value == _EMPTY:
+                return False
+            i = (i + 1) & mask
+
+    def __iter__(self):
+        for value in self._slots:
+            if value < _DELETED:
+                yield value
+
+    def add(self, key):
+        """Insert key; returns False if it was already present"""
+        slots = self._slots
+        mask = self._mask
+        i = self._home(key)
+        tombstone = -1
+        while True:
+            value = slots[i]
+            if value == key:
+                return False
+            if value == _EMPTY:
+                break
+            if value == _DELETED and tombstone < 0:
+                tombstone = i
+            i = (i + 1) & mask
+        if tombstone >= 0:
+            i = tombstone
+        else:
+            self._used += 1
+        slots[i] = key
+        self._size += 1
+        if self._used > len(slots) * _MAX_LOAD:
+            self._rehash()
+        return True
+
+    def discard(self, key):
+        """Remove key; returns False if it was not present"""
+        slots = self._slots
+        mask = self._mask
+        i = self._home(key)
+        while True:
+            value = slots[i]
+            if value == key:
+                slots[i] = _DELETED
+                self._size -= 1
+                return True
+            if value == _EMPTY:
+                return False
+            i = (i + 1) & mask
+
+    def reserve(self, extra):
+        """Grow up front so inserting `extra` more keys never rehashes"""
+        needed = self._used + extra
+        slots = len(self._slots)
+        if needed <= slots * _MAX_LOAD:
+            return
+        while slots * _MAX_LOAD < needed:
+            slots *= 2
+        old = self._slots
+        self._allocate(slots)
+        for value in old:
+            if value < _DELETED:
+                self.add(value)
+
+    def copy(self):
+        clone = IntHashSet.__new__(IntHashSet)
+        clone._slots = array('Q', self._slots)
+        clone._shift = self._shift
+        clone._mask = self._mask
+        clone._size = self._size
+        clone._used = self._used
+        return clone
+
+    def _rehash(self):
+        """Grow (or just drop tombstones) once the load factor is exceeded"""
+        old = self._slots
+        slots = len(old)
+        if self._size > slots * _MAX_LOAD / 2:
+            slots *= 2
+        self._allocate(slots)
+        for value in old:
+            if value < _DELETED:
+                self.add(value)
+
+    @property
+    def nbytes(self):
+        return self._slots.itemsize * len(self._slots)
+
+
+class PrefixTable:
+    """Prefix rules, one hash set per prefix length"""
+
+    def __init__(self):
+        self._prefixes = {}   # prefix_len -> set of prefix values
+        self._shifts = []     # (shift, prefix set), longest prefix first
+
+    def __len__(self):
+        return sum(len(prefixes) for prefixes in self._prefixes.values())
+
+    def add(self, prefix_len, prefix):
+        prefixes = self._prefixes.setdefault(prefix_len, set())
+        if prefix in prefixes:
+            return False
+        prefixes.add(prefix)
+        self._reindex()
+        return True
+
+    def discard(self, prefix_len, prefix):
+        prefixes = self._prefixes.get(prefix_len)
+        if not prefixes or prefix not in prefixes:
+            return False
+        prefixes.remove(prefix)
+        if not prefixes:
+            del self._prefixes[prefix_len]
+        self._reindex()
+        return True
+
+    def _reindex(self):
+        self._shifts = [(MAC_BITS - length, self._prefixes[length])
+                        for length in sorted(self._prefixes, reverse=True)]
+
+    def match(self, key):
+        """Return the longest matching prefix rule string, or None"""
+        for shift, prefixes in self._shifts:
+            if (key >> shift) in prefixes:
+                return format_prefix(MAC_BITS - shift, key >> shift)
+        return None
+
+    def rules(self):
+        """Prefix rules as canonical strings"""
+        return [format_prefix(length, prefix)
+                for length in sorted(self._prefixes)
+                for prefix in sorted(self._prefixes[length])]
+
+    def copy(self):
+        clone = PrefixTable()
+        clone._prefixes = {length: set(prefixes) for length, prefixes in self._prefixes.items()}
+        clone._reindex()
+        return clone
+
+    @property
+    def nbytes(self):
+        return sum(sys.getsizeof(prefixes) + sum(sys.getsizeof(p) for p in prefixes)
+                   for prefixes in self._prefixes.values())
+
+
+def memory_report(exact, prefixes):
+    """Approximate memory held by an exact set and a prefix table, in bytes"""
+    exact_bytes = exact.nbytes
+    prefix_bytes = prefixes.nbytes
+    entries = len(exact)
+    return {
+        'exact_entries': entries,
+        'exact_bytes': exact_bytes,
+        'prefix_rules': len(prefixes),
+        'prefix_bytes': prefix_bytes,
+        'total_bytes': exact_bytes + prefix_bytes,
+        'bytes_per_mac': round(exact_bytes / entries, 1) if entries else 0.0
+    }
+
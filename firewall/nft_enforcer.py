@@ -0,0 +1,259 @@
+import logging
+import os
+import subprocess
+import threading
+import time
+
+from mac_table import MAC_BITS, int_to_mac, mac_to_int, parse_prefix
+
+# Kernel enforcement through nftables. Instead of one `nft add rule` per MAC
+# (a linear chain walked for every packet and a process per block), all exact
+# MACs live in one named set with per-element timeouts (a kernel hash lookup)
+# and prefix rules in an interval set. Committed blocklist changes are queued,
+# and a background thread turns each batch into a single `nft -f` script,
+# which nftables applies as one atomic transaction.
+
+DEFAULT_TABLE = "shakti"
+DEFAULT_BATCH_INTERVAL = 0.05   # seconds to gather changes into one transaction
+ELEMENTS_PER_LINE = 1000        # keep individual script lines a sane length
+RETRY_DELAY = 5.0               # back off after a failed transaction
+EXPIRY_SLACK = 1.0              # elements this close to timing out are left to the kernel
+
+
+class NftBackend:
+    """Runs generated scripts through `nft -f -` (needs root / CAP_NET_ADMIN)"""
+
+    def __init__(self, nft="nft"):
+        self.nft = nft
+
+    def apply(self, script):
+        result = subprocess.run([self.nft, "-f", "-"], input=script, text=True,
+                                capture_output=True, timeout=30)
+        if result.returncode != 0:
+            raise RuntimeError(f"nft failed: {result.stderr.strip()}")
+
+
+class DryRunBackend:
+    """Writes generated scripts to a file instead of the kernel"""
+
+    def __init__(self, path):
+        self.path = path
+        self.transactions = 0
+
+    def apply(self, script):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.transactions += 1
+        mode = 'w' if self.transactions == 1 else 'a'
+        with open(self.path, mode) as f:
+            f.write(f"# transaction {self.transactions} at {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(script)
+            f.write("\n")
+
+
+def prefix_range(prefix_len, prefix):
+    """(24, 0xaabbcc) -> 'aa:bb:cc:00:00:00-aa:bb:cc:ff:ff:ff'"""
+    shift = MAC_BITS - prefix_len
+    low = prefix << shift
+    high = low | ((1 << shift) - 1)
+    return f"{int_to_mac(low)}-{int_to_mac(high)}"
+
+
+def prefix_ranges(rules):
+    """Interval set elements for prefix rules, dropping rules nested in others"""
+    parsed = sorted(parse_prefix(rule) for rule in rules)
+    ranges = []
+    covered = []   # (low, high) of kept rules
+    for prefix_len, prefix in parsed:
+        shift = MAC_BITS - prefix_len
+        low = prefix << shift
+        if any(c_low <= low <= c_high for c_low, c_high in covered):
+            continue
+        covered.append((low, low | ((1 << shift) - 1)))
+        ranges.append(prefix_range(prefix_len, prefix))
+    return ranges
+
+
+class NftEnforcer:
+    """Mirrors the blocklist into an nftables table with batched updates"""
+
+    def __init__(self, backend, snapshot_fn, table=DEFAULT_TABLE,
+                 batch_interval=DEFAULT_BATCH_INTERVAL, observer=None):
+        self.backend = backend
+        self.snapshot_fn = snapshot_fn     # returns the current BlocklistSnapshot
+        self.table = table
+        self.batch_interval = batch_interval
+        self.observer = observer           # observer('nft', seconds) per transaction
+
+        self._installed = {}       # key -> expires_at (None = permanent)
+        self._installed_prefixes = []
+        self._pending = []
+        self._resync = True
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        """Install the full table and start the batching thread"""
+        self.flush()
+        self._thread = threading.Thread(target=self._run, name="nft-enforcer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def queue(self, records):
+        """Queue committed journal records (cheap; called under the write lock)"""
+        with self._cond:
+            self._pending.extend(records)
+            self._cond.notify()
+
+    def resync(self):
+        """Replace the whole table from the current snapshot on the next flush"""
+        with self._cond:
+            self._resync = True
+            self._cond.notify()
+
+    def flush(self):
+        """Apply everything queued so far as one nft transaction; False on failure"""
+        with self._cond:
+            records = self._pending
+            self._pending = []
+            resync = self._resync
+            self._resync = False
+        snap = self.snapshot_fn()
+        if resync:
+            script = self._full_script(snap)
+        else:
+            script = self._delta_script(snap, records)
+        if not script:
+            return True
+        started = time.perf_counter()
+        try:
+            self.backend.apply(script)
+        except Exception as e:
+            # State in the kernel is unknown now; rebuild it next time
+            logging.error(f"❌ nftables update failed, will resync: {e}")
+            with self._cond:
+                self._resync = True
+            return False
+        if self.observer is not None:
+            self.observer('nft', time.perf_counter() - started)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not (self._pending or self._resync or self._stopping):
+                    self._cond.wait()
+                if self._stopping:
+                    return
+            # Let a burst of changes land in the same transaction
+            time.sleep(self.batch_interval)
+            try:
+                ok = self.flush()
+            except Exception as e:
+                logging.error(f"Error updating nftables: {e}")
+                ok = False
+            if not ok:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stopping, RETRY_DELAY)
+
+    def _element(self, key, expires_at, now):
+        if expires_at is None:
+            return int_to_mac(key)
+        return f"{int_to_mac(key)} timeout {max(int((expires_at - now) * 1000), 1)}ms"
+
+    def _full_script(self, snap):
+        now = time.time()
+        t = f"inet {self.table}"
+        lines = [
+            # Creating then deleting makes the replace work whether or not the table exists
+            f"add table {t}",
+            f"delete table {t}",
+            f"table {t} {{",
+            "    set blocked_macs { type ether_addr; flags timeout; }",
+            "    set blocked_prefixes { type ether_addr; flags interval; }",
+        ]
+        for hook in ("input", "forward"):
+            lines += [
+                f"    chain {hook} {{",
+                f"        type filter hook {hook} priority -10; policy accept;",
+                "        ether saddr @blocked_macs drop",
+                "        ether saddr @blocked_prefixes drop",
+                "    }",
+            ]
+        lines.append("}")
+
+        installed = {}
+        elements = []
+        for key in snap.keys():
+            expires_at = snap.expires_at(key)
+            if expires_at is not None and expires_at <= now:
+                continue
+            installed[key] = expires_at
+            elements.append(self._element(key, expires_at, now))
+        lines += self._element_lines("add", "blocked_macs", elements)
+        prefixes = prefix_ranges(snap.prefix_rules())
+        lines += self._element_lines("add", "blocked_prefixes", prefixes)
+
+        self._installed = installed
+        self._installed_prefixes = prefixes
+        return "\n".join(lines) + "\n"
+
+    def _delta_script(self, snap, records):
+        """Reconcile the keys touched by `records` against the snapshot"""
+        keys = set()
+        prefixes_changed = False
+        for record in records:
+            op = record.get('op')
+            if 'mac' in record:
+                keys.add(mac_to_int(record['mac']))
+            elif 'macs' in record:
+                keys.update(mac_to_int(mac) for mac in record['macs'])
+            elif op in ('block_prefix', 'unblock_prefix'):
+                prefixes_changed = True
+
+        now = time.time()
+        removes = []
+        adds = []
+        installed = self._installed
+        for key in keys:
+            want = snap.contains_exact(key)
+            expires_at = snap.expires_at(key) if want else None
+            if want and expires_at is not None and expires_at <= now:
+                want = False
+            if key in installed:
+                current = installed[key]
+                if want and current == expires_at:
+                    continue
+                # Kernel timeouts drop (nearly) lapsed elements on their own;
+                # deleting one that is already gone would abort the transaction
+                if current is None or current > now + EXPIRY_SLACK:
+                    removes.append(int_to_mac(key))
+                del installed[key]
+            if want:
+                installed[key] = expires_at
+                adds.append(self._element(key, expires_at, now))
+
+        lines = self._element_lines("delete", "blocked_macs", removes)
+        lines += self._element_lines("add", "blocked_macs", adds)
+        if prefixes_changed:
+            prefixes = prefix_ranges(snap.prefix_rules())
+            if prefixes != self._installed_prefixes:
+                lines.append(f"flush set inet {self.table} blocked_prefixes")
+                lines += self._element_lines("add", "blocked_prefixes", prefixes)
+                self._installed_prefixes = prefixes
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def _element_lines(self, verb, set_name, elements):
+        lines = []
+        for i in range(0, len(elements), ELEMENTS_PER_LINE):
+            chunk = ", ".join(elements[i:i + ELEMENTS_PER_LINE])
+            lines.append(f"{verb} element inet {self.table} {set_name} {{ {chunk} }}")
+        return lines
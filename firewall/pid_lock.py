@@ -0,0 +1,74 @@
+import os
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+# Exclusive lock files for "only one process may do this" rules: one sniffer
+# per interface, one engine per blocklist file. The OS drops the lock when
+# its holder dies, so there are no stale pidfiles to clean up.
+
+
+class PidLock:
+    """Exclusive, non-blocking lock file that also records the holder's pid"""
+
+    LOCK_OFFSET = 64   # Windows byte locks are mandatory; keep the pid text readable
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def _try_lock(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(fd, self.LOCK_OFFSET, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return None
+        return fd
+
+    def _unlock(self, fd):
+        try:
+            if fcntl is None:
+                os.lseek(fd, self.LOCK_OFFSET, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def acquire(self):
+        fd = self._try_lock()
+        if fd is None:
+            return False
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, str(os.getpid()).encode().ljust(self.LOCK_OFFSET - 1) + b"\n")
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            self._unlock(self._fd)
+            self._fd = None
+
+    def held_elsewhere(self):
+        """True if another process holds the lock right now"""
+        if self._fd is not None or not os.path.exists(self.path):
+            return False
+        fd = self._try_lock()
+        if fd is None:
+            return True
+        self._unlock(fd)
+        return False
+
+    def pid(self):
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,180 @@
+import threading
+import time
+
+# Low-overhead runtime statistics for the firewall server: per-command
+# counters, log2-bucketed latency histograms, gauges and persistence timings.
+# Recording is an int.bit_length() for the bucket plus a few increments under
+# a short lock, so it is cheap enough for the CHECK hot path.
+# Exposed as JSON (STATS) and in the Prometheus text format (STATS PROMETHEUS).
+
+# Bucket i counts observations <= 2**i microseconds; the last bucket is +Inf
+HISTOGRAM_BUCKETS = 25          # 1 us .. ~16.8 s
+METRIC_PREFIX = "shakti_firewall"
+
+
+class LatencyHistogram:
+    """Log2-bucketed latency histogram with count/sum and quantile estimates"""
+
+    __slots__ = ('counts', 'count', 'total')
+
+    def __init__(self):
+        self.counts = [0] * (HISTOGRAM_BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+
+    @staticmethod
+    def bucket(seconds):
+        micros = -int(-seconds * 1e6)   # ceil: bucket bounds are inclusive
+        if micros <= 1:
+            return 0
+        # Smallest i with micros <= 2**i
+        return min((micros - 1).bit_length(), HISTOGRAM_BUCKETS)
+
+    def observe(self, seconds):
+        self.counts[self.bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    @staticmethod
+    def upper_bound(index):
+        """Bucket upper bound in seconds (inf for the overflow bucket)"""
+        return float('inf') if index >= HISTOGRAM_BUCKETS else (2 ** index) / 1e6
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation, in seconds"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.upper_bound(index)
+        return self.upper_bound(HISTOGRAM_BUCKETS)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum_ms': round(self.total * 1000, 3),
+            'avg_ms': round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.quantile(0.50) * 1000,
+            'p90_ms': self.quantile(0.90) * 1000,
+            'p99_ms': self.quantile(0.99) * 1000,
+        }
+
+
+class ServerStats:
+    """Counters, histograms and gauges shared by all handler threads"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.requests = {}      # command -> count
+        self.errors = {}        # command -> count
+        self.latency = {}       # command -> LatencyHistogram
+        self.persistence = {}   # 'journal' / 'fsync' / 'compact' -> LatencyHistogram
+        self.active_connections = 0
+        self.gauges = {}        # name -> callable returning a number
+
+    def connection_opened(self):
+        with self._lock:
+            self.active_connections += 1
+
+    def connection_closed(self):
+        with self._lock:
+            self.active_connections -= 1
+
+    def record(self, command, seconds, ok=True):
+        """Count one request and its latency"""
+        with self._lock:
+            self.requests[command] = self.requests.get(command, 0) + 1
+            if not ok:
+                self.errors[command] = self.errors.get(command, 0) + 1
+            histogram = self.latency.get(command)
+            if histogram is None:
+                histogram = self.latency[command] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def record_persistence(self, kind, seconds):
+        """Time spent writing the blocklist to disk"""
+        with self._lock:
+            histogram = self.persistence.get(kind)
+            if histogram is None:
+                histogram = self.persistence[kind] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def add_gauge(self, name, fn):
+        """Register a gauge evaluated when stats are read (e.g. blocklist size)"""
+        self.gauges[name] = fn
+
+    def _gauge_values(self):
+        values = {}
+        for name, fn in self.gauges.items():
+            try:
+                values[name] = fn()
+            except Exception:
+                values[name] = None
+        return values
+
+    def snapshot(self):
+        """Stats as a JSON-serialisable dict"""
+        with self._lock:
+            report = {
+                'uptime_s': round(time.time() - self.started, 1),
+                'active_connections': self.active_connections,
+                'requests': dict(self.requests),
+                'errors': dict(self.errors),
+                'latency': {command: h.summary() for command, h in self.latency.items()},
+                'persistence': {kind: h.summary() for kind, h in self.persistence.items()},
+            }
+        report.update(self._gauge_values())
+        return report
+
+    def prometheus(self):
+        """Stats in the Prometheus text exposition format"""
+        p = METRIC_PREFIX
+        lines = [
+            f"# HELP {p}_uptime_seconds Seconds since the server started",
+            f"# TYPE {p}_uptime_seconds gauge",
+            f"{p}_uptime_seconds {time.time() - self.started:.3f}",
+            f"# HELP {p}_active_connections Client connections being handled",
+            f"# TYPE {p}_active_connections gauge",
+            f"{p}_active_connections {self.active_connections}",
+        ]
+        for name, value in self._gauge_values().items():
+            if value is not None:
+                lines += [f"# TYPE {p}_{name} gauge", f"{p}_{name} {value}"]
+
+        with self._lock:
+            lines += [f"# HELP {p}_requests_total Requests handled, by command",
+                      f"# TYPE {p}_requests_total counter"]
+            lines += [f'{p}_requests_total{{command="{c}"}} {n}' for c, n in sorted(self.requests.items())]
+            lines += [f"# HELP {p}_request_errors_total Failed requests, by command",
+                      f"# TYPE {p}_request_errors_total counter"]
+            lines += [f'{p}_request_errors_total{{command="{c}"}} {n}' for c, n in sorted(self.errors.items())]
+            lines += _histogram_lines(f"{p}_request_duration_seconds",
+                                      "Request handling time, by command", 'command', self.latency)
+            lines += _histogram_lines(f"{p}_persist_duration_seconds",
+                                      "Blocklist persistence time, by operation", 'op', self.persistence)
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name, help_text, label, histograms):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in sorted(histograms.items()):
+        lines += histogram_samples(name, f'{label}="{key}"', histogram)
+    return lines
+
+
+def histogram_samples(name, labels, histogram):
+    """Prometheus bucket/sum/count samples for one histogram; `labels` is 'k="v",...'"""
+    lines = []
+    cumulative = 0
+    for index, count in enumerate(histogram.counts):
+        cumulative += count
+        bound = histogram.upper_bound(index)
+        le = "+Inf" if bound == float('inf') else f"{bound:.6f}"
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.total:.6f}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return lines
@@ -2,6 +2,10 @@
 const API_BASE = 'http://localhost:5000';
 let explorerUrl = '';
 let logsCache = [];
+// ETags of the last rendered responses; the browser revalidates with
+// If-None-Match and the API answers 304, so unchanged data isn't re-rendered
+let logsEtag = null;
+let blocklistEtag = null;
 
 // Helper: MAC validation
 function isMac(mac) {
@@ -11,8 +15,11 @@ function isMac(mac) {
 // Fetch data from API
 async function fetchData() {
     try {
-        const logsRes = await fetch(`${API_BASE}/logs`);
+        const logsRes = await fetch(`${API_BASE}/logs`, { cache: 'no-cache' });
         const logs = await logsRes.json();
+        const etag = logsRes.headers.get('ETag');
+        const logsChanged = !etag || etag !== logsEtag;
+        logsEtag = etag;
         logsCache = logs;
 
         const blockchainRes = await fetch(`${API_BASE}/logs/blockchain`);
@@ -25,9 +32,12 @@ async function fetchData() {
         document.getElementById('blockchainLogs').textContent = blockchain.total_blockchain_logs ?? '--';
         document.getElementById('appId').textContent = 'App ID: ' + (blockchain.app_id ?? 'N/A');
         explorerUrl = blockchain.explorer ?? '';
-        updateTable(logs);
+        if (logsChanged) {
+            updateTable(logs);
+        }
     } catch (error) {
         console.error('Fetch error:', error);
+        logsEtag = null;
         document.getElementById('logsTable').innerHTML = '<tr><td colspan="6">Backend not running - Start api_server.py</td></tr>';
     }
 }
@@ -52,7 +62,7 @@ function updateTable(logs) {
             <td class="${signalClass(log.signal)}">${log.signal}</td>
             <td>${log.channel}</td>
             <td>${log.message}</td>
-            <td><button class="blockbtnmac" onclick="blockMAC('${log.mac}')">Block</button></td>
+            <td>${isMac(log.mac) ? `<button class="blockbtnmac" onclick="blockMAC('${log.mac}')">Block</button>` : ''}</td>
         </tr>`;
     }).join('');
 }
@@ -60,7 +70,12 @@ function updateTable(logs) {
 // Fetch blocked MAC list
 async function fetchBlockedList() {
     try {
-        const response = await fetch(`${API_BASE}/blocklist`);
+        const response = await fetch(`${API_BASE}/blocklist`, { cache: 'no-cache' });
+        const etag = response.headers.get('ETag');
+        if (etag && etag === blocklistEtag) {
+            return;
+        }
+        blocklistEtag = etag;
         const data = await response.json();
         const blockedMacs = data.blocked_macs || [];
         
@@ -84,6 +99,7 @@ async function fetchBlockedList() {
         
     } catch (error) {
         console.error('Error loading blocked list:', error);
+        blocklistEtag = null;
         document.getElementById('blockedContent').innerHTML = 
             '<div style="color: #ef4444; padding: 20px; text-align: center;">Error loading blocked MACs. Is api_server.py running?</div>';
     }
@@ -163,6 +179,81 @@ async function unblockMAC(mac) {
     }
 }
 
+// Live updates over Server-Sent Events; poll every 5 s only while the
+// stream is unavailable. EventSource reconnects by itself and sends
+// Last-Event-ID, so the server replays whatever was missed.
+const POLL_INTERVAL = 5000;
+const BLOCKCHAIN_REFRESH = 60000;
+let pollTimer = null;
+let blockchainTimer = null;
+
+function startPolling() {
+    if (!pollTimer) {
+        pollTimer = setInterval(fetchData, POLL_INTERVAL);
+    }
+}
+
+function stopPolling() {
+    if (pollTimer) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+}
+
+function blockedListVisible() {
+    return document.getElementById('blockedList').classList.contains('show');
+}
+
+function connectEvents() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    const source = new EventSource(`${API_BASE}/events`);
+
+    source.onopen = () => {
+        stopPolling();
+        // The blockchain count comes from a remote node; refresh it slowly
+        if (!blockchainTimer) {
+            blockchainTimer = setInterval(fetchData, BLOCKCHAIN_REFRESH);
+        }
+    };
+
+    source.onerror = () => {
+        startPolling();
+        if (source.readyState === EventSource.CLOSED) {
+            // The browser gave up; try a fresh connection later
+            setTimeout(connectEvents, POLL_INTERVAL);
+        }
+    };
+
+    source.addEventListener('attack', (e) => {
+        const log = JSON.parse(e.data);
+        logsCache = [log, ...logsCache].slice(0, 50);
+        logsEtag = null;
+        updateTable(logsCache);
+    });
+
+    source.addEventListener('blocklist', () => {
+        if (blockedListVisible()) {
+            fetchBlockedList();
+        }
+    });
+
+    source.addEventListener('stats', (e) => {
+        const stats = JSON.parse(e.data);
+        document.getElementById('localLogs').textContent = stats.total_logs ?? '--';
+    });
+
+    // Our cursor was too old or from another server process: reload everything
+    source.addEventListener('reset', () => {
+        fetchData();
+        if (blockedListVisible()) {
+            fetchBlockedList();
+        }
+    });
+}
+
 // Open blockchain explorer
 function openExplorer() {
     if (explorerUrl) {
@@ -176,7 +267,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (e.key === 'Enter') blockMAC();
     });
 
-    // Initial fetch and auto-refresh
+    // Initial fetch, then live updates (polling only as a fallback)
     fetchData();
-    setInterval(fetchData, 5000);
+    connectEvents();
 });
@@ -0,0 +1,126 @@
+"""
+API runtime benchmark: startup time and sustained requests/s.
+
+1. Startup: time to import api_server and build the app with the lazy
+   blockchain plugin, versus also importing the Algorand backend eagerly
+   (what every process used to pay at import time).
+2. Throughput: /logs requests/s from concurrent keep-alive clients against
+   the Flask dev server and the multi-worker production server.
+
+Run from the repository root:  python tests/bench_api_runtime.py
+"""
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core")
+API_SERVER = os.path.join(CORE_DIR, "api_server.py")
+CLIENTS = 16
+DURATION = 5.0
+
+
+def startup_ms(code, runs=5):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=CORE_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return True
+        time.sleep(0.1)
+    return False
+
+
+def requests_per_second(port, clients=CLIENTS, duration=DURATION):
+    stop = threading.Event()
+    counts = [0] * clients
+
+    def client(index):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        while not stop.is_set():
+            conn.request("GET", "/logs")
+            response = conn.getresponse()
+            response.read()
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            counts[index] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return sum(counts) / duration
+
+
+def serve_and_measure(label, extra_args):
+    workdir = tempfile.mkdtemp(prefix="shakti-api-bench-")
+    port = free_port()
+    with open(os.path.join(workdir, "config.yaml"), "w") as f:
+        f.write(f"api_port: {port}\nblockchain_backend: none\n")
+    sys.path.insert(0, CORE_DIR)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    import database
+    database.init_db()
+    for i in range(50):
+        database.insert_log(f"aa:bb:cc:dd:ee:{i:02x}", "-40", "6", "DeAuthentication")
+    os.chdir(cwd)
+
+    server = subprocess.Popen([sys.executable, API_SERVER] + extra_args, cwd=workdir,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_port(port):
+            print(f"❌ {label}: server did not start")
+            return None
+        rate = requests_per_second(port)
+        print(f"🌐 {label:28s} {rate:,.0f} req/s ({CLIENTS} clients)")
+        return rate
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+
+    print("=" * 70)
+    print("🧪 API runtime benchmark")
+    print("=" * 70)
+    lazy = startup_ms("import api_server; api_server.create_app()")
+    print(f"⏱️  create_app (lazy blockchain)      {lazy:7.1f} ms")
+    try:
+        import algosdk  # noqa: F401
+        eager = startup_ms("import api_server, database_blockchain; api_server.create_app()")
+        print(f"⏱️  create_app + eager algosdk import {eager:7.1f} ms")
+    except ImportError:
+        print("ℹ️  algosdk not installed, skipping the eager-import comparison")
+
+    serve_and_measure("Flask dev server", [])
+    serve_and_measure("production (gunicorn/waitress)", ["--production", "--workers", "4", "--threads", "8"])
+    print("=" * 70)
@@ -0,0 +1,136 @@
+"""
+Stress benchmark for the copy-on-write firewall blocklist.
+
+1. In-process: reader threads query snapshots while a writer blocks and
+   unblocks MAC pairs in single transactions; any snapshot holding only half
+   of a pair is a torn read.
+2. Over TCP: CHECK throughput against a live firewall server for 1..16
+   concurrent clients while a writer keeps blocking MACs.
+
+Run from the repository root:  python tests/bench_blocklist_concurrency.py
+"""
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+FIREWALL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall")
+sys.path.insert(0, FIREWALL_DIR)
+
+from blocklist_snapshot import CowBlocklist
+
+PAIRS = 512
+DURATION = 2.0
+
+
+def torn_read_check(readers=8, duration=DURATION):
+    blocklist = CowBlocklist(max_delta=256)
+    stop = threading.Event()
+    torn = []
+    reads = [0] * readers
+
+    def writer():
+        rng = random.Random(1)
+        while not stop.is_set():
+            pair = rng.randrange(PAIRS)
+            with blocklist.transaction() as txn:
+                if txn.contains_exact(pair * 2):
+                    txn.discard(pair * 2)
+                    txn.discard(pair * 2 + 1)
+                else:
+                    txn.add(pair * 2)
+                    txn.add(pair * 2 + 1)
+
+    def reader(index):
+        rng = random.Random(index)
+        count = 0
+        while not stop.is_set():
+            snap = blocklist.snapshot
+            pair = rng.randrange(PAIRS)
+            if snap.contains_exact(pair * 2) != snap.contains_exact(pair * 2 + 1) or len(snap) % 2:
+                torn.append((snap.version, pair))
+            count += 1
+        reads[index] = count
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"🧵 {readers} readers: {sum(reads) / duration:,.0f} lookups/s, "
+          f"{blocklist.snapshot.version} snapshots published, {len(torn)} torn reads")
+    return len(torn)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def check_throughput(client_counts=(1, 2, 4, 8, 16), duration=DURATION):
+    os.chdir(tempfile.mkdtemp(prefix="shakti-bench-"))
+    import firewall_server
+
+    firewall_server.PORT = free_port()
+    server = threading.Thread(target=firewall_server.start_firewall_server, daemon=True)
+    server.start()
+    time.sleep(0.5)
+
+    macs = [":".join(f"{random.randrange(256):02x}" for _ in range(6)) for _ in range(100000)]
+    firewall_server.block_many(macs)
+
+    def check(mac):
+        with socket.create_connection(("127.0.0.1", firewall_server.PORT), timeout=5) as sock:
+            sock.sendall(f"CHECK {mac}\n".encode())
+            return sock.recv(1024)
+
+    results = {}
+    for clients in client_counts:
+        stop = threading.Event()
+        counts = [0] * clients
+
+        def client(index):
+            rng = random.Random(index)
+            while not stop.is_set():
+                check(macs[rng.randrange(len(macs))])
+                counts[index] += 1
+
+        def writer():
+            rng = random.Random(clients)
+            while not stop.is_set():
+                firewall_server.block_mac(":".join(f"{rng.randrange(256):02x}" for _ in range(6)))
+                time.sleep(0.001)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in threads:
+            t.join()
+        results[clients] = sum(counts) / duration
+        print(f"🔍 {clients:2d} clients: {results[clients]:,.0f} CHECK/s")
+    return results
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+
+    print("=" * 70)
+    print("🧪 Blocklist concurrency stress benchmark")
+    print("=" * 70)
+    torn = torn_read_check()
+    check_throughput()
+    print("=" * 70)
+    print("✅ No torn reads" if torn == 0 else f"❌ {torn} torn reads")
+    sys.exit(1 if torn else 0)
@@ -0,0 +1,233 @@
+"""
+End-to-end sniffer benchmark on synthetic 802.11 traffic.
+
+Frames from core/traffic_generator.py are dissected with scapy and fed
+through the sniffer's capture queue into handle_packet, against a live
+in-process firewall server and a scratch SQLite database. For each
+scenario it reports:
+
+- capture_fps: frames/s through dissection + capture_packet
+- end_to_end_fps: frames/s until the processing queue has drained
+- db_rows_per_sec: attack rows written per second
+- block_p50_ms / block_p99_ms: first deauth frame from a MAC -> firewall
+  acknowledged the block (the threat score needs a few frames first)
+- block_requests: firewall BLOCK calls made by the sniffer
+- flood_frames: frames folded into a randomized-source flood event instead
+  of being logged and scored one by one
+
+Results are compared against tests/bench_baselines.json; a metric more than
+--tolerance worse than its baseline is a regression (exit code 1). The
+detection counters have no "better" direction: block_requests must match
+its baseline exactly and flood_frames must stay within --tolerance either
+way, since fewer means attacks went unnoticed and more means false positives.
+
+With --profile each scenario is also sampled by core/profiler.py into
+logs/profiles/bench-<scenario>-*.collapsed, the same format as a live
+`main.py --profile` capture, so the two can be compared with
+`python core/profiler.py diff`.
+
+With --embedded the blocklist engine runs inside the sniffer (as with
+firewall_mode: embedded) instead of behind the firewall server and replica.
+
+Run from the repository root:
+    python tests/bench_sniffer_pipeline.py [--update-baseline] [--tolerance 0.3] [--profile] [--embedded]
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "core"))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "firewall"))
+
+BASELINE_FILE = os.path.join(TESTS_DIR, "bench_baselines.json")
+HIGHER_IS_BETTER = ("capture_fps", "end_to_end_fps", "db_rows_per_sec")
+EXACT = ("block_requests",)       # seeded traffic: the same attackers every run
+MATCH_BASELINE = ("flood_frames",)  # windowed in time, so within tolerance
+
+SCENARIOS = {
+    # Pure capture cost: no attacks, nothing reaches the database
+    "background": dict(count=20000, attack_ratio=0.0),
+    # A few persistent attackers among normal traffic
+    "steady_attack": dict(count=10000, attack_ratio=0.05, attackers=5),
+    # Every attack frame from a fresh randomized MAC: the flood detector folds
+    # them into flood events instead of logging each, none is blocked
+    "randomized_flood": dict(count=4000, attack_ratio=0.5, randomized_ratio=1.0),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def start_pipeline(embedded=False):
+    """Scratch directory, firewall server (or in-process engine), replica and sniffer module"""
+    os.chdir(tempfile.mkdtemp(prefix="shakti-bench-"))
+    import blockchain_backend
+    import database
+    import firewall_server
+    import main as sniffer
+    from blocklist_replica import BlocklistReplica
+    from firewall_client import EmbeddedFirewall, FirewallClient
+
+    blockchain_backend.configure("none")
+    database.init_db()
+    if embedded:
+        sniffer.engine = firewall_server.start_embedded({"firewall_listen": False, "blocklist_mmap": ""})
+        sniffer.firewall = EmbeddedFirewall(sniffer.engine)
+        threading.Thread(target=sniffer.process_packets, daemon=True).start()
+        return sniffer, database
+    firewall_server.PORT = free_port()
+    threading.Thread(target=firewall_server.start_firewall_server, daemon=True).start()
+    time.sleep(0.5)
+
+    sniffer.firewall_address = ("127.0.0.1", firewall_server.PORT)
+    sniffer.firewall = FirewallClient(sniffer.firewall_address)
+    sniffer.replica = BlocklistReplica("127.0.0.1", firewall_server.PORT).start()
+    sniffer.replica.wait_ready(5)
+    threading.Thread(target=sniffer.process_packets, daemon=True).start()
+    return sniffer, database
+
+
+def run_scenario(sniffer, database, count, seed=0, profile_as=None, profile_dir=None, **profile):
+    from traffic_generator import TrafficGenerator, replay
+    from profiler import SamplingProfiler
+
+    frames = list(TrafficGenerator(seed=seed, **profile).frames(count))
+    first_seen, blocked_at = {}, {}
+    meta = iter(frames)
+
+    def capture(pkt):
+        kind, src, _ = next(meta)
+        if kind == "deauth" and src not in first_seen:
+            first_seen[src] = time.perf_counter()
+        sniffer.capture_packet(pkt)
+
+    auto_block = sniffer.auto_block_attacker
+
+    def timed_block(mac, signal):
+        auto_block(mac, signal)
+        state = sniffer.threat_table.get(mac)
+        if state is not None and state.decision == "blocked":
+            blocked_at.setdefault(mac, time.perf_counter())
+
+    sniffer.auto_block_attacker = timed_block
+    rows_before = database.count_logs()
+    requests_before = sniffer.counters['block_requests']
+    flood_before = sniffer.counters['flood_frames']
+    sampler = SamplingProfiler(profile_as, directory=profile_dir).start() if profile_as else None
+    try:
+        started = time.perf_counter()
+        replay((frame for _, _, frame in frames), capture)
+        captured = time.perf_counter()
+        sniffer.packet_queue.join()
+        drained = time.perf_counter()
+    finally:
+        sniffer.auto_block_attacker = auto_block
+        if sampler is not None:
+            sampler.stop()
+            print(f"   📊 profile: {sampler.dump()}")
+
+    latencies = [(blocked_at[mac] - seen) * 1000 for mac, seen in first_seen.items() if mac in blocked_at]
+    rows = database.count_logs() - rows_before
+    result = {
+        "capture_fps": round(count / (captured - started), 1),
+        "end_to_end_fps": round(count / (drained - started), 1),
+        "db_rows_per_sec": round(rows / (drained - started), 1) if rows else None,
+        "block_p50_ms": round(percentile(latencies, 0.5), 2) if latencies else None,
+        "block_p99_ms": round(percentile(latencies, 0.99), 2) if latencies else None,
+        "block_requests": sniffer.counters['block_requests'] - requests_before,
+        "flood_frames": sniffer.counters['flood_frames'] - flood_before,
+    }
+    return {metric: value for metric, value in result.items() if value is not None}
+
+
+def compare(name, result, baseline, tolerance):
+    """Print one scenario against its baseline; returns the regressed metrics"""
+    regressions = []
+    for metric, value in result.items():
+        base = (baseline or {}).get(metric)
+        if base is None:
+            print(f"   {metric:>16}: {value:>10,.1f}   (no baseline)")
+            continue
+        change = (value - base) / base if base else float(value > base)
+        if metric in EXACT:
+            worse = value != base
+        elif metric in MATCH_BASELINE:
+            worse = abs(change) > tolerance
+        elif metric in HIGHER_IS_BETTER:
+            worse = change < -tolerance
+        else:
+            worse = change > tolerance
+        marker = "❌" if worse else "✅"
+        print(f"   {metric:>16}: {value:>10,.1f}   baseline {base:>10,.1f}  {change:+6.1%} {marker}")
+        if worse:
+            regressions.append(f"{name}.{metric}")
+    return regressions
+
+
+def load_baselines():
+    try:
+        with open(BASELINE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sniffer pipeline benchmark")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--profile", action="store_true",
+                        help="sample each scenario with the built-in profiler")
+    parser.add_argument("--embedded", action="store_true",
+                        help="host the blocklist engine in the sniffer instead of a firewall server")
+    args = parser.parse_args()
+    profile_dir = os.path.abspath(os.path.join("logs", "profiles"))
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    print("=" * 70)
+    print("🧪 Sniffer pipeline benchmark (synthetic 802.11 traffic)")
+    print("=" * 70)
+    sniffer, database = start_pipeline(args.embedded)
+    baselines = load_baselines()
+    results, regressions = {}, []
+    for name in args.scenario or SCENARIOS:
+        print(f"📡 {name}: {SCENARIOS[name]}")
+        results[name] = run_scenario(sniffer, database, profile_as=f"bench-{name}" if args.profile else None,
+                                     profile_dir=profile_dir, **SCENARIOS[name])
+        regressions += compare(name, results[name], baselines.get("scenarios", {}).get(name), args.tolerance)
+
+    print("=" * 70)
+    if args.update_baseline:
+        baselines.setdefault("scenarios", {}).update(results)
+        baselines["machine"] = f"{platform.system()} {platform.machine()}, Python {platform.python_version()}"
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"💾 Baseline updated: {BASELINE_FILE}")
+    elif regressions:
+        print(f"❌ Regressions: {', '.join(regressions)}")
+    else:
+        print("✅ No regressions")
+    sys.exit(1 if regressions and not args.update_baseline else 0)
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("yaml")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import api_server
+    import blockchain_backend
+    import database
+    database.init_db()
+    database.insert_log("aa:bb:cc:dd:ee:01", "-40", "6", "DeAuthentication")
+    app = api_server.create_app({"blockchain_backend": "none", "admin_token": "s3cret",
+                                 "blocklist_file": str(tmp_path / "blocked_macs.json")})
+    yield app.test_client()
+    blockchain_backend.configure("algorand")
+
+
+def test_factory_app_serves_cached_logs(client):
+    first = client.get("/logs")
+    assert first.status_code == 200
+    assert first.json[0]["mac"] == "aa:bb:cc:dd:ee:01"
+    again = client.get("/logs", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+ADMIN = {"Authorization": "Bearer s3cret"}
+
+
+def test_blockchain_plugin_can_be_disabled(client, monkeypatch):
+    import blockchain_backend
+    # Other tests (and the legacy scripts) may have imported it already
+    monkeypatch.delitem(sys.modules, "database_blockchain", raising=False)
+    response = client.get("/logs/blockchain")
+    assert response.json["total_blockchain_logs"] == 0
+    assert client.get("/logs/hybrid").json["local_logs"] == 1
+    assert isinstance(blockchain_backend.get_backend(), blockchain_backend.NullBlockchainBackend)
+    assert "database_blockchain" not in sys.modules
+
+
+def test_empty_blocklist(client):
+    data = client.get("/blocklist").json
+    assert data["blocked_macs"] == [] and data["last_updated"] == "Never"
+
+
+def test_metrics_endpoint_and_runtime_switch(client):
+    client.get("/logs?limit=5")
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'stage="db_fetch"' in text
+    assert "shakti_instrumentation_enabled 1" in text
+
+    assert client.post("/metrics/instrumentation", json={"enabled": False}).status_code == 401
+    assert client.post("/metrics/instrumentation", json={"enabled": "no"}, headers=ADMIN).status_code == 400
+    assert client.post("/metrics/instrumentation", json={"enabled": False}, headers=ADMIN).json["enabled"] is False
+    assert "shakti_instrumentation_enabled 0" in client.get("/metrics").get_data(as_text=True)
+    assert client.post("/metrics/instrumentation", json={"enabled": True}, headers=ADMIN).json["enabled"] is True
+
+
+def test_profile_capture_of_the_api_process(client):
+    assert client.post("/profile", json={"target": "api", "seconds": 0.2}).status_code == 401
+    assert client.post("/profile", json={"target": "api", "seconds": 0}, headers=ADMIN).status_code == 400
+    assert client.post("/profile", json={"target": "sniffer"}, headers=ADMIN).status_code == 409
+    assert client.post("/profile", json={"target": "api", "seconds": 0.2}, headers=ADMIN).status_code == 202
+    # One capture per process at a time
+    assert client.post("/profile", json={"target": "api", "seconds": 0.2}, headers=ADMIN).status_code == 409
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not client.get("/profiles", headers=ADMIN).json:
+        time.sleep(0.05)
+    profile = client.get("/profiles", headers=ADMIN).json[0]
+    assert profile["name"] == "api" and profile["samples"] > 0
+    assert client.get(f"/profiles/{profile['file']}", headers=ADMIN).status_code == 200
+    # The captures themselves are admin-only too
+    assert client.get("/profiles").status_code == 401
+    assert client.get(f"/profiles/{profile['file']}").status_code == 401
+
+
+def test_admin_endpoints_are_disabled_without_a_token(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import api_server
+    import blockchain_backend
+    # The sensors' ingest secret is not an admin token
+    client = api_server.create_app({"blockchain_backend": "none", "ingest_token": "sensors"}).test_client()
+    sensor = {"Authorization": "Bearer sensors"}
+    try:
+        assert client.post("/profile", json={"target": "api"}, headers=sensor).status_code == 403
+        assert client.get("/profiles", headers=sensor).status_code == 403
+        assert client.get("/profiles/api-1.collapsed", headers=sensor).status_code == 403
+        assert client.post("/metrics/instrumentation", json={"enabled": False}).status_code == 403
+        assert client.get("/metrics/instrumentation").status_code == 200
+    finally:
+        blockchain_backend.configure("algorand")
+
+
+def test_api_can_host_the_firewall_engine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import api_server
+    import blockchain_backend
+    import database
+    database.init_db()
+    config = {"blockchain_backend": "none", "firewall_mode": "embedded",
+              "firewall_embedded_in": "api", "firewall_listen": False,
+              "blocklist_mmap": "", "blocklist_file": str(tmp_path / "blocked_macs.json")}
+    app = api_server.create_app(config)
+    client = app.test_client()
+    try:
+        # Hosted from the start, not from the first request
+        assert app.extensions["shakti"].engine is not None
+        # Nothing could reach a second owner without the front end
+        with pytest.raises(RuntimeError):
+            api_server.create_app(config)
+        assert api_server.create_app(config, forking=True).extensions["shakti"].engine is None
+        assert client.get("/block/aa:bb:cc:dd:ee:01").json["status"] == "Blocked MAC: aa:bb:cc:dd:ee:01"
+        assert client.post("/block", json=["aa:bb:cc:dd:ee:02"]).status_code == 200
+        engine = app.extensions["shakti"].engine
+        assert engine.get_blocklist() == ["aa:bb:cc:dd:ee:01", "aa:bb:cc:dd:ee:02"]
+        assert "Removed" in client.get("/unblock/aa:bb:cc:dd:ee:01").json["message"]
+        assert not engine.is_blocked("aa:bb:cc:dd:ee:01")
+    finally:
+        app.extensions["shakti"].engine.stop()
+        blockchain_backend.configure("algorand")
+
+
+def test_live_viewers_are_capped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import api_server
+    import blockchain_backend
+    app = api_server.create_app({"blockchain_backend": "none", "api_threads": 4,
+                                 "firewall_port": 1, "socket_timeout": 0.1})
+    client = app.test_client()
+    streams = [client.get("/events", buffered=False) for _ in range(2)]
+    try:
+        assert [stream.status_code for stream in streams] == [200, 200]
+        assert next(streams[0].response).startswith(b"retry:")
+        # Half the worker threads are streaming: the rest stay free for the API
+        over = client.get("/events")
+        assert over.status_code == 503 and over.headers["Retry-After"] == "30"
+        assert client.get("/logs").status_code == 200
+    finally:
+        streams.pop().close()
+    replacement = client.get("/events", buffered=False)
+    assert replacement.status_code == 200
+    replacement.close()
+    streams[0].close()
+    blockchain_backend.configure("algorand")
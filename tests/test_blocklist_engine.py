@@ -0,0 +1,82 @@
+import os
+import socket
+import sys
+
+import pytest
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS, "..", "core"))
+sys.path.insert(0, os.path.join(TESTS, "..", "firewall"))
+from blocklist_engine import BlocklistEngine, embedded_in
+from firewall_client import EmbeddedFirewall, FirewallClient
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_engine_round_trips_through_its_journal(tmp_path):
+    path = str(tmp_path / "blocked_macs.json")
+    engine = BlocklistEngine(path).start()
+    assert engine.block_mac("AA:AA:AA:AA:AA:01")[0]
+    assert engine.block_many(["bb:bb:bb:bb:bb:01", "bb:bb:bb:bb:bb:02"], ttl=60)[0]
+    assert not engine.block_many(["bb:bb:bb:bb:bb:03", "nope"])[0]
+    assert engine.block_prefix("cc:cc:cc")[0]
+    assert engine.unblock_mac("bb:bb:bb:bb:bb:01")[0]
+    assert engine.blocked_by("cc:cc:cc:12:34:56") == "cc:cc:cc:00:00:00/24"
+    assert not engine.is_blocked("bb:bb:bb:bb:bb:03")
+    assert not engine.is_blocked("Unknown")
+    engine.stop()
+
+    reloaded = BlocklistEngine(path).start()
+    try:
+        assert reloaded.get_blocklist() == ["aa:aa:aa:aa:aa:01", "bb:bb:bb:bb:bb:02"]
+        assert reloaded.get_prefix_rules() == ["cc:cc:cc:00:00:00/24"]
+        assert reloaded.expire_due(now=reloaded.blocklist.next_expiry() + 1) == ["bb:bb:bb:bb:bb:02"]
+    finally:
+        reloaded.stop()
+
+
+def test_embedded_engine_serves_the_tcp_protocol_too(tmp_path):
+    import firewall_server
+    port = free_port()
+    config = {"firewall_mode": "embedded", "firewall_port": port, "blocklist_mmap": "",
+              "blocklist_file": str(tmp_path / "blocked_macs.json")}
+    assert embedded_in(config) == "sniffer" and embedded_in({}) is None
+    engine = firewall_server.start_embedded(config)
+    try:
+        local = EmbeddedFirewall(engine)
+        remote = FirewallClient(("127.0.0.1", port), timeout=1.0)
+        # In-process calls and TCP clients see one blocklist
+        assert local.block("aa:bb:cc:dd:ee:01", 3600) == 'blocked'
+        assert remote.check("aa:bb:cc:dd:ee:01")
+        assert remote.block("aa:bb:cc:dd:ee:02") == 'blocked'
+        assert local.check("aa:bb:cc:dd:ee:02")
+        assert local.status()['blocklist_size'] == 2
+
+        # A second owner for the same port (and files) is refused
+        with pytest.raises(OSError):
+            firewall_server.start_embedded(config)
+    finally:
+        engine.stop()
+
+
+def test_only_one_engine_owns_a_blocklist_file_even_without_a_port(tmp_path):
+    import firewall_server
+    config = {"firewall_listen": False, "blocklist_mmap": "",
+              "blocklist_file": str(tmp_path / "blocked_macs.json")}
+    engine = firewall_server.start_embedded(config)
+    try:
+        # Nothing is bound, so the lock file is all that stops a second journal
+        with pytest.raises(OSError):
+            firewall_server.start_embedded(config)
+        with pytest.raises(OSError):
+            firewall_server.start_embedded(dict(config, firewall_listen=True, firewall_port=free_port()))
+    finally:
+        engine.stop()
+
+    # Stopping hands the file over
+    successor = BlocklistEngine(config["blocklist_file"]).start()
+    successor.stop()
@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+import blocklist_mmap
+from blocklist_mmap import MmapBlocklist, MmapPublisher, prefix_intervals
+from blocklist_snapshot import CowBlocklist
+from mac_table import mac_to_int, parse_prefix
+
+
+def block(blocklist, *macs, expires_at=None):
+    with blocklist.transaction() as txn:
+        for mac in macs:
+            key = mac_to_int(mac)
+            txn.add(key)
+            txn.set_expiry(key, expires_at)
+
+
+def test_lookups_match_exact_entries_expiry_and_prefixes(tmp_path):
+    blocklist = CowBlocklist()
+    block(blocklist, "aa:bb:cc:dd:ee:01", "00:00:00:00:00:01", "ff:ff:ff:ff:ff:fe")
+    block(blocklist, "10:20:30:40:50:60", expires_at=1000.0)
+    with blocklist.transaction() as txn:
+        txn.add_prefix(*parse_prefix("de:ad:be:*:*:*"))
+        txn.add_prefix(*parse_prefix("de:ad:be:ef:00:00/32"))
+
+    path = str(tmp_path / "blocked.mmap")
+    MmapPublisher(path, lambda: blocklist.snapshot).publish()
+    reader = MmapBlocklist(path)
+
+    assert reader.ready and len(reader) == 4
+    assert reader.version == blocklist.snapshot.version
+    assert reader.blocked_by("AA:BB:CC:DD:EE:01") == 'exact'
+    assert reader.is_blocked("00:00:00:00:00:01")
+    assert reader.is_blocked(mac_to_int("ff:ff:ff:ff:ff:fe"))
+    assert not reader.is_blocked("aa:bb:cc:dd:ee:02")
+    assert reader.is_blocked("10:20:30:40:50:60", now=999.0)
+    assert not reader.is_blocked("10:20:30:40:50:60", now=1000.0)
+    assert reader.blocked_by("de:ad:be:00:11:22") == 'prefix'
+    assert not reader.is_blocked("de:ad:bf:00:00:00")
+    assert not reader.is_blocked("not a mac")
+    # The nested /32 collapses into the /24
+    assert prefix_intervals(["de:ad:be:*:*:*", "de:ad:be:ef:00:00/32"]) == [
+        (0xdeadbe000000, 0xdeadbeffffff)]
+
+
+def test_readers_follow_new_generations_and_restarts(tmp_path):
+    path = str(tmp_path / "blocked.mmap")
+    reader = MmapBlocklist(path)
+    assert not reader.ready and not reader.is_blocked("aa:bb:cc:dd:ee:01")
+
+    blocklist = CowBlocklist()
+    publisher = MmapPublisher(path, lambda: blocklist.snapshot)
+    publisher.publish()
+    # Lookups only look for the file every STALE_RETRY; refresh() looks now
+    assert not reader.ready
+    assert reader.refresh() is not None
+    assert reader.ready and reader.generation == 1
+
+    block(blocklist, "aa:bb:cc:dd:ee:01")
+    assert not reader.is_blocked("aa:bb:cc:dd:ee:01")   # not published yet
+    publisher.publish()
+    assert reader.is_blocked("aa:bb:cc:dd:ee:01")
+    assert reader.generation == 2
+    # Nothing changed: no new generation, readers keep their mapping
+    publisher.publish()
+    reopens = reader.reopens
+    assert reader.is_blocked("aa:bb:cc:dd:ee:01") and reader.reopens == reopens
+
+    # A restarted firewall supersedes the file readers still have mapped
+    restarted = MmapPublisher(path, lambda: CowBlocklist().snapshot)
+    restarted.publish()
+    assert not reader.is_blocked("aa:bb:cc:dd:ee:01")
+    assert reader.generation == 1
+    assert sorted(os.listdir(tmp_path)) == ["blocked.mmap", f"blocked.mmap.{restarted._token}.1"]
+
+
+def test_publisher_thread_coalesces_commits(tmp_path):
+    path = str(tmp_path / "blocked.mmap")
+    blocklist = CowBlocklist()
+    publisher = MmapPublisher(path, lambda: blocklist.snapshot, interval=0.01).start()
+    reader = MmapBlocklist(path)
+    try:
+        for i in range(20):
+            block(blocklist, f"02:00:00:00:00:{i:02x}")
+            publisher.notify()
+        deadline = 50
+        while reader.version != blocklist.snapshot.version and deadline:
+            time.sleep(0.02)
+            deadline -= 1
+        assert len(reader) == 20
+        assert publisher.generation < 20
+    finally:
+        publisher.stop()
+
+
+def test_readers_fall_back_when_the_pointer_cannot_be_replaced(tmp_path, monkeypatch):
+    path = str(tmp_path / "blocked.mmap")
+    blocklist = CowBlocklist()
+    publisher = MmapPublisher(path, lambda: blocklist.snapshot)
+    publisher.publish()
+    reader = MmapBlocklist(path)
+    assert reader.ready
+
+    # e.g. Windows while another process has the pointer open
+    def refuse(src, dst):
+        raise PermissionError("in use")
+    real_replace = os.replace
+    monkeypatch.setattr(os, "replace", refuse)
+    block(blocklist, "aa:bb:cc:dd:ee:01")
+    assert not publisher.publish()
+    # The frozen generation is superseded, so callers use their fallback
+    assert not reader.ready and not reader.is_blocked("aa:bb:cc:dd:ee:01")
+
+    monkeypatch.setattr(os, "replace", real_replace)
+    assert publisher.publish()
+    reader.refresh()
+    assert reader.is_blocked("aa:bb:cc:dd:ee:01")
+
+    # Generations are never rewritten in place, and superseded ones go away
+    assert sorted(os.listdir(tmp_path)) == ["blocked.mmap", f"blocked.mmap.{publisher._token}.2"]
+
+
+def test_missing_or_corrupt_files_are_retried_at_most_every_stale_retry(tmp_path, monkeypatch, caplog):
+    path = tmp_path / "blocked.mmap"
+    opened = []
+    real_read_pointer = blocklist_mmap.read_pointer
+    monkeypatch.setattr(blocklist_mmap, "read_pointer", lambda p: opened.append(p) or real_read_pointer(p))
+
+    # Remote mode without a local firewall: no file at all
+    reader = MmapBlocklist(str(path))
+    for _ in range(1000):
+        assert not reader.ready and not reader.is_blocked("aa:bb:cc:dd:ee:01")
+    assert len(opened) == 1
+
+    path.write_text("../elsewhere\n")
+    time.sleep(blocklist_mmap.STALE_RETRY)
+    monkeypatch.setattr(blocklist_mmap, "STALE_RETRY", 0.0)
+    for _ in range(5):
+        assert not reader.ready
+    assert len(opened) == 6
+    # A broken file is reported once, not on every frame
+    assert len([r for r in caplog.records if "Can't map" in r.getMessage()]) == 1
@@ -0,0 +1,71 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+from blocklist_feed import ChangeFeed
+from blocklist_replica import BlocklistReplica
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_feed_resume_window():
+    feed = ChangeFeed(history=3)
+    feed.reset(10)
+    for version in range(11, 16):
+        feed.publish(version, [{'op': 'block', 'mac': f"00:00:00:00:00:{version:02x}"}])
+
+    assert [v for v, _ in feed.since(13)] == [14, 15]
+    assert feed.since(15) == []
+    assert feed.since(11) is None
+    assert feed.can_resume(feed.epoch, 12)
+    assert not feed.can_resume(feed.epoch, 11)
+    assert not feed.can_resume("other-run", 14)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import firewall_server
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(firewall_server, "PORT", port)
+    threading.Thread(target=firewall_server.start_firewall_server, daemon=True).start()
+    assert wait_for(lambda: socket.socket().connect_ex(("127.0.0.1", port)) == 0)
+    return firewall_server
+
+
+def test_replica_follows_and_resumes(server):
+    server.block_mac("aa:aa:aa:aa:aa:01")
+    replica = BlocklistReplica(port=server.PORT, reconnect_delay=0.05).start()
+    assert replica.wait_ready(5)
+    assert replica.is_blocked("aa:aa:aa:aa:aa:01")
+
+    server.block_many(["bb:bb:bb:bb:bb:01", "bb:bb:bb:bb:bb:02"])
+    server.block_prefix("cc:cc:cc")
+    assert wait_for(lambda: replica.is_blocked("cc:cc:cc:00:00:09"))
+    assert replica.is_blocked("bb:bb:bb:bb:bb:02")
+
+    # Drop the connection; changes made meanwhile arrive as deltas after resume
+    replica._sock.shutdown(socket.SHUT_RDWR)
+    server.unblock_mac("aa:aa:aa:aa:aa:01")
+    server.block_mac("dd:dd:dd:dd:dd:01", ttl=60)
+
+    assert wait_for(lambda: replica.is_blocked("dd:dd:dd:dd:dd:01"))
+    assert not replica.is_blocked("aa:aa:aa:aa:aa:01")
+    assert wait_for(lambda: replica.version == server.blocklist.snapshot.version)
+    assert replica.snapshots_loaded == 1
+    assert not replica.is_blocked("Unknown")
+    replica.stop()
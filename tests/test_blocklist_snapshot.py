@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+from blocklist_snapshot import CowBlocklist
+from mac_table import mac_to_int, parse_prefix
+
+
+def test_published_snapshot_is_immutable():
+    blocklist = CowBlocklist()
+    with blocklist.transaction() as txn:
+        txn.add(1)
+    before = blocklist.snapshot
+
+    with blocklist.transaction() as txn:
+        txn.add(2)
+        txn.discard(1)
+
+    assert before.contains_exact(1) and not before.contains_exact(2)
+    assert blocklist.snapshot.contains_exact(2) and not blocklist.snapshot.contains_exact(1)
+    assert blocklist.snapshot.version == before.version + 1
+
+
+def test_failed_transaction_publishes_nothing():
+    records = []
+    blocklist = CowBlocklist(journal=records.extend)
+    with pytest.raises(RuntimeError):
+        with blocklist.transaction() as txn:
+            txn.add(1)
+            txn.journal({'op': 'block'})
+            raise RuntimeError("boom")
+
+    assert len(blocklist.snapshot) == 0
+    assert records == []
+
+
+def test_deltas_merge_into_base():
+    blocklist = CowBlocklist(max_delta=8)
+    for key in range(20):
+        with blocklist.transaction() as txn:
+            txn.add(key)
+    with blocklist.transaction() as txn:
+        txn.discard(3)
+
+    snap = blocklist.snapshot
+    assert len(snap) == 19
+    assert set(snap.keys()) == set(range(20)) - {3}
+    assert len(snap.added) + len(snap.removed) <= 8
+
+
+def test_expire_due_and_lapsed_ttl():
+    blocklist = CowBlocklist()
+    with blocklist.transaction() as txn:
+        txn.add(1)
+        txn.set_expiry(1, 100.0)
+        txn.add(2)
+
+    assert blocklist.snapshot.match(1, now=50.0) == 'exact'
+    assert blocklist.snapshot.match(1, now=150.0) is None
+    assert blocklist.next_expiry() == 100.0
+
+    with blocklist.transaction() as txn:
+        assert txn.expire_due(now=150.0) == [1]
+    assert set(blocklist.snapshot.keys()) == {2}
+
+
+def test_exact_and_longest_prefix_match():
+    blocklist = CowBlocklist()
+    with blocklist.transaction() as txn:
+        txn.add(mac_to_int("11:22:33:44:55:66"))
+        txn.add_prefix(*parse_prefix("aa:bb:cc"))
+        txn.add_prefix(*parse_prefix("aa:bb:cc:d0:00:00/28"))
+
+    snap = blocklist.snapshot
+    assert snap.match(mac_to_int("11:22:33:44:55:66")) == "exact"
+    assert snap.match(mac_to_int("aa:bb:cc:d1:00:01")) == "aa:bb:cc:d0:00:00/28"
+    assert snap.match(mac_to_int("aa:bb:cc:01:00:01")) == "aa:bb:cc:00:00:00/24"
+    assert snap.match(mac_to_int("aa:bb:cd:01:00:01")) is None
+
+    with blocklist.transaction() as txn:
+        txn.discard_prefix(*parse_prefix("aa:bb:cc"))
+    assert mac_to_int("aa:bb:cc:01:00:01") not in blocklist.snapshot
+    assert mac_to_int("aa:bb:cc:d1:00:01") in snap   # published snapshots don't change
+    assert len(blocklist.snapshot) == 1 and blocklist.snapshot.prefix_count() == 1
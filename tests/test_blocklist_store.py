@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+from blocklist_store import BlocklistStore, snapshot_data, read_blocklist, blocklist_version
+
+
+def test_journal_replay_after_restart(tmp_path):
+    path = str(tmp_path / "blocked_macs.json")
+    store = BlocklistStore(path)
+    store.append({'op': 'block', 'mac': 'aa:bb:cc:dd:ee:01'})
+    store.append({'op': 'block', 'mac': 'aa:bb:cc:dd:ee:02'})
+    store.append({'op': 'unblock', 'mac': 'aa:bb:cc:dd:ee:01'})
+    store.sync()
+
+    data = read_blocklist(path)
+    assert data['blocked_macs'] == ['aa:bb:cc:dd:ee:02']
+
+
+def test_compaction_writes_snapshot_and_resets_journal(tmp_path):
+    path = str(tmp_path / "blocked_macs.json")
+    macs = set()
+    store = BlocklistStore(path)
+    store.set_snapshot_source(lambda: snapshot_data(macs.copy()))
+    for i in range(10):
+        mac = f"aa:bb:cc:dd:ee:{i:02x}"
+        macs.add(mac)
+        store.append({'op': 'block', 'mac': mac})
+    store.close()
+
+    with open(path) as f:
+        assert json.load(f)['total_blocked'] == 10
+    assert os.path.getsize(store.journal_path) == 0
+    assert not os.path.exists(store.journal_path + ".1")
+
+
+def test_torn_journal_tail_is_ignored(tmp_path):
+    path = str(tmp_path / "blocked_macs.json")
+    with open(path + ".journal", 'w') as f:
+        f.write('{"op":"block","mac":"aa:bb:cc:dd:ee:01"}\n{"op":"blo')
+
+    store = BlocklistStore(path)
+    _, records = store.load()
+    assert len(records) == 1
+
+    store.append({'op': 'block', 'mac': 'aa:bb:cc:dd:ee:02'})
+    store.sync()
+    assert read_blocklist(path)['total_blocked'] == 2
+
+
+def test_batch_record_replay(tmp_path):
+    path = str(tmp_path / "blocked_macs.json")
+    store = BlocklistStore(path)
+    macs = [f"aa:bb:cc:dd:{i // 256:02x}:{i % 256:02x}" for i in range(1000)]
+    store.append({'op': 'block_many', 'macs': macs})
+    store.append({'op': 'unblock', 'mac': macs[0]})
+    store.sync()
+
+    assert read_blocklist(path)['total_blocked'] == 999
+
+
+def test_expired_blocks_are_dropped_on_read(tmp_path):
+    path = str(tmp_path / "blocked_macs.json")
+    store = BlocklistStore(path)
+    store.append({'op': 'block', 'mac': 'aa:bb:cc:dd:ee:01', 'expires': 100.0})
+    store.append({'op': 'block', 'mac': 'aa:bb:cc:dd:ee:02', 'expires': 200.0})
+    store.append({'op': 'block', 'mac': 'aa:bb:cc:dd:ee:03'})
+    store.sync()
+
+    data = read_blocklist(path, now=150.0)
+    assert data['blocked_macs'] == ['aa:bb:cc:dd:ee:02', 'aa:bb:cc:dd:ee:03']
+    assert data['expirations'] == {'aa:bb:cc:dd:ee:02': 200.0}
+
+
+def test_blocklist_version_tracks_journal_and_snapshot(tmp_path):
+    path = str(tmp_path / "blocked_macs.json")
+    empty = blocklist_version(path)
+    store = BlocklistStore(path)
+    store.set_snapshot_source(lambda: snapshot_data([]))
+    store.append({'op': 'block', 'mac': "aa:bb:cc:dd:ee:ff"})
+    after_append = blocklist_version(path)
+    assert after_append != empty
+    store.close()
+    assert blocklist_version(path) != after_append
@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+from event_stream import EventHub, EventSources
+
+
+def read_events(stream, count):
+    """Collect the next `count` event blocks from an SSE generator"""
+    events = []
+    for chunk in stream:
+        if chunk.startswith("id:"):
+            events.append(dict(line.split(": ", 1) for line in chunk.strip().split("\n")))
+            if len(events) == count:
+                return events
+    return events
+
+
+def test_viewers_share_events_and_resume_from_last_event_id():
+    hub = EventHub()
+    viewers = [hub.stream() for _ in range(3)]
+    for viewer in viewers:
+        next(viewer)                       # retry hint
+    hub.publish('attack', {'mac': "aa:bb:cc:dd:ee:01"})
+    hub.publish('stats', {'total_logs': 1})
+
+    for viewer in viewers:
+        events = read_events(viewer, 2)
+        assert [e['event'] for e in events] == ['attack', 'stats']
+
+    first_id = f"{hub.epoch}-1"
+    resumed = read_events(hub.stream(first_id), 1)
+    assert resumed[0]['event'] == 'stats' and resumed[0]['id'] == f"{hub.epoch}-2"
+
+
+def test_unknown_or_expired_cursor_gets_reset():
+    hub = EventHub(history=2)
+    for i in range(5):
+        hub.publish('attack', {'n': i})
+    assert read_events(hub.stream("otherepoch-3"), 1)[0]['event'] == 'reset'
+    assert hub.since(1) is None
+    assert [seq for seq, _, _ in hub.since(3)] == [4, 5]
+    # A cursor from the future (another worker's hub) resyncs instead of waiting
+    assert hub.since(9) is None
+    assert read_events(hub.stream(f"{hub.epoch}-9"), 1)[0]['event'] == 'reset'
+
+
+def test_wait_wakes_on_publish():
+    hub = EventHub()
+    woke = []
+    waiter = threading.Thread(target=lambda: woke.append(hub.wait(0, 5)))
+    waiter.start()
+    hub.publish('stats', {})
+    waiter.join()
+    assert woke == [True]
+
+
+def test_sources_publish_new_logs_and_changed_stats():
+    rows = [(7, "2026-01-01 00:00:00", "aa:bb:cc:dd:ee:01", "-40", "6", "DeAuthentication")]
+    hub = EventHub()
+    sources = EventSources(hub, lambda last_id: [r for r in rows if r[0] > last_id], lambda: len(rows))
+    sources.last_log_id = 6
+    sources.poll_logs()
+    sources.poll_logs()
+    sources.poll_stats()
+    sources.poll_stats()
+
+    events = hub.since(0)
+    assert [e[1] for e in events] == ['attack', 'stats']
+    assert events[0][2]['mac'] == "aa:bb:cc:dd:ee:01"
+    assert events[1][2] == {'total_logs': 1, 'latest_log_id': 7}
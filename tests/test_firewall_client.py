@@ -0,0 +1,112 @@
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+import firewall_client
+from firewall_client import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, FirewallClient
+
+ATTACKER = "02:11:22:33:44:55"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeFirewall(socketserver.ThreadingTCPServer):
+    """Answers like firewall_server and records every request"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port):
+        self.requests = []
+        super().__init__(("127.0.0.1", port), FakeHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+class FakeHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data = self.request.recv(65536).decode()
+        if data.startswith("BLOCK_MANY"):
+            while not data.rstrip().endswith("END"):
+                data += self.request.recv(65536).decode()
+        self.server.requests.append(data)
+        if data.startswith("CHECK"):
+            reply = f"MAC {data.split()[1]}: BLOCKED (expires in 60s)\n"
+        elif data.startswith("BLOCK_MANY"):
+            reply = f"Blocked {len(data.splitlines()) - 2} MACs (0 already blocked, total: 9)\n"
+        else:
+            reply = f"Blocked MAC: {data.split()[1]}\n"
+        self.request.sendall(reply.encode())
+
+
+def test_breaker_opens_probes_and_backs_off():
+    changes = []
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=5.0, listener=changes.append)
+    for now in (0.0, 0.1):
+        assert breaker.allow(now)
+        breaker.failure(now)
+    assert breaker.state == CLOSED
+    breaker.failure(0.2)
+    assert breaker.state == OPEN
+    assert not breaker.allow(1.0) and breaker.rejected == 1
+
+    # One probe after reset_timeout; concurrent callers still fail fast
+    assert breaker.allow(5.3) and breaker.state == HALF_OPEN
+    assert not breaker.allow(5.3)
+    breaker.failure(5.4)
+    assert breaker.state == OPEN and breaker.reset_timeout == 10.0
+    assert not breaker.allow(10.0)
+    assert breaker.allow(15.5)
+    breaker.success()
+    assert breaker.state == CLOSED and breaker.reset_timeout == 5.0
+    assert changes == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED]
+
+
+def test_outage_fails_fast_then_replays_queued_blocks(monkeypatch):
+    port = free_port()
+    client = FirewallClient(("127.0.0.1", port), timeout=0.5,
+                            breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60.0))
+    server = FakeFirewall(port)
+    assert client.check(ATTACKER)
+    assert client.block("aa:bb:cc:dd:ee:01", 3600) == 'blocked'
+    server.shutdown()
+    server.server_close()
+
+    connects = []
+    real_connect = socket.create_connection
+    monkeypatch.setattr(firewall_client.socket, "create_connection",
+                        lambda *args, **kwargs: connects.append(args) or real_connect(*args, **kwargs))
+
+    # Down: two real attempts trip the breaker, everything after is instant
+    assert client.block("aa:bb:cc:dd:ee:02", 3600) == 'queued'
+    assert client.check(ATTACKER)               # answered from the cache
+    assert client.breaker.state == OPEN
+    for i in range(50):
+        assert not client.check(f"aa:bb:cc:dd:ff:{i:02x}")
+    assert client.block("aa:bb:cc:dd:ee:03", 3600) == 'queued'
+    assert client.block("aa:bb:cc:dd:ee:04", None) == 'queued'
+    # Queued blocks count as blocked locally before the replay
+    assert client.check("aa:bb:cc:dd:ee:02") and client.check("aa:bb:cc:dd:ee:04")
+    assert client.pending("aa:bb:cc:dd:ee:02") and not client.reachable()
+    assert len(connects) == 2
+    assert client.queued() == 3
+
+    # Back: the probe is the replay, one BLOCK_MANY per TTL
+    server = FakeFirewall(port)
+    try:
+        client.breaker.opened_at -= 60.0
+        assert client.replay()
+        assert client.breaker.state == CLOSED
+        assert client.queued() == 0 and client.stats['replayed'] == 3
+        assert not client.pending("aa:bb:cc:dd:ee:02") and client.reachable()
+        batches = sorted(request.splitlines()[0] for request in server.requests)
+        assert batches == ["BLOCK_MANY", "BLOCK_MANY TTL=3600"]
+        assert client.cached("aa:bb:cc:dd:ee:03")
+    finally:
+        server.shutdown()
+        server.server_close()
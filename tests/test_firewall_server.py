@@ -0,0 +1,116 @@
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+import firewall_server
+from blocklist_engine import BlocklistEngine
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = BlocklistEngine(str(tmp_path / "blocked_macs.json")).start()
+    yield engine
+    engine.stop()
+
+
+def ask(engine, request):
+    """One request through the TCP handler, over a socketpair"""
+    client, server = socket.socketpair()
+    with client:
+        client.sendall(request.encode())
+        client.shutdown(socket.SHUT_WR)
+        firewall_server.handle_client(server, "test", engine)
+        return client.recv(65536).decode()
+
+
+def test_import_reads_only_the_import_directory(engine, tmp_path, monkeypatch):
+    imports = tmp_path / "imports"
+    imports.mkdir()
+    (imports / "ok.txt").write_text("aa:bb:cc:dd:ee:01\n# comment\naa:bb:cc:dd:ee:02\n")
+    (imports / "bad.txt").write_text("aa:bb:cc:dd:ee:03\nsecret-token\n")
+    (tmp_path / "outside.txt").write_text("aa:bb:cc:dd:ee:04\n")
+    monkeypatch.setattr(firewall_server, "IMPORT_DIR", str(imports))
+
+    assert ask(engine, "IMPORT ok.txt\n").startswith("Blocked 2 MACs")
+    refused = ask(engine, "IMPORT bad.txt\n")
+    assert "batch rejected" in refused and "secret-token" not in refused
+    for name in ("../outside.txt", str(tmp_path / "outside.txt"), "/etc/passwd"):
+        assert "no such file in the import directory" in ask(engine, f"IMPORT {name}\n")
+    assert not engine.is_blocked("aa:bb:cc:dd:ee:04")
+
+    # The body form echoes what the client itself sent
+    assert "not-a-mac" in ask(engine, "IMPORT\nnot-a-mac\nEND\n")
+    monkeypatch.setattr(firewall_server, "IMPORT_DIR", "")
+    assert "disabled" in ask(engine, "IMPORT ok.txt\n")
+
+
+def test_large_inline_import_with_a_ttl_reads_the_whole_body(engine):
+    macs = [f"02:00:00:{i >> 16 & 0xff:02x}:{i >> 8 & 0xff:02x}:{i & 0xff:02x}" for i in range(20000)]
+    request = "IMPORT TTL=60\n" + "\n".join(macs) + "\nEND\n"
+    client, server = socket.socketpair()
+    with client:
+        # Bigger than a socket buffer: send while the handler reads
+        sender = threading.Thread(target=client.sendall, args=(request.encode(),))
+        sender.start()
+        firewall_server.handle_client(server, "test", engine)
+        sender.join()
+        reply = client.recv(65536).decode()
+    assert reply.startswith("Blocked 20000 MACs"), reply
+    assert "expires in 60s" in ask(engine, f"CHECK {macs[-1]}\n")
+
+
+def test_batch_blocks_follow_the_single_block_expiry_rules(engine):
+    assert ask(engine, "BLOCK aa:bb:cc:dd:ee:01 TTL=60\n").startswith("Blocked MAC")
+    assert "expires in 60s" in ask(engine, "CHECK aa:bb:cc:dd:ee:01\n")
+
+    # A longer TTL lengthens the block, a shorter one leaves it alone
+    ask(engine, "BLOCK_MANY TTL=600\naa:bb:cc:dd:ee:01\naa:bb:cc:dd:ee:02\nEND\n")
+    assert "expires in 600s" in ask(engine, "CHECK aa:bb:cc:dd:ee:01\n")
+    reply = ask(engine, "BLOCK_MANY TTL=30\naa:bb:cc:dd:ee:01\nEND\n")
+    assert reply.startswith("Blocked 0 MACs (1 already blocked, total: 2)")
+    assert "expires in 600s" in ask(engine, "CHECK aa:bb:cc:dd:ee:01\n")
+
+    # A permanent batch (e.g. a replayed block) makes a temporary block permanent
+    reply = ask(engine, "BLOCK_MANY\naa:bb:cc:dd:ee:01\naa:bb:cc:dd:ee:03\nEND\n")
+    assert reply.startswith("Blocked 1 MACs (1 already blocked, 1 lengthened, total: 3)")
+    assert ask(engine, "CHECK aa:bb:cc:dd:ee:01\n") == "MAC aa:bb:cc:dd:ee:01: BLOCKED\n"
+    ask(engine, "BLOCK_MANY TTL=60\naa:bb:cc:dd:ee:01\nEND\n")
+    assert ask(engine, "CHECK aa:bb:cc:dd:ee:01\n") == "MAC aa:bb:cc:dd:ee:01: BLOCKED\n"
+    assert ask(engine, "CHECK aa:bb:cc:dd:ee:09\n") == "MAC aa:bb:cc:dd:ee:09: NOT BLOCKED\n"
+
+    # The journal replays to the same state
+    engine.store.sync()
+    reloaded = BlocklistEngine(engine.path)
+    reloaded.load()
+    assert reloaded.blocklist.snapshot.remaining_ttl(0xaabbccddee01) is None
+    assert 590 < reloaded.blocklist.snapshot.remaining_ttl(0xaabbccddee02) <= 600
+
+
+def test_standalone_server_leaves_an_embedded_owner_alone(tmp_path, monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    mmap_file = str(tmp_path / "blocked_macs.mmap")
+    owner = firewall_server.start_embedded({"firewall_host": "127.0.0.1", "firewall_port": port,
+                                            "blocklist_mmap": mmap_file,
+                                            "blocklist_file": str(tmp_path / "blocked_macs.json")})
+    try:
+        owner.block_mac("aa:bb:cc:dd:ee:01")
+        owner.mmap_publisher.publish()
+        pointer = open(mmap_file).read()
+        started = []
+        monkeypatch.setattr(firewall_server.engine, "start", lambda *args: started.append(args))
+        monkeypatch.setattr(firewall_server, "HOST", "127.0.0.1")
+        monkeypatch.setattr(firewall_server, "PORT", port)
+
+        # The port is taken: give up before loading or publishing anything
+        firewall_server.start_firewall_server(mmap_file=mmap_file)
+        assert started == []
+        assert open(mmap_file).read() == pointer
+    finally:
+        owner.stop()
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+import instrumentation
+from sniffer_supervisor import write_json
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    instrumentation.metrics.reset()
+    instrumentation.set_enabled(True)
+    yield
+    instrumentation.metrics.reset()
+    instrumentation.set_enabled(True)
+
+
+def test_timers_record_stages_and_errors_only_when_enabled():
+    @instrumentation.timed('db_insert')
+    def insert():
+        return 'ok'
+
+    assert insert() == 'ok'
+    with pytest.raises(ValueError):
+        with instrumentation.timer('firewall_block'):
+            raise ValueError("refused")
+
+    instrumentation.set_enabled(False)
+    insert()
+    with instrumentation.timer('firewall_block'):
+        pass
+    instrumentation.observe('queue_wait', 0.5)
+
+    snapshot = instrumentation.metrics.snapshot()
+    assert snapshot['stages']['db_insert']['count'] == 1
+    assert snapshot['stages']['firewall_block']['count'] == 1
+    assert snapshot['errors'] == {'firewall_block': 1}
+    assert 'queue_wait' not in snapshot['stages']
+
+
+def test_metrics_merge_sniffer_exports_with_local_numbers(tmp_path):
+    directory = str(tmp_path)
+    instrumentation.observe('db_fetch', 0.002)
+
+    sniffer = instrumentation.StageMetrics()
+    sniffer.observe('handle_packet', 0.004)
+    sniffer.observe('handle_packet', 0.1, ok=False)
+    report = dict(sniffer.snapshot(), component='sniffer', pid=os.getpid() + 1, updated_at=time.time(),
+                  gauges={'queue_backlog': 7})
+    report['counters'] = {'frames': 1200}
+    write_json(os.path.join(directory, "sniffer-1.json"), report)
+    # A sniffer that stopped exporting long ago is ignored
+    write_json(os.path.join(directory, "sniffer-2.json"), dict(report, pid=os.getpid() + 2, updated_at=0))
+
+    text = instrumentation.prometheus("api", directory)
+    assert 'shakti_stage_duration_seconds_count{component="api",stage="db_fetch"} 1' in text
+    assert 'shakti_stage_duration_seconds_count{component="sniffer",stage="handle_packet"} 2' in text
+    assert 'shakti_stage_duration_seconds_bucket{component="sniffer",stage="handle_packet",le="+Inf"} 2' in text
+    assert 'shakti_stage_errors_total{component="sniffer",stage="handle_packet"} 1' in text
+    assert 'shakti_events_total{component="sniffer",event="frames"} 1200' in text
+    assert 'shakti_gauge{component="sniffer",name="queue_backlog"} 7' in text
+    assert 'shakti_processes{component="sniffer"} 1' in text
+    assert text.count("# TYPE shakti_stage_duration_seconds histogram") == 1
+    assert not os.path.exists(os.path.join(directory, "sniffer-2.json"))
+
+
+def test_shared_switch_reaches_other_processes(tmp_path):
+    directory = str(tmp_path)
+    instrumentation.set_shared_enabled(False, directory)
+    instrumentation.set_enabled(True)        # another process, still on
+    instrumentation.sync_enabled(directory)
+    assert instrumentation.timer('capture_lag') is instrumentation.NULL_TIMER
+    instrumentation.set_shared_enabled(True, directory)
+    instrumentation.sync_enabled(directory)
+    assert instrumentation.enabled
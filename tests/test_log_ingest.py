@@ -0,0 +1,177 @@
+import gzip
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("yaml")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+from log_ingest import BatchError, LogShipper, decode_batch, encode_batch
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import api_server
+    import blockchain_backend
+    import database
+    database.init_db()
+    app = api_server.create_app({"blockchain_backend": "none", "ingest_concurrency": 1,
+                                 "ingest_token": TOKEN})
+    yield app
+    blockchain_backend.configure("algorand")
+
+
+TOKEN = "sensor-secret"
+
+
+def post_batch(client, events, sensor="sensor-a", seq=1, **headers):
+    return client.post("/logs/ingest", data=encode_batch(events), headers=dict({
+        "Content-Encoding": "gzip", "X-Sensor-Id": sensor, "X-Batch-Seq": str(seq),
+        "Authorization": f"Bearer {TOKEN}"}, **headers))
+
+
+def test_decode_rejects_bad_batches():
+    events = [{"mac": "aa:bb:cc:dd:ee:01", "signal": -40}]
+    assert decode_batch(encode_batch(events), "gzip") == events
+    assert decode_batch(b'{"mac": "aa:bb:cc:dd:ee:01"}\n\n') == [{"mac": "aa:bb:cc:dd:ee:01"}]
+    with pytest.raises(BatchError):
+        decode_batch(b'{"mac": "aa:bb:cc:dd:ee:01"}\nnot json\n')
+    with pytest.raises(BatchError):
+        decode_batch(b'{"signal": -40}\n')
+    with pytest.raises(BatchError) as bomb:
+        decode_batch(gzip.compress(b" " * (9 * 1024 * 1024)), "gzip")
+    assert bomb.value.status == 413
+
+
+def test_ingest_is_idempotent_per_sensor_and_seq(app):
+    client = app.test_client()
+    events = [{"ts": 1700000000, "mac": f"aa:bb:cc:dd:ee:{i:02x}", "signal": -40, "channel": "6",
+               "message": "DeAuthentication"} for i in range(3)]
+
+    first = post_batch(client, events, seq=7)
+    assert first.status_code == 200 and first.json["rows"] == 3
+    retry = post_batch(client, events, seq=7)
+    assert retry.status_code == 200 and retry.json["status"] == "duplicate"
+    # Same seq from another sensor is a different batch
+    assert post_batch(client, events[:1], sensor="sensor-b", seq=7).json["rows"] == 1
+
+    logs = client.get("/logs").json
+    assert len(logs) == 4
+    assert {log["mac"] for log in logs} == {event["mac"] for event in events}
+
+    assert post_batch(client, events, sensor="bad sensor!").status_code == 400
+    assert post_batch(client, events, seq="x").status_code == 400
+    bad = client.post("/logs/ingest", data=b"nope\n", headers={
+        "X-Sensor-Id": "s", "X-Batch-Seq": "1", "Authorization": f"Bearer {TOKEN}"})
+    assert bad.status_code == 400
+
+
+def test_ingest_needs_a_configured_token(app, tmp_path):
+    import api_server
+    client = app.test_client()
+    events = [{"mac": "aa:bb:cc:dd:ee:01"}]
+    assert post_batch(client, events, Authorization="Bearer wrong").status_code == 401
+    open_app = api_server.create_app({"blockchain_backend": "none"})
+    closed = post_batch(open_app.test_client(), events)
+    assert closed.status_code == 403 and "ingest_token" in closed.json["error"]
+
+
+def test_ingest_creates_its_tables_and_only_retries_lock_timeouts(app, tmp_path, monkeypatch):
+    import database
+    client = app.test_client()
+    # A collector whose database init_db() never touched
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "fresh.db"))
+    assert post_batch(client, [{"mac": "aa:bb:cc:dd:ee:01"}]).json["rows"] == 1
+    assert database.count_logs() == 1
+
+    def fail(error):
+        def insert(sensor, seq, rows):
+            raise sqlite3.OperationalError(error)
+        return insert
+    monkeypatch.setattr(database, "_insert_batch", fail("database is locked"))
+    assert post_batch(client, [{"mac": "aa:bb:cc:dd:ee:02"}], seq=2).status_code == 503
+    monkeypatch.setattr(database, "_insert_batch", fail("disk I/O error"))
+    assert post_batch(client, [{"mac": "aa:bb:cc:dd:ee:02"}], seq=2).status_code == 500
+
+
+def test_blockchain_writes_share_one_bounded_backlog(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import api_server
+    import blockchain_backend
+    chained = []
+    monkeypatch.setattr(api_server, "log_blockchain", lambda mac, *rest: chained.append(mac))
+    app = api_server.create_app({"blockchain_backend": "none", "ingest_token": TOKEN,
+                                 "blockchain_backlog": 3})
+    monkeypatch.setattr(blockchain_backend, "disabled", lambda: False)
+
+    def writers():
+        return sum(thread.name == "blockchain-writer" for thread in threading.enumerate())
+    before = writers()
+    # Before any request this process has no writer yet: the backlog fills, the rest is dropped
+    app.extensions["shakti"].chain_rows([("ts", f"aa:bb:cc:dd:ee:{i:02x}", -40, "6", "x") for i in range(5)])
+    assert app.extensions["shakti"].blockchain_backlog.qsize() == 3
+
+    client = app.test_client()
+    for seq in range(1, 4):
+        assert post_batch(client, [{"mac": f"bb:bb:bb:bb:bb:{seq:02x}"}], seq=seq).status_code == 200
+    assert wait_for(lambda: len(chained) == 6)
+    assert chained[:3] == ["aa:bb:cc:dd:ee:00", "aa:bb:cc:dd:ee:01", "aa:bb:cc:dd:ee:02"]
+    # One writer for every batch, not a thread per batch
+    assert writers() == before + 1
+    blockchain_backend.configure("algorand")
+
+
+def test_saturated_collector_pushes_back(app, monkeypatch):
+    import api_server
+    monkeypatch.setattr(api_server, "INGEST_WAIT", 0.01)
+    client = app.test_client()
+    slots = app.extensions["shakti"].ingest_slots
+    slots.acquire()
+    try:
+        busy = post_batch(client, [{"mac": "aa:bb:cc:dd:ee:01"}])
+        assert busy.status_code == 503
+        assert busy.headers["Retry-After"] == "1"
+    finally:
+        slots.release()
+    assert post_batch(client, [{"mac": "aa:bb:cc:dd:ee:01"}]).status_code == 200
+
+
+def test_shipper_retries_until_the_collector_accepts(app, monkeypatch):
+    import api_server
+    import database
+    from werkzeug.serving import make_server
+    monkeypatch.setattr(api_server, "INGEST_WAIT", 0.01)
+    monkeypatch.setattr(api_server, "INGEST_RETRY_AFTER", 0.1)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    slots = app.extensions["shakti"].ingest_slots
+    slots.acquire()   # collector saturated
+    shipper = LogShipper(f"http://127.0.0.1:{server.port}/logs/ingest", "sensor-a",
+                         batch_size=10, flush_interval=0.05, token=TOKEN).start()
+    try:
+        for i in range(25):
+            shipper.submit(f"aa:bb:cc:dd:ee:{i:02x}", -40, "6", "DeAuthentication")
+        assert wait_for(lambda: shipper.stats['retries'] > 0)
+        slots.release()
+        assert wait_for(lambda: shipper.stats['shipped'] == 25)
+        assert database.count_logs() == 25
+        assert shipper.counters()["ingest_batches"] == 3
+    finally:
+        shipper.stop()
+        server.shutdown()
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+from mac_table import IntHashSet, mac_to_int, int_to_mac, parse_prefix, format_prefix
+
+
+def test_mac_int_round_trip():
+    assert mac_to_int("AA:BB:CC:DD:EE:FF") == 0xAABBCCDDEEFF
+    assert int_to_mac(0xAABBCCDDEEFF) == "aa:bb:cc:dd:ee:ff"
+
+
+def test_int_hash_set_add_discard_and_growth():
+    keys = set(range(0, 5000 * 7919, 7919))
+    table = IntHashSet()
+    for key in keys:
+        assert table.add(key)
+    assert not table.add(0)
+    assert len(table) == len(keys)
+    assert set(table) == keys
+
+    ordered = sorted(keys)
+    for key in ordered[:2500]:
+        assert table.discard(key)
+    assert not table.discard(ordered[0])
+    assert len(table) == 2500
+    assert set(table) == set(ordered[2500:])
+
+
+@pytest.mark.parametrize("rule", ["aa:bb:cc:*:*:*", "AA:BB:CC", "aa:bb:cc:00:00:00/24", "aa:bb:cc:12:34:56/24"])
+def test_prefix_forms_are_equivalent(rule):
+    assert parse_prefix(rule) == (24, 0xAABBCC)
+    assert format_prefix(*parse_prefix(rule)) == "aa:bb:cc:00:00:00/24"
+
+
+@pytest.mark.parametrize("rule", ["aa:bb:*:dd:*:*", "aa:bb:cc:00:00:00/49", "zz:bb:cc", "aa:bb:cc:00:00/24"])
+def test_invalid_prefix_rules(rule):
+    with pytest.raises(ValueError):
+        parse_prefix(rule)
+
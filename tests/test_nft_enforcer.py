@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+from blocklist_snapshot import CowBlocklist, apply_record
+from nft_enforcer import NftEnforcer, DryRunBackend, prefix_ranges
+
+
+def make_enforcer(tmp_path):
+    blocklist = CowBlocklist()
+    backend = DryRunBackend(str(tmp_path / "nftables.nft"))
+    enforcer = NftEnforcer(backend, lambda: blocklist.snapshot)
+    return blocklist, enforcer, backend
+
+
+def commit(blocklist, enforcer, *records):
+    with blocklist.transaction() as txn:
+        for record in records:
+            apply_record(txn, record)
+    enforcer.queue(list(records))
+
+
+def test_full_ruleset_uses_named_sets(tmp_path):
+    blocklist, enforcer, backend = make_enforcer(tmp_path)
+    commit(blocklist, enforcer, {'op': 'block', 'mac': "aa:bb:cc:dd:ee:01"})
+    enforcer.flush()
+
+    script = open(backend.path).read()
+    assert "add table inet shakti\ndelete table inet shakti" in script
+    assert "set blocked_macs { type ether_addr; flags timeout; }" in script
+    assert "ether saddr @blocked_macs drop" in script
+    assert "add element inet shakti blocked_macs { aa:bb:cc:dd:ee:01 }" in script
+    assert "nft add rule" not in script
+
+
+def test_batches_are_coalesced_into_one_transaction(tmp_path):
+    blocklist, enforcer, backend = make_enforcer(tmp_path)
+    commit(blocklist, enforcer, {'op': 'block', 'mac': "aa:bb:cc:dd:ee:01"})
+    enforcer.flush()
+
+    expires = time.time() + 60
+    commit(blocklist, enforcer,
+           {'op': 'block_many', 'macs': ["aa:bb:cc:dd:ee:02", "aa:bb:cc:dd:ee:03"], 'expires': expires},
+           {'op': 'unblock', 'mac': "aa:bb:cc:dd:ee:01"},
+           {'op': 'unblock', 'mac': "aa:bb:cc:dd:ee:03"},
+           {'op': 'block_prefix', 'rule': "11:22:33:00:00:00/24"})
+    enforcer.flush()
+
+    assert backend.transactions == 2
+    script = open(backend.path).read().split("# transaction 2")[1]
+    assert "delete element inet shakti blocked_macs { aa:bb:cc:dd:ee:01 }" in script
+    assert "aa:bb:cc:dd:ee:02 timeout" in script
+    assert "aa:bb:cc:dd:ee:03" not in script       # added and removed in the same batch
+    assert "flush set inet shakti blocked_prefixes" in script
+    assert "11:22:33:00:00:00-11:22:33:ff:ff:ff" in script
+
+
+def test_nested_prefixes_are_merged():
+    assert prefix_ranges(["aa:bb:cc:d0:00:00/28", "aa:bb:cc:00:00:00/24", "11:00:00:00:00:00/8"]) == [
+        "11:00:00:00:00:00-11:ff:ff:ff:ff:ff", "aa:bb:cc:00:00:00-aa:bb:cc:ff:ff:ff"]
+
+
+def test_failed_transaction_triggers_resync(tmp_path):
+    blocklist, enforcer, backend = make_enforcer(tmp_path)
+    enforcer.flush()
+
+    def broken(script):
+        raise RuntimeError("nft: permission denied")
+    apply = backend.apply
+    backend.apply = broken
+    commit(blocklist, enforcer, {'op': 'block', 'mac': "aa:bb:cc:dd:ee:01"})
+    assert not enforcer.flush()
+
+    backend.apply = apply
+    assert enforcer.flush()
+    script = open(backend.path).read().split("# transaction 2")[1]
+    assert "delete table inet shakti" in script
+    assert "aa:bb:cc:dd:ee:01" in script
@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+import profiler
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_attributes_time_to_the_busy_function(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    sampler = profiler.SamplingProfiler("test", interval=0.001, directory=str(tmp_path)).start()
+    time.sleep(0.3)
+    sampler.stop()
+    stop.set()
+    worker.join()
+
+    path = sampler.dump()
+    with open(path[:-len(".collapsed")] + ".json") as f:
+        meta = json.load(f)
+    stacks = profiler.load_collapsed(path)
+    busy = sum(count for stack, count in stacks.items()
+               if stack.startswith("busy-worker;") and "busy_loop (test_profiler.py" in stack)
+    assert busy > 0.5 * meta["samples"]
+    assert not any(stack.startswith("profiler;") for stack in stacks)
+    assert sampler.samples == 0   # dump() resets for the next interval
+
+
+def test_trigger_file_starts_a_capture(tmp_path):
+    directory = str(tmp_path)
+    profiler.watch_triggers("sniffer", directory, poll=0.05)
+    profiler.request_capture("sniffer", 0.1, directory)
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not any(n.endswith(".collapsed") for n in os.listdir(directory)):
+        time.sleep(0.05)
+    assert any(n.startswith("sniffer-") and n.endswith(".collapsed") for n in os.listdir(directory))
+    assert not os.path.exists(profiler.trigger_file("sniffer", directory))
+
+
+def test_diff_ranks_functions_by_change_in_share():
+    before = {"main;handle_packet;insert_log": 80, "main;handle_packet;is_mac_blocked": 20}
+    after = {"main;handle_packet;insert_log": 20, "main;handle_packet;is_mac_blocked": 80}
+    changes = profiler.diff(before, after)
+    assert {frame for frame, _, _ in changes} == {"insert_log", "is_mac_blocked"}
+    assert abs(changes[0][2] - changes[0][1]) == pytest.approx(0.6)
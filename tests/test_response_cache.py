@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+flask = pytest.importorskip("flask")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def served():
+    app = flask.Flask(__name__)
+    cache = ResponseCache(max_entries=2)
+    state = {'version': 1, 'builds': 0, 'valid_until': None}
+
+    def build():
+        state['builds'] += 1
+        return {'version': state['version']}
+
+    @app.route("/data")
+    def data():
+        return cache.respond("data", state['version'], build, lambda _: state['valid_until'])
+
+    return app.test_client(), cache, state
+
+
+def test_unchanged_data_is_served_from_memory_and_revalidates(served):
+    client, cache, state = served
+    first = client.get("/data")
+    assert first.status_code == 200 and first.json == {'version': 1}
+    etag = first.headers["ETag"]
+
+    assert client.get("/data").json == {'version': 1}
+    not_modified = client.get("/data", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.data == b""
+    assert state['builds'] == 1
+    assert cache.stats() == {'entries': 1, 'hits': 2, 'misses': 1, 'not_modified': 1}
+
+    state['version'] = 2
+    changed = client.get("/data", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json == {'version': 2}
+    assert changed.headers["ETag"] != etag
+
+
+def test_query_strings_are_cached_separately_and_evicted(served):
+    client, cache, state = served
+    for query in ("a=1", "a=2", "a=3"):
+        client.get(f"/data?{query}")
+    assert cache.stats()['entries'] == 2
+    client.get("/data?a=1")
+    assert state['builds'] == 4
+
+
+def test_entry_goes_stale_at_valid_until(served):
+    client, cache, state = served
+    state['valid_until'] = 1.0      # already in the past
+    client.get("/data")
+    client.get("/data")
+    assert state['builds'] == 2
@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firewall"))
+from server_stats import LatencyHistogram, ServerStats
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = LatencyHistogram()
+    assert histogram.bucket(0.000001) == 0
+    assert histogram.bucket(0.000003) == 2      # <= 4 us
+    assert histogram.bucket(1000) == len(histogram.counts) - 1
+
+    for _ in range(99):
+        histogram.observe(0.0001)               # 100 us -> 128 us bucket
+    histogram.observe(0.05)                     # one slow request
+    assert histogram.quantile(0.5) == 0.000128
+    assert histogram.quantile(0.99) == 0.000128
+    assert histogram.quantile(1.0) == 0.065536
+
+
+def test_stats_snapshot_and_prometheus():
+    stats = ServerStats()
+    stats.add_gauge('blocklist_size', lambda: 42)
+    stats.record("CHECK", 0.0002)
+    stats.record("BLOCK", 0.001, ok=False)
+    stats.record_persistence('fsync', 0.003)
+
+    report = stats.snapshot()
+    assert report['requests'] == {"CHECK": 1, "BLOCK": 1}
+    assert report['errors'] == {"BLOCK": 1}
+    assert report['blocklist_size'] == 42
+    assert report['persistence']['fsync']['count'] == 1
+
+    text = stats.prometheus()
+    assert 'shakti_firewall_requests_total{command="CHECK"} 1' in text
+    assert 'shakti_firewall_request_duration_seconds_bucket{command="CHECK",le="+Inf"} 1' in text
+    assert 'shakti_firewall_persist_duration_seconds_count{op="fsync"} 1' in text
+    assert "shakti_firewall_blocklist_size 42" in text
@@ -0,0 +1,98 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+from sketches import CountMinSketch, FloodDetector, HyperLogLog
+
+AP = "aa:bb:cc:dd:ee:01"
+ATTACKER = "02:11:22:33:44:55"
+
+
+def random_mac(rng):
+    return "02:" + ":".join(f"{rng.randrange(256):02x}" for _ in range(5))
+
+
+def test_count_min_never_undercounts_and_hll_is_close():
+    rng = random.Random(7)
+    sketch = CountMinSketch(width=256, depth=4)
+    truth = {}
+    for _ in range(5000):
+        key = f"mac-{rng.randrange(500)}"
+        truth[key] = truth.get(key, 0) + 1
+        sketch.add(key)
+    assert all(sketch.estimate(key) >= count for key, count in truth.items())
+    assert sketch.total == 5000
+
+    hll = HyperLogLog(precision=10)
+    for i in range(20000):
+        hll.add(f"sender-{i}")
+    assert abs(hll.count() - 20000) < 0.1 * 20000
+    small = HyperLogLog(precision=10)
+    for i in range(40):
+        small.add(f"sender-{i}")
+    assert abs(small.count() - 40) <= 3
+
+
+def test_randomized_flood_is_detected_once_and_aggregated():
+    rng = random.Random(1)
+    detector = FloodDetector(window=10.0, min_frames=50)
+    started, aggregated = [], 0
+    for i in range(2000):
+        aggregate, events = detector.observe(random_mac(rng), AP, now=i * 0.001)
+        started += [e for e in events if e[0] == 'flood_started']
+        aggregated += aggregate
+    assert len(started) == 1
+    assert started[0][1] == AP
+    assert aggregated > 1900
+    assert detector.active_floods() == 1
+
+
+def test_persistent_sender_inside_a_flood_is_still_scored():
+    rng = random.Random(2)
+    detector = FloodDetector(min_frames=50)
+    passed = 0
+    for i in range(1000):
+        detector.observe(random_mac(rng), AP, now=i * 0.001)
+        aggregate, _ = detector.observe(ATTACKER, AP, now=i * 0.001)
+        passed += not aggregate
+    # Only its first one_off_max frames look like one-offs
+    assert passed >= 998
+
+
+def test_normal_deauths_are_not_a_flood():
+    detector = FloodDetector(min_frames=50)
+    for i in range(500):
+        aggregate, events = detector.observe(ATTACKER, AP, now=i * 0.01)
+        assert not aggregate and not events
+
+
+def test_flood_ends_after_a_quiet_window_and_targets_are_bounded():
+    rng = random.Random(3)
+    detector = FloodDetector(window=1.0, min_frames=50, max_targets=8)
+    for i in range(200):
+        detector.observe(random_mac(rng), AP, now=i * 0.001)
+    assert detector.tick(now=0.5) == []
+    # The window the flood was seen in closes normally; the next one is empty
+    assert detector.tick(now=1.1) == []
+    events = detector.tick(now=2.2)
+    assert [(kind, target) for kind, target, _ in events] == [('flood_ended', AP)]
+    assert events[0][2]['frames'] >= 150
+    assert detector.active_floods() == 0
+
+    for i in range(100):
+        detector.observe(ATTACKER, f"aa:bb:cc:dd:{i // 256:02x}:{i % 256:02x}", now=3.0)
+    assert len(detector.targets) == 8
+
+
+def test_fast_flood_does_not_saturate_the_sketch():
+    rng = random.Random(4)
+    for rate in (1000, 3000, 8000):
+        detector = FloodDetector(window=10.0, min_frames=50)
+        leaked = 0
+        for i in range(rate * 10):
+            aggregate, _ = detector.observe(random_mac(rng), AP, now=i / rate)
+            leaked += not aggregate
+        # Only the frames seen before the flood was detected get through
+        assert leaked < 100, (rate, leaked)
+        assert detector.active_floods() == 1
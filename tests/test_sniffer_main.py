@@ -0,0 +1,89 @@
+import os
+import random
+import socket
+import sys
+
+import pytest
+
+pytest.importorskip("scapy")
+pytest.importorskip("yaml")
+TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS, "..", "core"))
+sys.path.insert(0, os.path.join(TESTS, "..", "firewall"))
+from scapy.layers.dot11 import Dot11, Dot11Deauth, RadioTap
+
+import main as sniffer
+from blocklist_replica import BlocklistReplica
+from firewall_client import CLOSED, FirewallClient
+from sketches import FloodDetector
+from threat_score import ThreatTable
+
+AP = "aa:bb:cc:dd:ee:01"
+ATTACKER = "02:11:22:33:44:55"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def deauth(sender, signal=-30):
+    """A deauth frame as capture hands it over (dissected from raw bytes)"""
+    frame = (RadioTap(present="dBm_AntSignal", dBm_AntSignal=signal)
+             / Dot11(addr1="ff:ff:ff:ff:ff:ff", addr2=sender, addr3=AP) / Dot11Deauth())
+    return RadioTap(bytes(frame))
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    """Fresh detection state; returns the (mac, signal, channel, message) rows handle_packet logs"""
+    rows = []
+    monkeypatch.setattr(sniffer, "log_event", lambda mac, signal, channel, message, blockchain=True:
+                        rows.append((mac, signal, channel, message)))
+    monkeypatch.setattr(sniffer, "flood_detector", FloodDetector())
+    monkeypatch.setattr(sniffer, "threat_table", ThreatTable())
+    monkeypatch.setattr(sniffer, "counters", dict(sniffer.counters))
+    # Firewall down unless a test brings its own
+    monkeypatch.setattr(sniffer, "firewall", FirewallClient(("127.0.0.1", free_port()), timeout=0.2))
+    monkeypatch.setattr(sniffer, "replica", None)
+    monkeypatch.setattr(sniffer, "shared_blocklist", None)
+    return rows
+
+
+def test_flood_events_name_the_target_but_not_as_the_attacker(logged):
+    rng = random.Random(3)
+    for _ in range(400):
+        sender = "02:" + ":".join(f"{rng.randrange(256):02x}" for _ in range(5))
+        sniffer.handle_packet(deauth(sender))
+    floods = [row for row in logged if "flood" in row[3]]
+    assert len(floods) == 1
+    mac, _, _, message = floods[0]
+    # Nobody should be offered a Block button for their own AP
+    assert mac == sniffer.FLOOD_SOURCE
+    assert AP in message
+    assert AP not in {row[0] for row in logged}
+
+
+def test_blocks_queued_during_an_outage_win_over_a_stale_replica(logged, monkeypatch):
+    # Synced before the firewall went away; it stops changing after that
+    replica = BlocklistReplica()
+    replica.apply({'type': 'snapshot', 'epoch': "run-1", 'version': 7,
+                   'blocked_macs': ["02:00:00:00:00:07"], 'prefix_rules': []})
+    monkeypatch.setattr(sniffer, "replica", replica)
+    assert replica.ready
+
+    decided = None
+    for i in range(30):
+        sniffer.handle_packet(deauth(ATTACKER))
+        if decided is None and sniffer.counters['block_requests']:
+            decided = i
+    assert decided is not None
+    assert sniffer.firewall.pending(ATTACKER) and sniffer.firewall.breaker.state == CLOSED
+    # Once the block is queued, the attacker's frames are neither logged nor re-scored
+    assert len([row for row in logged if row[0] == ATTACKER]) == decided + 1
+    assert sniffer.counters['block_requests'] == 1
+
+    # What the replica already knew still counts
+    sniffer.handle_packet(deauth("02:00:00:00:00:07"))
+    assert "02:00:00:00:00:07" not in {row[0] for row in logged}
@@ -0,0 +1,85 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+from sniffer_supervisor import PidLock, SnifferSupervisor, run_files, sniffer_status, stop_sniffer
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core")
+
+# Stands in for main.py: takes the sniffer lock, reports stats, then idles
+FAKE_SNIFFER = """
+import os, sys, time
+sys.path.insert(0, {core!r})
+from sniffer_supervisor import PidLock, run_files, write_json
+paths = run_files('wlan0mon', {run_dir!r})
+lock = PidLock(paths['sniffer_lock'])
+if not lock.acquire():
+    sys.exit(3)
+now = time.time()
+write_json(paths['stats'], {{'started_at': now, 'updated_at': now, 'frames': 120,
+                             'frames_per_sec': 60.0, 'deauth_frames': 4, 'queue_backlog': 0, 'dropped': 0}})
+time.sleep(60)
+"""
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_pid_lock_is_exclusive_and_records_the_holder(tmp_path):
+    path = str(tmp_path / "sniffer-wlan0mon.lock")
+    first, second = PidLock(path), PidLock(path)
+    assert first.acquire()
+    assert not second.acquire()
+    assert second.held_elsewhere()
+    assert second.pid() == os.getpid()
+    first.release()
+    assert not second.held_elsewhere()
+
+
+def test_crashing_sniffer_is_restarted_with_growing_backoff(tmp_path):
+    supervisor = SnifferSupervisor("wlan0mon", command=[sys.executable, "-c", "import sys; sys.exit(2)"],
+                                   run_dir=str(tmp_path), min_backoff=0.01, max_backoff=0.04)
+    runner = threading.Thread(target=supervisor.run)
+    runner.start()
+    try:
+        assert wait_for(lambda: supervisor.restarts >= 4)
+        # Only one supervisor per interface
+        assert not SnifferSupervisor("wlan0mon", run_dir=str(tmp_path)).run()
+    finally:
+        supervisor.stop()
+        runner.join(5)
+    assert supervisor.last_exit_code == 2
+    assert supervisor.backoff == 0.04
+    assert not PidLock(run_files("wlan0mon", str(tmp_path))['supervisor_lock']).held_elsewhere()
+
+
+def test_status_reports_sniffer_stats_until_stopped(tmp_path):
+    run_dir = str(tmp_path)
+    command = [sys.executable, "-c", FAKE_SNIFFER.format(core=CORE_DIR, run_dir=run_dir)]
+    supervisor = SnifferSupervisor("wlan0mon", command=command, run_dir=run_dir)
+    runner = threading.Thread(target=supervisor.run)
+    runner.start()
+    try:
+        assert wait_for(lambda: sniffer_status("wlan0mon", run_dir).get('frames_per_sec') == 60.0)
+        status = sniffer_status("wlan0mon", run_dir)
+        assert status['running'] and status['supervised']
+        assert status['state'] == 'running'
+        assert status['sniffer_pid'] == supervisor.child.pid
+        assert status['queue_backlog'] == 0
+        assert status['uptime'] >= 0
+    finally:
+        supervisor.stop()
+        runner.join(5)
+
+    status = sniffer_status("wlan0mon", run_dir)
+    assert not status['running'] and status['state'] == 'stopped'
+    assert 'frames_per_sec' not in status
+    assert not stop_sniffer("wlan0mon", run_dir)
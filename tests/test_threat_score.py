@@ -0,0 +1,70 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+from threat_score import BLOCKED, REBLOCK_GRACE, RETRY_DELAY, WATCH, ThreatPolicy, ThreatTable
+
+ATTACKER = "02:11:22:33:44:55"
+
+
+def feed(table, mac, rssi, start, count, interval):
+    """Frames at a fixed interval; returns the times at which a block was requested"""
+    decisions = []
+    for i in range(count):
+        now = start + i * interval
+        _, block = table.observe(mac, rssi, now)
+        if block:
+            decisions.append(now)
+            table.blocked(mac, now)
+    return decisions
+
+
+def test_sustained_attacker_is_blocked_once():
+    table = ThreatTable(ThreatPolicy(min_frames=3, min_rate=1.0))
+    assert feed(table, ATTACKER, -35, 0.0, 200, 0.01) == [0.02]
+    state = table.get(ATTACKER)
+    assert state.decision == BLOCKED
+    assert 95 < state.rate < 105
+
+
+def test_single_strong_frames_and_weak_floods_are_not_blocked():
+    table = ThreatTable(ThreatPolicy(rssi_threshold=-50, min_frames=3, min_rate=1.0))
+    # A strong frame every 10 s: persistent but not a flood
+    assert feed(table, ATTACKER, -30, 0.0, 10, 10.0) == []
+    # A weak flood: fast but far away
+    assert feed(table, "02:00:00:00:00:02", -80, 0.0, 100, 0.01) == []
+    # One noisy strong frame doesn't drag a weak average over the threshold
+    table.observe("02:00:00:00:00:03", -80, 0.0)
+    table.observe("02:00:00:00:00:03", -80, 0.01)
+    _, block = table.observe("02:00:00:00:00:03", -20, 0.02)
+    assert not block
+
+
+def test_failed_block_is_retried_after_a_delay():
+    table = ThreatTable(ThreatPolicy(min_frames=2, min_rate=1.0))
+    table.observe(ATTACKER, -35, 0.0)
+    _, block = table.observe(ATTACKER, -35, 0.1)
+    assert block
+    table.block_failed(ATTACKER, 0.1)
+    retries = feed(table, ATTACKER, -35, 0.2, int(RETRY_DELAY * 10) + 5, 0.1)
+    assert len(retries) == 1 and retries[0] >= 0.1 + RETRY_DELAY
+
+
+def test_attack_after_unblock_needs_fresh_evidence():
+    table = ThreatTable(ThreatPolicy(min_frames=3, min_rate=1.0))
+    feed(table, ATTACKER, -35, 0.0, 3, 0.1)
+    # Frames reach the table again once the firewall stopped blocking the MAC
+    restart = 0.2 + REBLOCK_GRACE + 1
+    state, block = table.observe(ATTACKER, -35, restart)
+    assert not block and state.decision == WATCH and state.frames == 1
+    assert len(feed(table, ATTACKER, -35, restart + 0.1, 3, 0.1)) == 1
+
+
+def test_table_is_a_bounded_lru():
+    table = ThreatTable(capacity=100)
+    for i in range(1000):
+        table.observe(f"02:00:00:00:{i // 256:02x}:{i % 256:02x}", -40, i * 0.001)
+    assert len(table) == 100
+    assert table.evictions == 900
+    assert table.get("02:00:00:00:00:00") is None
+    assert table.top(1)[0]["frames"] == 1